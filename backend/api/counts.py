@@ -0,0 +1,114 @@
+"""
+Total counts for filtered check lists
+Exact counts are cached per filter set and table version, so they're only
+recomputed after a write; heavy ad-hoc filters get the planner's row estimate
+instead of a full scan
+"""
+import os
+import json
+from typing import Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from api.filters import TransactionFilters
+from database.connection import is_replica
+from database.models import Check
+from services.change_tracking import table_version
+from services.redis_client import get_redis, run_blocking
+
+COUNT_CACHE_TTL = int(os.getenv("COUNT_CACHE_TTL", "300"))
+
+COUNT_MODES = ("auto", "exact", "estimate", "none")
+
+
+def exact_count(query) -> int:
+    """COUNT(*) over the filtered rows without the ORDER BY or entity columns"""
+    return query.order_by(None).with_entities(func.count(Check.id)).scalar() or 0
+
+
+def driver_params(compiled):
+    """
+    Parameters of a compiled statement in the form its driver expects
+
+    psycopg2 takes a dict for %(name)s placeholders; asyncpg's $1, $2 ... are
+    bound from a tuple in compile order.
+    """
+    if compiled.positional:
+        return tuple(compiled.params[name] for name in compiled.positiontup)
+    return compiled.params
+
+
+def planner_estimate(db: Session, query) -> Optional[int]:
+    """
+    Row estimate from EXPLAIN, None when the backend has no usable planner output
+
+    Only PostgreSQL is supported; the estimate comes from table statistics and
+    can be off for rare values, which is why callers flag it as approximate.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+
+    compiled = query.order_by(None).statement.compile(
+        dialect=bind.dialect,
+        compile_kwargs={"render_postcompile": True}
+    )
+    try:
+        row = db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}",
+            driver_params(compiled)
+        ).scalar()
+    except Exception as e:
+        print(f"⚠️  Count estimate failed: {e}")
+        return None
+
+    plan = json.loads(row) if isinstance(row, str) else row
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def cached_exact_count(query, filters: TransactionFilters, store: bool = True) -> int:
+    """Exact count, reused until checks are written to or the TTL expires; store=False only reads the cache"""
+    version = table_version('checks')
+    if version is None:
+        return exact_count(query)
+
+    key = f"count:checks:{version}:{filters.cache_key()}"
+    try:
+        cached = run_blocking(get_redis().get, key)
+        if cached is not None:
+            return int(cached)
+    except Exception:
+        cached = None
+
+    total = exact_count(query)
+    if not store:
+        return total
+    try:
+        run_blocking(get_redis().set, key, total, ex=COUNT_CACHE_TTL)
+    except Exception:
+        pass
+    return total
+
+
+def count_checks(db: Session, query, filters: TransactionFilters, mode: str = "auto") -> Tuple[Optional[int], bool]:
+    """
+    Total for a filtered check query
+
+    Args:
+        mode: exact (cached exact), estimate (planner estimate), none (skip),
+              auto (exact for unfiltered/indexed filters, estimate for heavy ones)
+
+    Returns:
+        (total or None, whether the total is an estimate)
+    """
+    if mode == "none":
+        return None, False
+
+    if mode == "estimate" or (mode == "auto" and filters.is_heavy):
+        estimate = planner_estimate(db, query)
+        if estimate is not None:
+            return estimate, True
+
+    # A replica's count may predate the current table version
+    return cached_exact_count(query, filters, store=not is_replica(db)), False
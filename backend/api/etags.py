@@ -0,0 +1,68 @@
+"""
+Weak ETags for read endpoints
+A tag combines the versions of the tables a response is built from with the
+request's query string, so a conditional GET can answer 304 from Redis alone
+without opening a database connection
+"""
+import asyncio
+import hashlib
+from typing import List, Optional
+
+from fastapi import Request, Response
+
+from services.change_tracking import table_version
+
+
+def _versions(tables) -> Optional[List[str]]:
+    versions = []
+    for table in tables:
+        version = table_version(table)
+        if version is None:
+            return None
+        versions.append(f"{table}.{version}")
+    return versions
+
+
+async def etag_for(request: Request, *tables: str) -> Optional[str]:
+    """
+    ETag for the current representation, None when versions are unavailable
+
+    Without Redis there's no way to tell whether the data changed, so no tag
+    is issued and clients always get a full response. The versions are read
+    in a worker thread, so a slow Redis doesn't stall the event loop.
+    """
+    versions = await asyncio.to_thread(_versions, tables)
+    if versions is None:
+        return None
+
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'W/"{"-".join(versions)}-{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    """Weak comparison against If-None-Match, as required for GET"""
+    if not etag:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def etag_headers(etag: Optional[str]) -> dict:
+    """Headers for a tagged response; no-cache makes browsers revalidate every time"""
+    if not etag:
+        return {}
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -0,0 +1,177 @@
+"""
+Server-Sent Events fan-out for live change/progress events
+Each API process holds one Redis pub/sub subscription and copies every event
+into the queue of each connected client. A client that falls behind is
+disconnected rather than buffered without bound; it reconnects with
+Last-Event-ID and replays the gap from the stream.
+"""
+import os
+import json
+import asyncio
+from typing import AsyncIterator, Optional, Set
+
+import redis.asyncio as aioredis
+
+from services.events import events_since, latest_event_id, parse_event_id
+from services.redis_client import REDIS_URL
+from workers.queues import EVENTS_CHANNEL
+
+# Events buffered per client before it is dropped
+CLIENT_BUFFER = 1000
+# Most events replayed on reconnect; a longer gap gets a reset instead
+REPLAY_LIMIT = 1000
+# Comment line sent when idle, keeps proxies from closing the connection
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+# How soon browsers reconnect after the connection drops
+RETRY_MS = 1000
+
+# Event telling the client its data may be stale and has to be refetched
+RESET = 'reset'
+
+# Queue sentinel: the client fell behind or the subscription was lost
+_CLOSE = None
+
+
+def format_sse(data: str, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """One SSE message"""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+def _event_name(payload: str) -> Optional[str]:
+    try:
+        return json.loads(payload).get("type")
+    except (ValueError, AttributeError):
+        return None
+
+
+class EventHub:
+    """Shares one pub/sub subscription between all SSE clients of this process"""
+
+    def __init__(self, redis_url: str = REDIS_URL):
+        self.redis_url = redis_url
+        self.clients: Set[asyncio.Queue] = set()
+        self.ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_BUFFER)
+        self.clients.add(queue)
+        if self._task is None or self._task.done():
+            self.ready = asyncio.Event()
+            self._task = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.clients.discard(queue)
+
+    def dispatch(self, message: str):
+        """Hand a published {"id", "data"} message to every client"""
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._close(queue)
+
+    def _close(self, queue: asyncio.Queue):
+        self.clients.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_CLOSE)
+
+    async def _listen(self):
+        client = aioredis.from_url(self.redis_url, decode_responses=True)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(EVENTS_CHANNEL)
+            self.ready.set()
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    self.dispatch(message["data"])
+        except Exception as e:
+            print(f"⚠️  Live event subscription lost: {e}")
+        finally:
+            # Events may have been missed: everyone reconnects and replays
+            for queue in list(self.clients):
+                self._close(queue)
+            self.ready.clear()
+            try:
+                await pubsub.aclose()
+                await client.aclose()
+            except Exception:
+                pass
+
+
+hub: Optional[EventHub] = None
+
+
+def get_hub() -> EventHub:
+    global hub
+    if hub is None:
+        hub = EventHub()
+    return hub
+
+
+async def event_stream(last_event_id: Optional[str], is_disconnected) -> AsyncIterator[str]:
+    """
+    SSE body: replay after `last_event_id`, then live events until disconnect
+
+    Args:
+        last_event_id: Id of the last event the client saw, None for a fresh
+                       connection (live events only)
+        is_disconnected: Coroutine function telling whether the client left
+    """
+    events = get_hub()
+    queue = events.subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        # Subscribe before replaying, so nothing falls between the two
+        try:
+            await asyncio.wait_for(events.ready.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            return
+
+        sent = None
+        if last_event_id is not None:
+            try:
+                # Sync Redis client: keep its round trips off the event loop
+                missed = await asyncio.to_thread(events_since, last_event_id, REPLAY_LIMIT)
+                newest = await asyncio.to_thread(latest_event_id) if missed is None else None
+            except Exception:
+                missed = newest = None
+            if missed is None:
+                # Carries the newest id so the next reconnect resumes from here
+                yield format_sse(json.dumps({"type": RESET}), event=RESET, event_id=newest)
+                sent = parse_event_id(newest)
+            else:
+                for event_id, payload in missed:
+                    yield format_sse(payload, event=_event_name(payload), event_id=event_id)
+                    sent = parse_event_id(event_id)
+            if sent is None:
+                sent = parse_event_id(last_event_id)
+
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            if message is _CLOSE:
+                return
+            message = json.loads(message)
+            event_id = parse_event_id(message["id"])
+            if sent is not None and event_id is not None and event_id <= sent:
+                # Already replayed from the stream
+                continue
+            sent = event_id
+            yield format_sse(message["data"], event=_event_name(message["data"]), event_id=message["id"])
+    finally:
+        events.unsubscribe(queue)
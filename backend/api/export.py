@@ -0,0 +1,101 @@
+"""
+Streaming file writers for exports
+Each writer consumes a row iterator lazily and yields encoded chunks, so an
+export never holds more than one chunk of rows in memory
+"""
+import io
+import os
+import csv
+import json
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Sequence
+
+import openpyxl
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Bytes per chunk when streaming the finished XLSX file
+FILE_CHUNK_SIZE = 64 * 1024
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Unsupported type: {type(value).__name__}")
+
+
+def _batched(rows: Iterable[Sequence[Any]], size: int) -> Iterator[List[Sequence[Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """CSV with a UTF-8 BOM so Excel detects the encoding of Cyrillic text"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(headers)
+    for batch in _batched(rows, EXPORT_CHUNK_SIZE):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """One JSON object per line, keyed by header"""
+    for batch in _batched(rows, EXPORT_CHUNK_SIZE):
+        lines = [
+            json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=_json_default)
+            for row in batch
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def stream_xlsx(headers: Sequence[str], rows: Iterable[Sequence[Any]], sheet_title: str = "Export") -> Iterator[bytes]:
+    """
+    XLSX built with openpyxl's write-only mode
+
+    Write-only worksheets flush rows to a temporary file as they're appended,
+    and the finished workbook is streamed from disk, so memory stays flat.
+    The file can only be sent once the last row is written.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.append(list(headers))
+    for row in rows:
+        sheet.append(list(row))
+
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as output:
+        workbook.save(output.name)
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+WRITERS = {
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+    "xlsx": stream_xlsx,
+}
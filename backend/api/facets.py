@@ -0,0 +1,94 @@
+"""
+Distinct values with counts for the transaction table's filter dropdowns
+Each facet counts the rows matching every filter except its own, so a
+dropdown keeps listing the values the user could switch to. Facets are summed
+from daily/hourly check_rollups when the remaining filters allow it, and
+grouped from raw rows otherwise
+"""
+from typing import Any, Dict, Optional
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import Session
+
+from api.filters import TransactionFilters
+from api.search import contains
+from api.series import apply_rollup_filters, rollup_grain
+from database.models import Check, CheckRollup
+
+# Facet -> (raw column, rollup column or None, filters on the same dimension)
+FACETS = {
+    "operator": (Check.operator, None, ("operator", "operators")),
+    "app": (Check.app, CheckRollup.app, ("app", "apps")),
+    "card": (Check.card_last4, CheckRollup.card_last4, ("card",)),
+    "type": (Check.transaction_type, CheckRollup.transaction_type, ("transaction_type", "transaction_types")),
+}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+
+def facet_filters(name: str, filters: TransactionFilters) -> TransactionFilters:
+    """The filters a facet is counted under: all but its own dimension"""
+    return filters.without(*FACETS[name][2])
+
+
+def facet_grain(name: str, filters: TransactionFilters) -> Optional[str]:
+    """Rollup grain that answers the facet exactly, None to group raw rows"""
+    if FACETS[name][1] is None:
+        return None
+    # Whole days read ~24x fewer rollup rows than hours
+    return rollup_grain("day", filters, None) or rollup_grain("hour", filters, None)
+
+
+def _facet_statement(name: str, filters: TransactionFilters, grain: Optional[str], limit: int, q: Optional[str]):
+    raw_column, rollup_column, _ = FACETS[name]
+    if grain:
+        column = rollup_column
+        count = func.sum(CheckRollup.tx_count)
+        statement = apply_rollup_filters(select(column), grain, filters)
+    else:
+        column = raw_column
+        count = func.count()
+        statement = filters.apply(select(column))
+    if q:
+        statement = statement.where(contains(column, q))
+
+    # Rollups store missing apps/cards as '', raw rows may hold NULL or ''
+    value = func.coalesce(column, "")
+    return (
+        statement
+        .with_only_columns(
+            value.label("value"),
+            count.label("count"),
+            func.count().over().label("distinct"),
+            func.sum(count).over().label("total"),
+        )
+        .group_by(value)
+        .order_by(desc("count"), value)
+        .limit(limit)
+    )
+
+
+def build_facet(db: Session, name: str, filters: TransactionFilters,
+                limit: int = DEFAULT_LIMIT, q: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Top `limit` values of one facet by row count
+
+    Args:
+        filters: The table's filters; the facet's own dimension is ignored
+        q: Only values containing this substring (dropdown search)
+
+    Returns:
+        {"values": [{"value", "count"}], "distinct", "total", "source": "rollups"|"raw"};
+        missing values are reported as None, distinct/total cover all values,
+        not just the top ones
+    """
+    filters = facet_filters(name, filters)
+    grain = facet_grain(name, filters)
+    rows = db.execute(_facet_statement(name, filters, grain, limit, q)).all()
+    return {
+        "values": [{"value": row.value or None, "count": int(row.count)} for row in rows],
+        "distinct": int(rows[0].distinct) if rows else 0,
+        "total": int(rows[0].total) if rows else 0,
+        "source": "rollups" if grain else "raw",
+    }
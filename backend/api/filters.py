@@ -0,0 +1,185 @@
+"""
+Filters for transaction (Check) list endpoints
+Used as a FastAPI dependency so every endpoint over checks accepts the same
+query parameters and applies them the same way
+"""
+import copy
+import json
+import hashlib
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi import Query
+
+from api.search import contains
+from database.models import Check
+
+
+def split_csv(values: Optional[str]) -> List[str]:
+    if not values:
+        return []
+    return [v.strip() for v in values.split(",") if v.strip()]
+
+
+TRANSACTION_TYPES = frozenset({"DEBIT", "CREDIT", "CONVERSION", "REVERSAL"})
+LEGACY_TRANSACTION_TYPES = {
+    "СПИСАНИЕ": "DEBIT",
+    "ПОПОЛНЕНИЕ": "CREDIT",
+    "ПОСТУПЛЕНИЕ": "CREDIT",
+    "КОНВЕРСИЯ": "CONVERSION",
+    "ОТМЕНА": "REVERSAL",
+    "OTMENA": "REVERSAL",
+}
+
+
+def normalize_transaction_type(raw: Optional[str]) -> str:
+    """
+    Map Russian / legacy transaction types to canonical enums
+    """
+    if not raw:
+        return "DEBIT"
+    upper = raw.upper()
+    if upper in TRANSACTION_TYPES:
+        return upper
+    return LEGACY_TRANSACTION_TYPES.get(upper, "DEBIT")
+
+
+class TransactionFilters:
+    """Server-side filters for checks, injected with Depends(TransactionFilters)"""
+
+    # Substring matches can't use a btree index
+    HEAVY_FILTERS = ("operator", "app", "search", "parsing_method", "source_type")
+
+    def __init__(
+        self,
+        date_from: Optional[datetime] = Query(None, description="Start date"),
+        date_to: Optional[datetime] = Query(None, description="End date"),
+        operator: Optional[str] = Query(None, description="Operator contains"),
+        operators: Optional[str] = Query(None, description="Comma-separated operators for IN filter"),
+        app: Optional[str] = Query(None, description="Application contains"),
+        apps: Optional[str] = Query(None, description="Comma-separated apps for IN filter"),
+        amount_min: Optional[Decimal] = Query(None, ge=0),
+        amount_max: Optional[Decimal] = Query(None, ge=0),
+        parsing_method: Optional[str] = Query(None),
+        confidence_min: Optional[float] = Query(None, ge=0.0, le=1.0),
+        confidence_max: Optional[float] = Query(None, ge=0.0, le=1.0),
+        search: Optional[str] = Query(None, description="Free-text search in raw_message"),
+        source_type: Optional[str] = Query(None, pattern="^(AUTO|MANUAL)$"),
+        transaction_type: Optional[str] = Query(None, pattern="^(DEBIT|CREDIT|CONVERSION|REVERSAL)$"),
+        transaction_types: Optional[str] = Query(None, description="Comma-separated transaction types for IN filter"),
+        currency: Optional[str] = Query(None, pattern="^(UZS|USD)$"),
+        card: Optional[str] = Query(None, description="Filter by last 4 digits of card"),
+        days_of_week: Optional[str] = Query(None, description="Comma-separated day of week numbers 0-6, 0 = Sunday"),
+        hours: Optional[str] = Query(None, description="Comma-separated hours of day 0-23"),
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.operator = operator
+        self.operators = split_csv(operators)
+        self.app = app
+        self.apps = split_csv(apps)
+        self.amount_min = amount_min
+        self.amount_max = amount_max
+        self.parsing_method = parsing_method
+        # Checks carry no confidence; accepted for compatibility, not applied
+        self.confidence_min = confidence_min
+        self.confidence_max = confidence_max
+        self.search = search
+        self.source_type = source_type
+        self.transaction_type = normalize_transaction_type(transaction_type) if transaction_type else None
+        self.transaction_types = [normalize_transaction_type(t) for t in split_csv(transaction_types)]
+        self.currency = currency
+        self.card = card
+        self.days_of_week = [int(x) for x in split_csv(days_of_week) if x.isdigit()]
+        self.hours = [int(x) for x in split_csv(hours) if x.isdigit()]
+
+    def apply(self, query):
+        """Add the active filters to a Check query or select()"""
+        if self.date_from:
+            query = query.filter(Check.datetime >= self.date_from)
+        if self.date_to:
+            query = query.filter(Check.datetime <= self.date_to)
+        if self.operator:
+            query = query.filter(contains(Check.operator, self.operator))
+        if self.operators:
+            query = query.filter(Check.operator.in_(self.operators))
+        if self.app:
+            query = query.filter(contains(Check.app, self.app))
+        if self.apps:
+            query = query.filter(Check.app.in_(self.apps))
+        if self.amount_min is not None:
+            query = query.filter(Check.amount >= self.amount_min)
+        if self.amount_max is not None:
+            query = query.filter(Check.amount <= self.amount_max)
+        if self.parsing_method:
+            query = query.filter(contains(Check.added_via, self.parsing_method))
+        if self.search:
+            query = query.filter(contains(Check.raw_text, self.search))
+        if self.source_type:
+            # map AUTO -> bot, MANUAL -> manual
+            if self.source_type == "AUTO":
+                query = query.filter(contains(Check.added_via, "bot"))
+            else:
+                query = query.filter(contains(Check.added_via, "manual"))
+        if self.transaction_type:
+            query = query.filter(Check.transaction_type == self.transaction_type)
+        if self.transaction_types:
+            query = query.filter(Check.transaction_type.in_(self.transaction_types))
+        if self.currency:
+            query = query.filter(Check.currency == self.currency)
+        if self.card:
+            query = query.filter(Check.card_last4 == self.card)
+        if self.days_of_week:
+            query = query.filter(Check.dow.in_(self.days_of_week))
+        if self.hours:
+            query = query.filter(Check.hour.in_(self.hours))
+        return query
+
+    def without(self, *names: str) -> "TransactionFilters":
+        """Copy with the named filters cleared"""
+        reduced = copy.copy(self)
+        for name in names:
+            setattr(reduced, name, [] if isinstance(getattr(self, name), list) else None)
+        return reduced
+
+    def active(self) -> dict:
+        """Applied filters only, in a stable JSON-friendly form"""
+        values = {
+            "date_from": self.date_from,
+            "date_to": self.date_to,
+            "operator": self.operator,
+            "operators": sorted(self.operators),
+            "app": self.app,
+            "apps": sorted(self.apps),
+            "amount_min": self.amount_min,
+            "amount_max": self.amount_max,
+            "parsing_method": self.parsing_method,
+            "search": self.search,
+            "source_type": self.source_type,
+            "transaction_type": self.transaction_type,
+            "transaction_types": sorted(self.transaction_types),
+            "currency": self.currency,
+            "card": self.card,
+            "days_of_week": sorted(self.days_of_week),
+            "hours": sorted(self.hours),
+        }
+        return {k: v for k, v in values.items() if v is not None and v != []}
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.active()
+
+    @property
+    def is_heavy(self) -> bool:
+        """True when a filter forces a scan instead of an index lookup"""
+        active = self.active()
+        return any(name in active for name in self.HEAVY_FILTERS)
+
+    def cache_key(self) -> str:
+        """Stable digest of the applied filters, 'all' when unfiltered"""
+        active = self.active()
+        if not active:
+            return "all"
+        raw = json.dumps(active, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode()).hexdigest()
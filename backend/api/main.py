@@ -5,6 +5,7 @@ Entry point for REST API
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import asyncio
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -37,6 +38,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Sends a client's reads to the primary for a while after it writes
+# (only when a read replica is configured)
+from api.replicas import ReadYourWritesMiddleware
+app.add_middleware(ReadYourWritesMiddleware)
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -48,6 +54,23 @@ async def startup_event():
     init_db()
     print("✅ Database initialized")
 
+    # Upcoming monthly partitions of checks/transactions; the default
+    # partition catches rows meanwhile, so a failure here isn't fatal
+    from database.connection import SessionLocal
+    from services.partitions import ensure_partitions
+    db = SessionLocal()
+    try:
+        ensure_partitions(db)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️  Could not create upcoming partitions: {e}")
+    finally:
+        db.close()
+
+    # Pool metrics of this process go to Redis for /health/pools
+    from database.pools import start_reporter
+    start_reporter()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -86,8 +109,24 @@ async def health_check():
     }
 
 
+@app.get("/health/pools")
+async def pool_health():
+    """Connection pool metrics of this API process and of every process that reports them"""
+    from database.pools import fleet_snapshot, process_snapshot
+
+    try:
+        fleet = await asyncio.to_thread(fleet_snapshot)
+    except Exception as e:
+        fleet = {"error": str(e)}
+
+    return {
+        "local": process_snapshot(),
+        "fleet": fleet,
+    }
+
+
 # Import and register routes
-from api.routes import transactions, analytics, reference, automation, userbot, auth
+from api.routes import transactions, analytics, reference, automation, userbot, auth, dead_letters, events
 
 app.include_router(auth.router, tags=["Authentication"])
 app.include_router(transactions.router, prefix="/api/transactions", tags=["Transactions"])
@@ -95,3 +134,5 @@ app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"]
 app.include_router(reference.router, prefix="/api/reference", tags=["Reference"])
 app.include_router(automation.router, tags=["Automation"])
 app.include_router(userbot.router, tags=["Userbot"])
+app.include_router(dead_letters.router, tags=["Dead Letters"])
+app.include_router(events.router, tags=["Events"])
@@ -0,0 +1,171 @@
+"""
+Keyset (cursor) pagination for the checks list
+A cursor carries the last row's sort value plus its id, so every page is an
+index range scan on (sort column, id) instead of an OFFSET that reads and
+discards all preceding rows
+"""
+import json
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, or_, asc, desc, tuple_
+
+from database.models import Check
+
+
+class SortKey(NamedTuple):
+    column: Any
+    nullable: bool
+    decode: Callable[[str], Any]
+
+
+def _decode_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+# Whitelisted sort fields; each one is backed by a composite (column, id) index
+SORT_KEYS: Dict[str, SortKey] = {
+    "transaction_date": SortKey(Check.datetime, False, _decode_datetime),
+    "amount": SortKey(Check.amount, False, Decimal),
+    "created_at": SortKey(Check.created_at, True, _decode_datetime),
+    "updated_at": SortKey(Check.updated_at, True, _decode_datetime),
+    # Checks have no confidence column, order by creation time instead
+    "parsing_confidence": SortKey(Check.created_at, True, _decode_datetime),
+}
+DEFAULT_SORT = "transaction_date"
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor is malformed or was issued for a different sort"""
+
+
+def get_sort_key(sort_by: str) -> SortKey:
+    return SORT_KEYS.get(sort_by, SORT_KEYS[DEFAULT_SORT])
+
+
+def encode_cursor(sort_by: str, sort_dir: str, value: Any, row_id: int, backward: bool = False) -> str:
+    """Build an opaque cursor pointing just past (value, row_id)"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = {"s": sort_by, "d": sort_dir, "v": value, "i": row_id, "b": backward}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_dir: str) -> Tuple[Any, int, bool]:
+    """
+    Decode a cursor issued for the same sort
+
+    Returns:
+        (sort value, row id, backward)
+
+    Raises:
+        InvalidCursor: if the cursor can't be decoded or doesn't match the sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        cursor_sort, cursor_dir = payload["s"], payload["d"]
+        row_id = int(payload["i"])
+        backward = bool(payload.get("b", False))
+        value = payload["v"]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+    if cursor_sort != sort_by or cursor_dir != sort_dir:
+        raise InvalidCursor("Cursor was issued for a different sort order")
+
+    if value is not None:
+        try:
+            value = get_sort_key(sort_by).decode(value)
+        except (ValueError, TypeError, InvalidOperation) as e:
+            raise InvalidCursor("Malformed cursor value") from e
+    return value, row_id, backward
+
+
+def order_by_clauses(sort_by: str, sort_dir: str, reverse: bool = False) -> list:
+    """
+    ORDER BY for a sort field with id as the tie-breaker
+
+    NULLs compare as the largest value (PostgreSQL's default for both
+    directions), so plain composite indexes serve either direction.
+    """
+    key = get_sort_key(sort_by)
+    descending = (sort_dir == "desc") != reverse
+    order_fn = desc if descending else asc
+    column_order = order_fn(key.column)
+    if key.nullable:
+        # Spelled out so other backends (SQLite sorts NULLs first) agree
+        column_order = column_order.nulls_first() if descending else column_order.nulls_last()
+    return [column_order, order_fn(Check.id)]
+
+
+def keyset_condition(sort_by: str, descending: bool, value: Any, row_id: int):
+    """Rows strictly after (value, row_id) in the given scan direction"""
+    key = get_sort_key(sort_by)
+    column = key.column
+
+    if value is None:
+        # Inside the NULL group: only the id decides, then the non-NULL rows
+        # follow when scanning downwards
+        same_group = and_(column.is_(None), Check.id < row_id if descending else Check.id > row_id)
+        return or_(same_group, column.isnot(None)) if descending else same_group
+
+    # The plain bound is implied by the row comparison but, unlike it, lets
+    # PostgreSQL prune the monthly partitions of checks past the cursor
+    if descending:
+        condition = and_(column <= value, tuple_(column, Check.id) < tuple_(value, row_id))
+    else:
+        condition = and_(column >= value, tuple_(column, Check.id) > tuple_(value, row_id))
+    if key.nullable and not descending:
+        # NULLs sort after every value when ascending
+        condition = or_(condition, column.is_(None))
+    return condition
+
+
+def apply_cursor(query, sort_by: str, sort_dir: str, cursor: Optional[str]):
+    """
+    Restrict and order a Check query for one cursor page
+
+    Returns:
+        (query, backward) where backward means rows come back in reverse
+        display order and must be flipped by `build_page`
+    """
+    backward = False
+    if cursor:
+        value, row_id, backward = decode_cursor(cursor, sort_by, sort_dir)
+        descending = (sort_dir == "desc") != backward
+        query = query.filter(keyset_condition(sort_by, descending, value, row_id))
+    return query.order_by(*order_by_clauses(sort_by, sort_dir, reverse=backward)), backward
+
+
+def build_page(rows: List[Check], page_size: int, sort_by: str, sort_dir: str, cursor: Optional[str], backward: bool):
+    """
+    Trim a page fetched with `page_size + 1` rows and build its cursors
+
+    Returns:
+        (rows in display order, next_cursor, prev_cursor)
+    """
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backward:
+        rows.reverse()
+
+    if not rows:
+        return rows, None, None
+
+    column_name = get_sort_key(sort_by).column.key
+
+    def cursor_for(row: Check, backward_cursor: bool) -> str:
+        return encode_cursor(sort_by, sort_dir, getattr(row, column_name), row.id, backward_cursor)
+
+    # Going forward there is a next page if we over-fetched; going backward we
+    # came from a next page, so it always exists
+    next_cursor = cursor_for(rows[-1], False) if (has_more or backward) else None
+    prev_cursor = cursor_for(rows[0], True) if (cursor and (not backward or has_more)) else None
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,158 @@
+"""
+Read-replica routing for heavy read-only endpoints
+With DATABASE_READ_URL set, list, export and analytics reads go to the
+replica while its replay lag stays under READ_MAX_LAG_SECONDS, and to the
+primary otherwise. A client that just wrote something gets a short-lived
+cookie and reads from the primary until it expires, so it sees its own edits.
+"""
+import os
+import time
+import asyncio
+from typing import AsyncGenerator, Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.connection import (
+    AsyncReadSessionLocal, AsyncSessionLocal, ReadSessionLocal, SessionLocal, async_read_engine,
+)
+
+READ_MAX_LAG_SECONDS = float(os.getenv("READ_MAX_LAG_SECONDS", "5"))
+# How long a lag reading is trusted before the replica is asked again
+READ_LAG_CHECK_SECONDS = float(os.getenv("READ_LAG_CHECK_SECONDS", "2"))
+# Reads stay on the primary this long after a client's write; keep it above
+# READ_MAX_LAG_SECONDS so the replica has caught up by the time it expires
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+# A lag check slower than this counts as a failed one
+LAG_CHECK_TIMEOUT = 1.0
+
+PRIMARY_COOKIE = "read_primary_until"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Seconds behind the primary. A replica that replayed everything it received
+# is current even if the last replayed commit is old (idle primary), but only
+# while its WAL receiver is streaming: a disconnected replica has also replayed
+# all it received. Otherwise (including roles without pg_read_all_stats, which
+# see no receiver status) the age of the last replayed commit is the lag. A
+# server that isn't in recovery (a plain second database) has no lag at all
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+         AND (SELECT status FROM pg_stat_wal_receiver) = 'streaming' THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+
+class ReplicaMonitor:
+    """Replay lag of the read replica, measured at most every `interval` seconds"""
+
+    def __init__(self, engine, max_lag: float = READ_MAX_LAG_SECONDS, interval: float = READ_LAG_CHECK_SECONDS):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+        self._checking = False
+
+    @property
+    def healthy(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+
+    async def _measure(self) -> Optional[float]:
+        async with self.engine.connect() as conn:
+            lag = (await conn.execute(text(LAG_SQL))).scalar()
+        return None if lag is None else float(lag)
+
+    async def refresh(self):
+        was_healthy = self.healthy
+        self._checking = True
+        try:
+            self.lag = await asyncio.wait_for(self._measure(), LAG_CHECK_TIMEOUT)
+            problem = f"{self.lag:.1f}s behind" if self.lag is not None else "lag unknown"
+        except Exception as e:
+            self.lag = None
+            problem = str(e) or type(e).__name__
+        finally:
+            self._checking = False
+            self.checked_at = time.monotonic()
+
+        if was_healthy and not self.healthy:
+            print(f"⚠️  Read replica unusable ({problem}), reading from the primary")
+        elif self.healthy and not was_healthy:
+            print(f"✅ Read replica usable ({self.lag:.1f}s behind)")
+
+    async def usable(self) -> bool:
+        """Whether reads may go to the replica; re-measures when the last reading is old"""
+        if self.engine is None:
+            return False
+        # Requests arriving while a check is in flight use the previous reading
+        if not self._checking and time.monotonic() - self.checked_at >= self.interval:
+            await self.refresh()
+        return self.healthy
+
+
+monitor = ReplicaMonitor(async_read_engine)
+
+
+def wants_primary(request: Request) -> bool:
+    """Whether the client wrote something within the read-your-writes window"""
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def use_replica(request: Request) -> bool:
+    return not wants_primary(request) and await monitor.usable()
+
+
+async def read_session_factory(request: Optional[Request] = None):
+    """Async session factory for a read: the replica when usable, else the primary"""
+    if request is not None and wants_primary(request):
+        return AsyncSessionLocal
+    return AsyncReadSessionLocal if await monitor.usable() else AsyncSessionLocal
+
+
+async def sync_read_session_factory(request: Request):
+    """Sync counterpart of `read_session_factory`, for streaming exports"""
+    return ReadSessionLocal if await use_replica(request) else SessionLocal
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session dependency for read-only routes
+
+    Writes through it fail on a replica. Results read from the replica must
+    not fill the shared caches or issue ETags (see `database.connection.is_replica`):
+    a lagging replica would pin stale data under the current versions.
+    """
+    factory = await read_session_factory(request)
+    async with factory() as db:
+        yield db
+
+
+def primary_cookie(now: Optional[float] = None) -> str:
+    until = int((now or time.time()) + READ_YOUR_WRITES_SECONDS)
+    return f"{PRIMARY_COOKIE}={until}; Max-Age={READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients after a successful write so their next reads go to the primary"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS or monitor.engine is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", primary_cookie().encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -2,16 +2,22 @@
 Analytics API routes
 Provides aggregated statistics and insights
 """
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, desc, select
 from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Optional
 from pydantic import BaseModel
 import os
 
-from database.connection import get_db_session
+from api.filters import TransactionFilters
+from api.series import InvalidSeries, build_series, validate_range
+from api.replicas import get_read_session, read_session_factory
+from database.connection import is_replica
 from database.models import Transaction
+from services.query_cache import cached, filter_tags
+from services.refresh_cache import cached_with_refresh
 
 router = APIRouter()
 
@@ -27,66 +33,102 @@ class TopAgentResponse(BaseModel):
     insight: str
 
 
+# Window name -> length; "custom" takes date_from/date_to instead
+TOP_AGENT_WINDOWS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+def top_agent_query(period_start: datetime, period_end: datetime):
+    """
+    Top application in [period_start, period_end) with window totals, as one row
+
+    Groups by application in SQL and ranks the groups; the window functions
+    carry the overall count and UZS volume onto the top row, so the result is
+    a single row no matter how many transactions the window holds.
+    """
+    app = func.coalesce(
+        func.nullif(Transaction.application_mapped, ""),
+        func.nullif(Transaction.operator_raw, ""),
+        "Unknown"
+    )
+    uzs_amount = case((Transaction.currency == "UZS", Transaction.amount), else_=0)
+    per_app = (
+        select(
+            app.label("app"),
+            func.count().label("app_count"),
+            func.sum(uzs_amount).label("app_volume"),
+        )
+        .where(Transaction.parsed_at >= period_start, Transaction.parsed_at < period_end)
+        .group_by(app)
+        .subquery()
+    )
+    return (
+        select(
+            per_app.c.app,
+            per_app.c.app_count,
+            per_app.c.app_volume,
+            func.sum(per_app.c.app_count).over().label("total_count"),
+            func.sum(per_app.c.app_volume).over().label("total_volume"),
+        )
+        .order_by(desc(per_app.c.app_count), desc(per_app.c.app_volume), per_app.c.app)
+        .limit(1)
+    )
+
+
 @router.get("/top-agent", response_model=TopAgentResponse)
 async def get_top_agent(
-    db: Session = Depends(get_db_session)
+    window: str = Query("hour", pattern="^(hour|day|week|custom)$", description="hour|day|week|custom"),
+    date_from: Optional[datetime] = Query(None, description="Window start (custom)"),
+    date_to: Optional[datetime] = Query(None, description="Window end (custom, default now)"),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
-    Get 'Top Agent' statistics for the last hour
+    Get 'Top Agent' statistics for a time window (last hour by default)
     Returns the most active application/operator by transaction count and volume
     """
-    # Define time window (last hour)
     now = datetime.now()
-    hour_ago = now - timedelta(hours=1)
-    
-    # Get transactions in last hour
-    recent_transactions = db.query(Transaction).filter(
-        Transaction.parsed_at >= hour_ago
-    ).all()
-    
-    transaction_count = len(recent_transactions)
-    
-    if transaction_count == 0:
+    if window == "custom":
+        if date_from is None:
+            raise HTTPException(status_code=400, detail="date_from is required for a custom window")
+        period_start, period_end = date_from, date_to or now
+    else:
+        period_start, period_end = now - TOP_AGENT_WINDOWS[window], now
+
+    row = (await db.execute(top_agent_query(period_start, period_end))).first()
+
+    if row is None:
         return TopAgentResponse(
-            period_start=hour_ago,
-            period_end=now,
+            period_start=period_start,
+            period_end=period_end,
             transaction_count=0,
             top_application=None,
             top_application_count=0,
             top_application_volume="0",
             total_volume="0",
-            insight="No transactions in the last hour"
+            insight=f"No transactions in the last {window}" if window != "custom" else "No transactions in this period"
         )
-    
-    # Calculate total volume
-    total_volume = sum(float(t.amount) for t in recent_transactions if t.currency == 'UZS')
-    
-    # Find top application by count
-    app_counts = {}
-    app_volumes = {}
-    
-    for t in recent_transactions:
-        app = t.application_mapped or t.operator_raw or "Unknown"
-        app_counts[app] = app_counts.get(app, 0) + 1
-        if t.currency == 'UZS':
-            app_volumes[app] = app_volumes.get(app, 0) + float(t.amount)
-    
-    top_app = max(app_counts, key=app_counts.get)
-    top_app_count = app_counts[top_app]
-    top_app_volume = app_volumes.get(top_app, 0)
-    
+
+    transaction_count = int(row.total_count)
+    total_volume = Decimal(row.total_volume or 0)
+    top_app = row.app
+    top_app_count = int(row.app_count)
+    top_app_volume = Decimal(row.app_volume or 0)
+
     # Generate insight (could use GPT here for more sophisticated analysis)
     percentage = (top_app_count / transaction_count) * 100
-    
+
     insight = f"Most active: {top_app} with {top_app_count} transaction(s) ({percentage:.1f}% of total). "
-    
+
     if top_app_volume > 0:
         volume_percentage = (top_app_volume / total_volume) * 100 if total_volume > 0 else 0
         insight += f"Volume: {top_app_volume:,.0f} UZS ({volume_percentage:.1f}% of total)."
-    
+
     return TopAgentResponse(
-        period_start=hour_ago,
-        period_end=now,
+        period_start=period_start,
+        period_end=period_end,
         transaction_count=transaction_count,
         top_application=top_app,
         top_application_count=top_app_count,
@@ -96,45 +138,85 @@ async def get_top_agent(
     )
 
 
-@router.get("/summary")
-async def get_summary(
-    db: Session = Depends(get_db_session)
-):
-    """
-    Get overall system statistics
-    """
-    total_transactions = db.query(func.count(Transaction.id)).scalar()
-    
-    # Count by type
-    debit_count = db.query(func.count(Transaction.id)).filter(
-        Transaction.transaction_type == 'DEBIT'
-    ).scalar()
-    
-    credit_count = db.query(func.count(Transaction.id)).filter(
-        Transaction.transaction_type == 'CREDIT'
-    ).scalar()
-    
-    # GPT usage
-    gpt_parsed = db.query(func.count(Transaction.id)).filter(
-        Transaction.is_gpt_parsed == True
-    ).scalar()
-    
-    # Total volume (UZS only)
-    total_volume = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.currency == 'UZS'
-    ).scalar() or 0
-    
-    # Average confidence
-    avg_confidence = db.query(func.avg(Transaction.parsing_confidence)).filter(
-        Transaction.parsing_confidence.isnot(None)
-    ).scalar() or 0
-    
+# Summary is served from Redis while fresh, then stale while one refresh runs
+SUMMARY_FRESH_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL", "15"))
+SUMMARY_KEEP_SECONDS = int(os.getenv("SUMMARY_STALE_TTL", "300"))
+
+
+def summary_query():
+    """Every summary figure from one scan, via conditional aggregates"""
+    return select(
+        func.count(Transaction.id).label("total"),
+        func.count(Transaction.id).filter(Transaction.transaction_type == 'DEBIT').label("debit"),
+        func.count(Transaction.id).filter(Transaction.transaction_type == 'CREDIT').label("credit"),
+        func.count(Transaction.id).filter(Transaction.is_gpt_parsed == True).label("gpt"),
+        func.sum(Transaction.amount).filter(Transaction.currency == 'UZS').label("volume_uzs"),
+        # AVG skips NULL confidences on its own
+        func.avg(Transaction.parsing_confidence).label("avg_confidence"),
+    )
+
+
+async def _compute_summary() -> dict:
+    # Runs in a background refresh too, so it can't borrow the request session;
+    # a lagging replica is fine here, the figures are time-cached anyway
+    async with (await read_session_factory())() as db:
+        row = (await db.execute(summary_query())).one()
+
+    total_transactions = row.total or 0
+    total_volume = row.volume_uzs or 0
+    avg_confidence = row.avg_confidence or 0
     return {
         "total_transactions": total_transactions,
-        "debit_count": debit_count,
-        "credit_count": credit_count,
-        "gpt_parsed_count": gpt_parsed,
-        "gpt_usage_percentage": (gpt_parsed / total_transactions * 100) if total_transactions > 0 else 0,
+        "debit_count": row.debit or 0,
+        "credit_count": row.credit or 0,
+        "gpt_parsed_count": row.gpt or 0,
+        "gpt_usage_percentage": (row.gpt / total_transactions * 100) if total_transactions > 0 else 0,
         "total_volume_uzs": f"{float(total_volume):,.2f}",
         "average_confidence": round(float(avg_confidence), 3)
     }
+
+
+@router.get("/summary")
+async def get_summary():
+    """
+    Get overall system statistics
+
+    Cached for SUMMARY_CACHE_TTL seconds; after that the cached figures are
+    still returned while a single background task recomputes them.
+    """
+    return await cached_with_refresh(
+        "analytics:summary",
+        _compute_summary,
+        fresh_for=SUMMARY_FRESH_SECONDS,
+        keep_for=SUMMARY_KEEP_SECONDS,
+    )
+
+
+@router.get("/series")
+async def get_series(
+    bucket: str = Query("day", pattern="^(minute|hour|day|week)$", description="minute|hour|day|week"),
+    split_by: Optional[str] = Query(None, pattern="^(app|operator|card|type)$", description="One series per app|operator|card|type"),
+    filters: TransactionFilters = Depends(),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Transaction count and volume per time bucket, filtered like the transaction list
+
+    Hour/day/week buckets are summed from the rollup table when the filters
+    allow it; minute buckets and operator splits are grouped from raw checks.
+    Results are cached until a write touches the filtered card/day/app.
+    """
+    try:
+        validate_range(bucket, filters)
+    except InvalidSeries as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    params = {"bucket": bucket, "split_by": split_by, "filters": filters.active()}
+    replica = is_replica(db)
+    return await db.run_sync(lambda session: cached(
+        "series",
+        params,
+        filter_tags(filters),
+        lambda: build_series(session, bucket, filters, split_by),
+        store=not replica,
+    ))
@@ -3,8 +3,8 @@ API Routes for AI-powered Transaction Automation
 Analyzes transactions and suggests application mappings using OpenAI
 """
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, func, select
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from uuid import UUID, uuid4
@@ -16,8 +16,9 @@ import json
 import httpx
 from bs4 import BeautifulSoup
 
-from database.connection import get_db_session
+from database.connection import AsyncSessionLocal, get_async_db_session
 from database.models import Check, OperatorReference
+from services.events import progress_event, publish_event
 
 router = APIRouter(prefix="/api/automation", tags=["automation"])
 
@@ -70,13 +71,20 @@ class AnalyzeStatusResponse(BaseModel):
 tasks_storage = {}
 
 
-def get_existing_applications(db: Session) -> List[str]:
+def _publish_progress(task_id: str):
+    """Push the task's current status to live event clients"""
+    task = tasks_storage[task_id]
+    publish_event(progress_event(task_id, task["status"], task["progress"], results=task.get("results")))
+
+
+async def get_existing_applications(db: AsyncSession) -> List[str]:
     """Get list of existing applications from OperatorReference"""
-    apps = db.query(OperatorReference.application_name)\
-        .distinct()\
-        .filter(OperatorReference.is_active == True)\
-        .all()
-    return [app[0] for app in apps if app[0]]
+    apps = await db.scalars(
+        select(OperatorReference.application_name)
+        .distinct()
+        .filter(OperatorReference.is_active == True)
+    )
+    return [app for app in apps if app]
 
 
 async def search_web_for_operator(operator_raw: str) -> str:
@@ -202,11 +210,11 @@ async def process_transactions_batch(
 ):
     """Process batch of transactions with AI analysis"""
 
-    from database.connection import get_db
-
-    with get_db() as db:
-        transactions = db.query(Check).filter(Check.id.in_(transaction_ids)).order_by(Check.datetime.desc()).all()
-        existing_apps = get_existing_applications(db)
+    async with AsyncSessionLocal() as db:
+        transactions = (await db.execute(
+            select(Check).filter(Check.id.in_(transaction_ids)).order_by(Check.datetime.desc())
+        )).scalars().all()
+        existing_apps = await get_existing_applications(db)
 
     total = len(transactions)
     processed = 0
@@ -219,6 +227,7 @@ async def process_transactions_batch(
         "processed": 0,
         "percent": 0
     }
+    _publish_progress(task_id)
 
     for transaction in transactions:
         try:
@@ -264,6 +273,7 @@ async def process_transactions_batch(
                 "processed": processed,
                 "percent": round((processed / total) * 100, 1)
             }
+            _publish_progress(task_id)
 
             # Rate limiting - не перегружаем API
             await asyncio.sleep(0.5)
@@ -284,18 +294,19 @@ async def process_transactions_batch(
         "high_confidence": high_confidence,
         "low_confidence": low_confidence
     }
+    _publish_progress(task_id)
 
 
 @router.post("/analyze-transactions", response_model=AnalyzeResponse)
 async def analyze_transactions(
     request: AnalyzeRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Start AI analysis of transactions"""
 
     # Build query
-    query = db.query(Check)
+    query = select(Check.id)
 
     if request.only_unmapped:
         query = query.filter(
@@ -308,10 +319,9 @@ async def analyze_transactions(
 
     query = query.order_by(Check.datetime.desc()).limit(request.limit)
 
-    transactions = query.all()
-    transaction_ids = [t.id for t in transactions]
+    transaction_ids = list(await db.scalars(query))
 
-    if not transactions:
+    if not transaction_ids:
         raise HTTPException(status_code=404, detail="No transactions found for analysis")
 
     # Create task
@@ -331,7 +341,7 @@ async def analyze_transactions(
     return AnalyzeResponse(
         task_id=task_id,
         status="started",
-        message=f"Analysis started for {len(transactions)} transactions"
+        message=f"Analysis started for {len(transaction_ids)} transactions"
     )
 
 
@@ -382,7 +392,7 @@ async def get_suggestions(
 @router.post("/suggestions/{suggestion_id}/apply")
 async def apply_suggestion(
     suggestion_id: str,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Apply AI suggestion to transaction"""
 
@@ -400,14 +410,14 @@ async def apply_suggestion(
         raise HTTPException(status_code=404, detail="Suggestion not found")
 
     # Update transaction
-    transaction = db.query(Check).filter(Check.id == int(suggestion["transaction_id"])).first()
+    transaction = await db.get(Check, int(suggestion["transaction_id"]))
 
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
     transaction.app = suggestion["suggested_application"]
     transaction.is_p2p = suggestion["is_p2p"]
-    db.commit()
+    await db.commit()
 
     # Update suggestion status
     suggestion["status"] = "approved"
@@ -432,7 +442,7 @@ async def reject_suggestion(suggestion_id: str):
 @router.post("/suggestions/batch-apply")
 async def batch_apply_suggestions(
     suggestion_ids: List[str],
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Apply multiple suggestions at once"""
 
@@ -0,0 +1,96 @@
+"""
+API Routes for dead-lettered receipts
+Inspect receipts that exhausted their processing attempts and replay them in bulk
+"""
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from workers.dead_letter import DeadLetterQueue
+
+router = APIRouter(prefix="/api/dead-letters", tags=["dead-letters"])
+
+
+# Request/Response Models
+class DeadLetterAttempt(BaseModel):
+    attempt: int
+    error_class: str
+    error: str
+    failed_at: str
+
+
+class DeadLetterResponse(BaseModel):
+    id: str
+    payload: dict
+    error_class: Optional[str]
+    error_message: Optional[str]
+    attempts: List[DeadLetterAttempt]
+    attempt_count: int
+    dead_lettered_at: Optional[str]
+
+
+class DeadLetterListResponse(BaseModel):
+    total: int
+    items: List[DeadLetterResponse]
+
+
+class ReplayRequest(BaseModel):
+    ids: Optional[List[str]] = Field(default=None, description="Entry ids to replay; all entries when omitted")
+    limit: Optional[int] = Field(default=None, ge=1, le=1_000_000)
+    batch_size: int = Field(default=100, ge=1, le=1000)
+
+
+class ReplayResponse(BaseModel):
+    status: str
+    scheduled: int
+    message: str
+
+
+@router.get("", response_model=DeadLetterListResponse)
+async def list_dead_letters(
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Return entries after this entry id")
+):
+    """List dead-lettered receipts, oldest first"""
+    try:
+        dlq = DeadLetterQueue()
+        return DeadLetterListResponse(
+            total=dlq.count(),
+            items=[DeadLetterResponse(**record) for record in dlq.list(limit=limit, after=after)]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read dead letters: {str(e)}")
+
+
+@router.post("/replay", response_model=ReplayResponse)
+async def replay_dead_letters(
+    request: ReplayRequest,
+    background_tasks: BackgroundTasks
+):
+    """Replay dead letters through the batch pipeline in the background"""
+    dlq = DeadLetterQueue()
+    total = dlq.count()
+    if request.ids:
+        scheduled = len(request.ids)
+    else:
+        scheduled = min(total, request.limit) if request.limit else total
+
+    if scheduled == 0:
+        raise HTTPException(status_code=404, detail="No dead letters to replay")
+
+    background_tasks.add_task(dlq.replay, request.ids, request.limit, request.batch_size)
+
+    return ReplayResponse(
+        status="started",
+        scheduled=scheduled,
+        message=f"Replay started for {scheduled} dead letter(s)"
+    )
+
+
+@router.delete("/{entry_id}")
+async def delete_dead_letter(entry_id: str):
+    """Drop a dead letter without replaying it"""
+    deleted = DeadLetterQueue().delete([entry_id])
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Dead letter not found")
+    return {"success": True, "deleted_id": entry_id}
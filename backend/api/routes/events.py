@@ -0,0 +1,37 @@
+"""
+API Routes for live events
+Server-Sent Events stream of transaction changes and background task progress,
+replacing list and task-status polling in the frontend
+"""
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from api.event_stream import event_stream
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    since: Optional[str] = Query(None, description="Resume after this event id (when the header can't be set)"),
+):
+    """
+    Live event stream (text/event-stream)
+
+    Events:
+        change: {"type", "table", "op": insert|update|delete, "ids"?}; no ids
+                means unknown rows changed, refetch the table
+        progress: {"type", "task_id", "status", "progress", "results"}
+        reset: the missed events can't be replayed, refetch everything
+
+    Browsers reconnect on their own and send Last-Event-ID, so no event is
+    lost across a dropped connection.
+    """
+    return StreamingResponse(
+        event_stream(last_event_id or since, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -2,18 +2,21 @@
 Operator Reference API routes
 CRUD operations for operator/seller reference dictionary
 """
-from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File, Request, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, or_, func, select
 from typing import List, Optional
 from pydantic import BaseModel
 from io import BytesIO
 import openpyxl
 from openpyxl.styles import Font, PatternFill
 
-from database.connection import get_db_session
+from api.replicas import get_read_session
+from database.connection import get_async_db_session
 from database.models import OperatorReference
+from api.etags import etag_for, etag_headers, is_not_modified, not_modified_response
+from api.search import contains, similarity, trigram_available, MIN_TRIGRAM_LENGTH
 
 router = APIRouter()
 
@@ -53,26 +56,39 @@ class OperatorReferenceListResponse(BaseModel):
 
 @router.get("/", response_model=OperatorReferenceListResponse)
 async def get_operators(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=500, description="Items per page"),
     search: Optional[str] = Query(None, description="Search in operator or app name"),
     application: Optional[str] = Query(None, description="Filter by application"),
     is_p2p: Optional[bool] = Query(None, description="Filter by P2P status"),
     is_active: Optional[bool] = Query(True, description="Filter by active status"),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Get paginated list of operators"""
-    query = db.query(OperatorReference)
+    etag = await etag_for(request, "operator_reference")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(etag_headers(etag))
+
+    query = select(OperatorReference)
+    order_by = [desc(OperatorReference.id)]
 
     # Apply filters
     if search:
-        search_pattern = f"%{search}%"
         query = query.filter(
             or_(
-                OperatorReference.operator_name.ilike(search_pattern),
-                OperatorReference.application_name.ilike(search_pattern)
+                contains(OperatorReference.operator_name, search),
+                contains(OperatorReference.application_name, search)
             )
         )
+        # Closest names first when pg_trgm can score them
+        if len(search) >= MIN_TRIGRAM_LENGTH and await db.run_sync(trigram_available):
+            order_by.insert(0, desc(func.greatest(
+                similarity(OperatorReference.operator_name, search),
+                similarity(OperatorReference.application_name, search)
+            )))
 
     if application:
         query = query.filter(OperatorReference.application_name == application)
@@ -84,11 +100,11 @@ async def get_operators(
         query = query.filter(OperatorReference.is_active == is_active)
 
     # Get total count
-    total = query.count()
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
 
     # Apply pagination
     offset = (page - 1) * page_size
-    items = query.order_by(desc(OperatorReference.id)).offset(offset).limit(page_size).all()
+    items = (await db.execute(query.order_by(*order_by).offset(offset).limit(page_size))).scalars().all()
 
     return OperatorReferenceListResponse(
         total=total,
@@ -101,30 +117,30 @@ async def get_operators(
 @router.post("/", response_model=OperatorReferenceResponse)
 async def create_operator(
     operator: OperatorReferenceCreate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Create new operator reference"""
     try:
         # Check for duplicates
-        existing = db.query(OperatorReference).filter(
+        existing = (await db.execute(select(OperatorReference).filter(
             OperatorReference.operator_name == operator.operator_name,
             OperatorReference.application_name == operator.application_name
-        ).first()
+        ))).scalars().first()
 
         if existing:
             raise HTTPException(status_code=400, detail="Operator already exists")
 
         new_operator = OperatorReference(**operator.dict())
         db.add(new_operator)
-        db.commit()
-        db.refresh(new_operator)
+        await db.commit()
+        await db.refresh(new_operator)
 
         return new_operator
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create operator: {e}")
 
 
@@ -132,11 +148,11 @@ async def create_operator(
 async def update_operator(
     operator_id: int,
     operator: OperatorReferenceUpdate,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Update operator reference"""
     try:
-        db_operator = db.query(OperatorReference).filter(OperatorReference.id == operator_id).first()
+        db_operator = await db.get(OperatorReference, operator_id)
 
         if not db_operator:
             raise HTTPException(status_code=404, detail="Operator not found")
@@ -146,49 +162,49 @@ async def update_operator(
         for key, value in update_data.items():
             setattr(db_operator, key, value)
 
-        db.commit()
-        db.refresh(db_operator)
+        await db.commit()
+        await db.refresh(db_operator)
 
         return db_operator
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to update operator: {e}")
 
 
 @router.delete("/{operator_id}")
 async def delete_operator(
     operator_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Delete operator reference"""
     try:
-        db_operator = db.query(OperatorReference).filter(OperatorReference.id == operator_id).first()
+        db_operator = await db.get(OperatorReference, operator_id)
 
         if not db_operator:
             raise HTTPException(status_code=404, detail="Operator not found")
 
-        db.delete(db_operator)
-        db.commit()
+        await db.delete(db_operator)
+        await db.commit()
 
         return {"message": "Operator deleted successfully"}
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete operator: {e}")
 
 
 @router.get("/export/excel")
-async def export_to_excel(db: Session = Depends(get_db_session)):
+async def export_to_excel(db: AsyncSession = Depends(get_read_session)):
     """Export operators to Excel file"""
     # Get all active operators
-    operators = db.query(OperatorReference).filter(
+    operators = (await db.execute(select(OperatorReference).filter(
         OperatorReference.is_active == True
-    ).order_by(OperatorReference.application_name, OperatorReference.operator_name).all()
+    ).order_by(OperatorReference.application_name, OperatorReference.operator_name))).scalars().all()
 
     # Create workbook
     wb = openpyxl.Workbook()
@@ -228,7 +244,7 @@ async def export_to_excel(db: Session = Depends(get_db_session)):
 @router.post("/import/excel")
 async def import_from_excel(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Import operators from Excel file"""
     try:
@@ -255,10 +271,10 @@ async def import_from_excel(
                 continue
 
             # Check if exists
-            existing = db.query(OperatorReference).filter(
+            existing = (await db.execute(select(OperatorReference).filter(
                 OperatorReference.operator_name == operator_name,
                 OperatorReference.application_name == application_name
-            ).first()
+            ))).scalars().first()
 
             if existing:
                 skipped += 1
@@ -274,7 +290,7 @@ async def import_from_excel(
             db.add(new_operator)
             imported += 1
 
-        db.commit()
+        await db.commit()
 
         return {
             "imported": imported,
@@ -283,12 +299,19 @@ async def import_from_excel(
         }
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=f"Import failed: {str(e)}")
 
 
 @router.get("/applications")
-async def get_applications(db: Session = Depends(get_db_session)):
+async def get_applications(request: Request, response: Response, db: AsyncSession = Depends(get_async_db_session)):
     """Get list of unique application names"""
-    apps = db.query(OperatorReference.application_name).distinct().order_by(OperatorReference.application_name).all()
-    return [app[0] for app in apps]
+    etag = await etag_for(request, "operator_reference")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers.update(etag_headers(etag))
+
+    apps = await db.scalars(
+        select(OperatorReference.application_name).distinct().order_by(OperatorReference.application_name)
+    )
+    return list(apps)
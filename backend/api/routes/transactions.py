@@ -2,56 +2,37 @@
 Transaction API routes
 Server-side pagination, sorting, and filtering for financial transactions
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
+import asyncio
+
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, asc, desc, extract
-from typing import List, Optional, Callable
+from sqlalchemy import delete, func, select, update
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 from decimal import Decimal
 
-from database.connection import get_db_session
-from database.models import Transaction, Check
-
-# Normalization helpers
-def normalize_source_type(added_via: Optional[str]) -> str:
-    """
-    Map legacy source/added_via values to AUTO|MANUAL
-    """
-    if not added_via:
-        return "MANUAL"
-    value = added_via.strip().lower()
-    if value in {"bot", "auto", "telegram", "userbot"}:
-        return "AUTO"
-    return "MANUAL"
-
-
-def normalize_transaction_type(raw: Optional[str]) -> str:
-    """
-    Map Russian / legacy transaction types to canonical enums
-    """
-    if not raw:
-        return "DEBIT"
-    upper = raw.upper()
-    if upper in {"DEBIT", "CREDIT", "CONVERSION", "REVERSAL"}:
-        return upper
-    mapping = {
-        "СПИСАНИЕ": "DEBIT",
-        "ПОПОЛНЕНИЕ": "CREDIT",
-        "ПОСТУПЛЕНИЕ": "CREDIT",
-        "КОНВЕРСИЯ": "CONVERSION",
-        "ОТМЕНА": "REVERSAL",
-        "OTMENA": "REVERSAL",
-    }
-    return mapping.get(upper, "DEBIT")
+from database.connection import get_async_db_session, is_replica, SessionLocal
+from database.models import Transaction, Check, calendar_values
+from api.facets import DEFAULT_LIMIT, FACETS, MAX_LIMIT, build_facet, facet_filters
+from api.filters import TransactionFilters, normalize_transaction_type, split_csv
+from api.counts import count_checks
+from api.etags import etag_for, etag_headers, is_not_modified, not_modified_response
+from api.export import EXPORT_CHUNK_SIZE, MEDIA_TYPES, WRITERS
+from api.replicas import get_read_session, sync_read_session_factory
+from api.pagination import SORT_KEYS, DEFAULT_SORT, InvalidCursor, apply_cursor, build_page, get_sort_key, order_by_clauses
+from api.serializers import (
+    InvalidFields,
+    RowSerializer,
+    normalize_amount_for_response,
+    normalize_source_type,
+    parse_fields,
+)
+from services.query_cache import cache_stats, cached, filter_tags, row_tags, txn_tag
 
 
-def normalize_amount_for_response(amount: Decimal) -> str:
-    """
-    Present amount as positive string for UI
-    """
-    return f"{abs(Decimal(amount))}"
-
 def compute_weekday_label(dt: datetime) -> str:
     weekdays = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
     return weekdays[dt.weekday()]
@@ -92,10 +73,15 @@ class TransactionResponse(BaseModel):
 
 
 class TransactionListResponse(BaseModel):
-    total: int
+    # None when count=none
+    total: Optional[int]
+    total_is_estimate: bool = False
     page: int
     page_size: int
     items: List[TransactionResponse]
+    # Set in cursor mode only
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
 
 
 # Update/Delete schemas
@@ -153,13 +139,16 @@ class BulkDeleteResponse(BaseModel):
     errors: List[str] = []
 
 
+BULK_UPDATE_MAX_ITEMS = 20000
+
+
 class BulkUpdateItem(BaseModel):
     id: int
     fields: dict
 
 
 class BulkUpdateRequest(BaseModel):
-    updates: List[BulkUpdateItem] = Field(..., min_items=1, max_items=500)
+    updates: List[BulkUpdateItem] = Field(..., min_items=1, max_items=BULK_UPDATE_MAX_ITEMS)
 
 
 class BulkUpdateResponse(BaseModel):
@@ -169,8 +158,13 @@ class BulkUpdateResponse(BaseModel):
     errors: List[str]
 
 
+# The create payload has a field named `datetime`, which would shadow the type
+# inside the class body
+DateTime = datetime
+
+
 class TransactionCreateRequest(BaseModel):
-    datetime: datetime = Field(..., description="Transaction datetime")
+    datetime: DateTime = Field(..., description="Transaction datetime")
     operator: str = Field(..., min_length=1, max_length=255)
     amount: Decimal = Field(..., ge=0)
     card_last4: str = Field(..., pattern=r'^\d{4}$')
@@ -182,84 +176,122 @@ class TransactionCreateRequest(BaseModel):
     raw_text: Optional[str] = None
 
 
-@router.patch("/bulk-update", response_model=BulkUpdateResponse)
-async def bulk_update_transactions(
-    request: BulkUpdateRequest,
-    db: Session = Depends(get_db_session)
-):
-    """
-    Apply multiple updates in one request.
-    """
-    allowed_fields = {
-        "transaction_date",
-        "operator_raw",
-        "application_mapped",
-        "amount",
-        "balance_after",
-        "card_last_4",
-        "transaction_type",
-        "currency",
-        "source_type",
-        "is_p2p",
-    }
-
-    failed_ids: List[int] = []
-    errors: List[str] = []
-    updated_count = 0
+# Bulk update field -> Check column, values are normalized by _plan_bulk_updates
+BULK_UPDATE_COLUMNS = {
+    "transaction_date": "datetime",
+    "operator_raw": "operator",
+    "application_mapped": "app",
+    "amount": "amount",
+    "balance_after": "balance",
+    "card_last_4": "card_last4",
+    "transaction_type": "transaction_type",
+    "currency": "currency",
+    "source_type": "added_via",
+    "is_p2p": "is_p2p",
+}
 
-    try:
-        for item in request.updates:
-            c = db.query(Check).filter(Check.id == item.id).first()
-            if not c:
-                failed_ids.append(item.id)
-                errors.append(f"ID {item.id} not found")
-                continue
+# Ids per IN (...) lookup, keeps each statement well under driver parameter limits
+BULK_FETCH_CHUNK = 5000
 
-            fields = item.fields
-            # reject unknown fields
-            for key in list(fields.keys()):
-                if key not in allowed_fields:
-                    fields.pop(key, None)
 
-            # Normalize fields
-            if "transaction_type" in fields:
-                c.transaction_type = normalize_transaction_type(fields["transaction_type"])
+def _parse_datetime(value):
+    """JSON datetimes arrive as strings; keep the wall-clock time like a timestamp cast would"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    return value
 
-            if "source_type" in fields:
-                src = fields["source_type"]
-                c.added_via = "bot" if src == "AUTO" else "manual"
 
-            if "transaction_date" in fields:
-                c.datetime = fields["transaction_date"]
+def _plan_bulk_updates(updates: List[BulkUpdateItem], current_types: dict):
+    """
+    Turn bulk update items into per-row column values
 
-            if "operator_raw" in fields:
-                c.operator = fields["operator_raw"]
+    Args:
+        updates: Items in request order
+        current_types: Stored transaction_type for every id that exists
 
-            if "application_mapped" in fields:
-                c.app = fields["application_mapped"]
+    Returns:
+        (rows keyed by id, failed_ids, errors, updated_count); repeated ids
+        are merged in request order
+    """
+    rows: dict = {}
+    failed_ids: List[int] = []
+    errors: List[str] = []
+    updated_count = 0
 
-            if "currency" in fields:
-                c.currency = fields["currency"]
+    for item in updates:
+        if item.id not in current_types:
+            failed_ids.append(item.id)
+            errors.append(f"ID {item.id} not found")
+            continue
+
+        # reject unknown fields
+        fields = {k: v for k, v in item.fields.items() if k in BULK_UPDATE_COLUMNS}
+        values = rows.setdefault(item.id, {})
+
+        if "transaction_type" in fields:
+            current_types[item.id] = normalize_transaction_type(fields["transaction_type"])
+            values["transaction_type"] = current_types[item.id]
+        if "source_type" in fields:
+            values["added_via"] = "bot" if fields["source_type"] == "AUTO" else "manual"
+        if "transaction_date" in fields:
+            values["datetime"] = _parse_datetime(fields["transaction_date"])
+            values.update(calendar_values(values["datetime"]))
+        for field in ("operator_raw", "application_mapped", "currency", "card_last_4", "is_p2p", "balance_after"):
+            if field in fields:
+                values[BULK_UPDATE_COLUMNS[field]] = fields[field]
 
-            if "card_last_4" in fields:
-                c.card_last4 = fields["card_last_4"]
+        # Amount normalization: store debits as negative, credits/etc as positive
+        if "amount" in fields:
+            amt = Decimal(str(fields["amount"]))
+            txn_type = current_types[item.id] or normalize_transaction_type(None)
+            values["amount"] = -abs(amt) if txn_type == "DEBIT" else abs(amt)
 
-            if "is_p2p" in fields:
-                c.is_p2p = fields["is_p2p"]
+        updated_count += 1
 
-            if "balance_after" in fields:
-                c.balance = fields["balance_after"]
+    return rows, failed_ids, errors, updated_count
 
-            if "amount" in fields:
-                amt = Decimal(str(fields["amount"]))
-                txn_type = c.transaction_type or normalize_transaction_type(None)
-                store_amount = -abs(amt) if txn_type == "DEBIT" else abs(amt)
-                c.amount = store_amount
 
-            c.updated_at = func.now()
-            updated_count += 1
+@router.patch("/bulk-update", response_model=BulkUpdateResponse)
+async def bulk_update_transactions(
+    request: BulkUpdateRequest,
+    db: AsyncSession = Depends(get_async_db_session)
+):
+    """
+    Apply multiple updates in one request.
 
-        db.commit()
+    Targets are looked up with chunked IN queries and written with one
+    executemany UPDATE per distinct set of changed columns.
+    """
+    try:
+        ids = list(dict.fromkeys(item.id for item in request.updates))
+        current_types = {}
+        current_tags = {}
+        for start in range(0, len(ids), BULK_FETCH_CHUNK):
+            chunk = ids[start:start + BULK_FETCH_CHUNK]
+            for row_id, txn_type, card, when, app in await db.execute(select(
+                Check.id, Check.transaction_type, Check.card_last4, Check.datetime, Check.app
+            ).filter(Check.id.in_(chunk))):
+                current_types[row_id] = txn_type
+                current_tags[row_id] = (card, when, app)
+
+        rows, failed_ids, errors, updated_count = _plan_bulk_updates(request.updates, current_types)
+
+        # Cache tags for the stored and the new card/date/app of every row
+        tags = set()
+        for row_id, values in rows.items():
+            card, when, app = current_tags[row_id]
+            tags.update(row_tags(card, when, app, row_id))
+            tags.update(row_tags(values.get("card_last4", card), values.get("datetime", when), values.get("app", app)))
+
+        # ORM bulk UPDATE by primary key: rows are grouped by key set and sent
+        # with executemany; updated_at is refreshed by the column's onupdate
+        params = [{"id": row_id, **values} for row_id, values in rows.items()]
+        if params:
+            await db.execute(
+                update(Check), params,
+                execution_options={"cache_tags": tags, "event_ids": list(rows)}
+            )
+        await db.commit()
 
         return BulkUpdateResponse(
             success=len(failed_ids) == 0,
@@ -269,146 +301,115 @@ async def bulk_update_transactions(
         )
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Bulk update failed: {str(e)}")
 
 
-def _split_csv(values: Optional[str]) -> List[str]:
-    if not values:
-        return []
-    return [v.strip() for v in values.split(",") if v.strip()]
-
-
 @router.get("/", response_model=TransactionListResponse)
 async def get_transactions(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(100, ge=1, le=1000, description="Items per page"),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$", description="offset: page numbers, cursor: keyset pages"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor/prev_cursor (implies cursor mode)"),
     sort_by: str = Query("transaction_date", description="Sort field"),
     sort_dir: str = Query("desc", description="Sort direction: asc|desc"),
-    date_from: Optional[datetime] = Query(None, description="Start date"),
-    date_to: Optional[datetime] = Query(None, description="End date"),
-    operator: Optional[str] = Query(None, description="Operator contains"),
-    operators: Optional[str] = Query(None, description="Comma-separated operators for IN filter"),
-    app: Optional[str] = Query(None, description="Application contains"),
-    apps: Optional[str] = Query(None, description="Comma-separated apps for IN filter"),
-    amount_min: Optional[Decimal] = Query(None, ge=0),
-    amount_max: Optional[Decimal] = Query(None, ge=0),
-    parsing_method: Optional[str] = Query(None),
-    confidence_min: Optional[float] = Query(None, ge=0.0, le=1.0),
-    confidence_max: Optional[float] = Query(None, ge=0.0, le=1.0),
-    search: Optional[str] = Query(None, description="Free-text search in raw_message"),
-    source_type: Optional[str] = Query(None, pattern="^(AUTO|MANUAL)$"),
-    transaction_type: Optional[str] = Query(None, pattern="^(DEBIT|CREDIT|CONVERSION|REVERSAL)$"),
-    transaction_types: Optional[str] = Query(None, description="Comma-separated transaction types for IN filter"),
-    currency: Optional[str] = Query(None, pattern="^(UZS|USD)$"),
-    card: Optional[str] = Query(None, description="Filter by last 4 digits of card"),
-    days_of_week: Optional[str] = Query(None, description="Comma-separated day of week numbers 0-6"),
-    db: Session = Depends(get_db_session)
+    count: str = Query("auto", pattern="^(auto|exact|estimate|none)$", description="Total: auto|exact|estimate|none"),
+    fields: Optional[str] = Query(None, description="Comma-separated item fields, e.g. to leave out raw_message; default all"),
+    filters: TransactionFilters = Depends(),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     Get paginated list of transactions (Checks) with server-side filters and sorting.
+
+    Offset mode gets slower the deeper the page; cursor mode seeks straight to
+    the page through the (sort column, id) indexes, so every page costs the same.
+    Pair cursor mode with count=none to skip the total entirely.
+
+    Only the columns behind the requested `fields` are selected, and rows are
+    serialized straight to JSON without building a model per row.
+
+    Responses carry a weak ETag; If-None-Match gets a 304 without touching
+    the database while checks are unchanged. Pages are cached in Redis until
+    a write touches the card, day or app they're filtered on.
     """
-    query = db.query(Check)
-
-    # Filters
-    if date_from:
-        query = query.filter(Check.datetime >= date_from)
-    if date_to:
-        query = query.filter(Check.datetime <= date_to)
-    if operator:
-        query = query.filter(Check.operator.ilike(f"%{operator}%"))
-    operator_list = _split_csv(operators)
-    if operator_list:
-        query = query.filter(Check.operator.in_(operator_list))
-    if app:
-        query = query.filter(Check.app.ilike(f"%{app}%"))
-    app_list = _split_csv(apps)
-    if app_list:
-        query = query.filter(Check.app.in_(app_list))
-    if amount_min is not None:
-        query = query.filter(Check.amount >= amount_min)
-    if amount_max is not None:
-        query = query.filter(Check.amount <= amount_max)
-    if parsing_method:
-        query = query.filter(Check.added_via.ilike(f"%{parsing_method}%"))
-    if search:
-        query = query.filter(Check.raw_text.ilike(f"%{search}%"))
-    if source_type:
-        # map AUTO -> bot, MANUAL -> manual
-        if source_type == "AUTO":
-            query = query.filter(Check.added_via.ilike("%bot%"))
-        else:
-            query = query.filter(Check.added_via.ilike("%manual%"))
-    if transaction_type:
-        norm_type = normalize_transaction_type(transaction_type)
-        query = query.filter(Check.transaction_type == norm_type)
-    tx_type_list = _split_csv(transaction_types)
-    if tx_type_list:
-        norm_list = [normalize_transaction_type(t) for t in tx_type_list]
-        query = query.filter(Check.transaction_type.in_(norm_list))
-    if currency:
-        query = query.filter(Check.currency == currency)
-    if card:
-        query = query.filter(Check.card_last4 == card)
-    dow_values = [int(x) for x in _split_csv(days_of_week) if x.isdigit()]
-    if dow_values:
-        query = query.filter(extract("dow", Check.datetime).in_(dow_values))
-
-    total = query.count()
+    etag = await etag_for(request, "checks")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    try:
+        field_names = parse_fields(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Sorting (whitelisted)
-    sort_map: dict[str, Callable] = {
-        "transaction_date": Check.datetime,
-        "amount": Check.amount,
-        "created_at": Check.created_at,
-        "parsing_confidence": Check.metadata_json,  # placeholder for absence, fall back to created_at
-        "updated_at": Check.updated_at,
+    if sort_by not in SORT_KEYS:
+        sort_by = DEFAULT_SORT
+    sort_dir = "desc" if sort_dir.lower() == "desc" else "asc"
+
+    params = {
+        "page": page,
+        "page_size": page_size,
+        "pagination": pagination,
+        "cursor": cursor,
+        "sort": [sort_by, sort_dir],
+        "count": count,
+        "fields": field_names,
+        "filters": filters.active(),
     }
-    sort_column = sort_map.get(sort_by, Check.datetime)
-    order_fn = desc if sort_dir.lower() == "desc" else asc
-    query = query.order_by(order_fn(sort_column), Transaction.id.desc())
+    # Replica reads may lag the versions the cache key and ETag are built from
+    replica = is_replica(db)
+    # The page is built by the sync query helpers, run on the async connection
+    payload = await db.run_sync(lambda session: cached(
+        "transactions",
+        params,
+        filter_tags(filters),
+        lambda: _list_page(session, filters, field_names, page, page_size, pagination, cursor, sort_by, sort_dir, count),
+        store=not replica,
+    ))
+    return JSONResponse(payload, headers=etag_headers(None if replica else etag))
+
+
+def _list_page(db: Session, filters: TransactionFilters, field_names: List[str], page: int, page_size: int,
+               pagination: str, cursor: Optional[str], sort_by: str, sort_dir: str, count: str) -> dict:
+    """Build one list response body from the database"""
+    # The sort column is always selected so cursors can be built from the rows
+    serializer = RowSerializer(field_names, extra_columns=[get_sort_key(sort_by).column])
+    query = filters.apply(db.query(*serializer.columns))
+
+    # Exact totals are cached until the next write; heavy filters get an estimate
+    total, total_is_estimate = count_checks(db, query, filters, count)
 
     # Pagination
-    offset = (page - 1) * page_size
-    rows = query.offset(offset).limit(page_size).all()
-
-    items: List[TransactionResponse] = []
-    for c in rows:
-        canonical_type = normalize_transaction_type(getattr(c, "transaction_type", None))
-        source_val = normalize_source_type(getattr(c, "added_via", None) or getattr(c, "source", None))
-        amount_val = normalize_amount_for_response(getattr(c, "amount", Decimal("0")))
-
-        items.append(TransactionResponse(
-            id=c.id,
-            transaction_date=c.datetime,
-            amount=amount_val,
-            currency=c.currency,
-            card_last_4=c.card_last4,
-            operator_raw=c.operator,
-            application_mapped=c.app,
-            transaction_type=canonical_type,
-            balance_after=str(c.balance) if c.balance is not None else None,
-            source_type=source_val,
-            parsing_method=getattr(c, "added_via", None),
-            parsing_confidence=None,
-            is_p2p=c.is_p2p,
-            created_at=c.created_at,
-            updated_at=getattr(c, "updated_at", None),
-            raw_message=getattr(c, "raw_text", None)
-        ))
-
-    return TransactionListResponse(
-        total=total,
-        page=page,
-        page_size=page_size,
-        items=items
-    )
+    next_cursor = prev_cursor = None
+    if cursor or pagination == "cursor":
+        try:
+            query, backward = apply_cursor(query, sort_by, sort_dir, cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        rows = query.limit(page_size + 1).all()
+        rows, next_cursor, prev_cursor = build_page(rows, page_size, sort_by, sort_dir, cursor, backward)
+    else:
+        query = query.order_by(*order_by_clauses(sort_by, sort_dir))
+        offset = (page - 1) * page_size
+        rows = query.offset(offset).limit(page_size).all()
+
+    # Bypass per-row model validation; the serializer already emits JSON-ready values
+    return {
+        "total": total,
+        "total_is_estimate": total_is_estimate,
+        "page": page,
+        "page_size": page_size,
+        "items": [serializer(row) for row in rows],
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
 
 
 @router.post("/", response_model=TransactionResponse)
 async def create_transaction(
     payload: TransactionCreateRequest,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Manually create a new transaction/check.
@@ -442,8 +443,8 @@ async def create_transaction(
         )
 
         db.add(check)
-        db.commit()
-        db.refresh(check)
+        await db.commit()
+        await db.refresh(check)
 
         return TransactionResponse(
             id=check.id,
@@ -464,23 +465,158 @@ async def create_transaction(
             raw_message=check.raw_text
         )
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Create failed: {str(e)}")
 
 
+# (header, column, converter applied to the raw value)
+EXPORT_COLUMNS = [
+    ("id", Check.id, None),
+    ("transaction_date", Check.datetime, None),
+    ("amount", Check.amount, normalize_amount_for_response),
+    ("currency", Check.currency, None),
+    ("card_last_4", Check.card_last4, None),
+    ("operator_raw", Check.operator, None),
+    ("application_mapped", Check.app, None),
+    ("transaction_type", Check.transaction_type, normalize_transaction_type),
+    ("balance_after", Check.balance, None),
+    ("source_type", Check.added_via, normalize_source_type),
+    ("parsing_method", Check.added_via, None),
+    ("is_p2p", Check.is_p2p, None),
+    ("created_at", Check.created_at, None),
+    ("updated_at", Check.updated_at, None),
+]
+RAW_EXPORT_COLUMN = ("raw_message", Check.raw_text, None)
+
+
+def _export_rows(filters: TransactionFilters, sort_by: str, sort_dir: str, include_raw: bool, session_factory=None):
+    """
+    Yield export rows through a server-side cursor
+
+    Runs with its own session (from `session_factory`, default the primary):
+    the request session is closed before a streaming response starts sending.
+    """
+    export_columns = EXPORT_COLUMNS + ([RAW_EXPORT_COLUMN] if include_raw else [])
+    converters = [(i, convert) for i, (_, _, convert) in enumerate(export_columns) if convert]
+    statement = (
+        filters.apply(select(*[column for _, column, _ in export_columns]))
+        .order_by(*order_by_clauses(sort_by, sort_dir))
+        .execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    db = (session_factory or SessionLocal)()
+    try:
+        for row in db.execute(statement):
+            values = list(row)
+            for i, convert in converters:
+                values[i] = convert(values[i])
+            yield values
+    finally:
+        db.close()
+
+
+@router.get("/export")
+async def export_transactions(
+    request: Request,
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|xlsx)$"),
+    sort_by: str = Query("transaction_date", description="Sort field"),
+    sort_dir: str = Query("desc", description="Sort direction: asc|desc"),
+    include_raw: bool = Query(False, description="Include raw receipt text"),
+    filters: TransactionFilters = Depends()
+):
+    """
+    Stream every transaction matching the list filters as CSV, NDJSON or XLSX
+
+    Rows are read in chunks through a server-side cursor and written as they
+    arrive, so memory use doesn't grow with the size of the export.
+    """
+    if sort_by not in SORT_KEYS:
+        sort_by = DEFAULT_SORT
+    sort_dir = "desc" if sort_dir.lower() == "desc" else "asc"
+
+    headers = [name for name, _, _ in EXPORT_COLUMNS] + ([RAW_EXPORT_COLUMN[0]] if include_raw else [])
+    rows = _export_rows(filters, sort_by, sort_dir, include_raw, await sync_read_session_factory(request))
+    filename = f"transactions_{datetime.now():%Y%m%d_%H%M%S}.{export_format}"
+
+    return StreamingResponse(
+        WRITERS[export_format](headers, rows),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Query cache hit/miss counts, hit ratio and time saved, per cached query
+    """
+    try:
+        return await asyncio.to_thread(cache_stats)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Cache stats unavailable: {str(e)}")
+
+
+@router.get("/facets")
+async def get_facets(
+    fields: str = Query(",".join(FACETS), description="Comma-separated facets: operator,app,card,type"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Values per facet"),
+    q: Optional[str] = Query(None, description="Only values containing this text"),
+    filters: TransactionFilters = Depends(),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Top distinct values with row counts for the filter dropdowns
+
+    Each facet ignores its own filter, so the dropdown still offers the other
+    values. Served from rollups when the other filters allow it and cached
+    until a write touches the filtered card/day/app.
+    """
+    names = split_csv(fields)
+    unknown = [name for name in names if name not in FACETS]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown facets: {', '.join(unknown)}; expected {', '.join(FACETS)}")
+
+    replica = is_replica(db)
+
+    def compute(session: Session) -> dict:
+        facets = {}
+        for name in dict.fromkeys(names):
+            reduced = facet_filters(name, filters)
+            params = {"facet": name, "limit": limit, "q": q, "filters": reduced.active()}
+            facets[name] = cached(
+                "facets", params, filter_tags(reduced),
+                lambda: build_facet(session, name, filters, limit, q),
+                store=not replica,
+            )
+        return facets
+
+    return {"facets": await db.run_sync(compute)}
+
+
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
-    """Get single transaction by ID"""
-    c = db.query(Check).filter(Check.id == transaction_id).first()
+    """Get single transaction by ID, cached until the transaction is written to"""
+    payload = await db.run_sync(lambda session: cached(
+        "transaction",
+        transaction_id,
+        [txn_tag(transaction_id)],
+        lambda: _transaction_payload(session, transaction_id)
+    ))
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return payload
 
+
+def _transaction_payload(db: Session, transaction_id: int) -> Optional[dict]:
+    c = db.query(Check).filter(Check.id == transaction_id).first()
     if not c:
-        raise HTTPException(status_code=404, detail="Transaction not found")
+        return None
 
     canonical_type = normalize_transaction_type(getattr(c, "transaction_type", None))
     source_val = normalize_source_type(getattr(c, "added_via", None) or getattr(c, "source", None))
@@ -503,20 +639,20 @@ async def get_transaction(
         created_at=c.created_at,
         updated_at=getattr(c, "updated_at", None),
         raw_message=getattr(c, "raw_text", None)
-    )
+    ).model_dump(mode="json")
 
 
 @router.put("/{transaction_id}", response_model=TransactionUpdateResponse)
 async def update_transaction(
     transaction_id: int,
     update_data: TransactionUpdateRequest,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Update a transaction by ID (partial updates supported).
     """
     try:
-        c = db.query(Check).filter(Check.id == transaction_id).first()
+        c = await db.get(Check, transaction_id)
 
         if not c:
             raise HTTPException(status_code=404, detail=f"Transaction {transaction_id} not found")
@@ -562,8 +698,8 @@ async def update_transaction(
 
         c.updated_at = func.now()
 
-        db.commit()
-        db.refresh(transaction)
+        await db.commit()
+        await db.refresh(c)
 
         return TransactionUpdateResponse(
             success=True,
@@ -589,29 +725,29 @@ async def update_transaction(
         )
 
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
 
 
 @router.delete("/{transaction_id}", response_model=DeleteResponse)
 async def delete_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Delete a transaction by ID
     """
     try:
-        transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+        transaction = await db.get(Transaction, transaction_id)
 
         if not transaction:
             raise HTTPException(status_code=404, detail=f"Transaction {transaction_id} not found")
 
-        db.delete(transaction)
-        db.commit()
+        await db.delete(transaction)
+        await db.commit()
 
         return DeleteResponse(
             success=True,
@@ -620,28 +756,38 @@ async def delete_transaction(
         )
 
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
 
 
 @router.post("/bulk-delete", response_model=BulkDeleteResponse)
 async def bulk_delete_transactions(
     request: BulkDeleteRequest,
-    db: Session = Depends(get_db_session)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Delete multiple transactions at once
     """
     try:
         ids = request.ids
-        existing_ids = set(id_ for (id_,) in db.query(Check.id).filter(Check.id.in_(ids)).all())
+        existing = (await db.execute(
+            select(Check.id, Check.card_last4, Check.datetime, Check.app).filter(Check.id.in_(ids))
+        )).all()
+        existing_ids = set(row.id for row in existing)
         failed_ids = [i for i in ids if i not in existing_ids]
+        tags = set()
+        for row in existing:
+            tags.update(row_tags(row.card_last4, row.datetime, row.app, row.id))
 
-        deleted_count = db.query(Check).filter(Check.id.in_(existing_ids)).delete(synchronize_session=False)
-        db.commit()
+        result = await db.execute(
+            delete(Check).where(Check.id.in_(existing_ids)),
+            execution_options={"cache_tags": tags, "event_ids": existing_ids, "synchronize_session": False}
+        )
+        deleted_count = result.rowcount
+        await db.commit()
 
         return BulkDeleteResponse(
             success=len(failed_ids) == 0,
@@ -651,5 +797,5 @@ async def bulk_delete_transactions(
         )
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Bulk delete failed: {str(e)}")
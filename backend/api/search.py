@@ -0,0 +1,53 @@
+"""
+Substring search helpers
+On PostgreSQL with pg_trgm the `%term%` ILIKE filters are served by the GIN
+trigram indexes from migration 0002; elsewhere (e.g. SQLite in tests) the
+same expressions fall back to plain LIKE scans
+"""
+from typing import Dict
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+LIKE_ESCAPE = "\\"
+
+# Trigram indexes can't help below three characters, the planner scans anyway
+MIN_TRIGRAM_LENGTH = 3
+
+_trigram_support: Dict[str, bool] = {}
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input only matches literally"""
+    return (
+        term.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace("%", LIKE_ESCAPE + "%")
+        .replace("_", LIKE_ESCAPE + "_")
+    )
+
+
+def contains(column, term: str):
+    """Case-insensitive substring match, index-backed by pg_trgm when installed"""
+    return column.ilike(f"%{escape_like(term)}%", escape=LIKE_ESCAPE)
+
+
+def trigram_available(db: Session) -> bool:
+    """Whether pg_trgm is installed for this database (checked once per engine)"""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _trigram_support:
+        supported = False
+        if bind.dialect.name == "postgresql":
+            try:
+                supported = db.execute(
+                    text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                ).first() is not None
+            except Exception:
+                supported = False
+        _trigram_support[key] = supported
+    return _trigram_support[key]
+
+
+def similarity(column, term: str):
+    """pg_trgm similarity score, only valid when `trigram_available()`"""
+    return func.similarity(column, term)
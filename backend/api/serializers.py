@@ -0,0 +1,121 @@
+"""
+Lean serialization for transaction (Check) list rows
+The list endpoint selects only the columns the requested fields need and turns
+each row tuple into a JSON-ready dict with a serializer planned once per
+request, instead of loading ORM entities and validating a model per row
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from api.filters import normalize_transaction_type
+from database.models import Check
+
+AUTO_SOURCES = frozenset({"bot", "auto", "telegram", "userbot"})
+
+
+def normalize_source_type(added_via: Optional[str]) -> str:
+    """
+    Map legacy source/added_via values to AUTO|MANUAL
+    """
+    if not added_via:
+        return "MANUAL"
+    if added_via.strip().lower() in AUTO_SOURCES:
+        return "AUTO"
+    return "MANUAL"
+
+
+def normalize_amount_for_response(amount: Decimal) -> str:
+    """
+    Present amount as positive string for UI
+    """
+    return f"{abs(Decimal(amount))}"
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _optional_str(value: Any) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def _source_type(added_via: Optional[str], source: Optional[str]) -> str:
+    return normalize_source_type(added_via or source)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+# Response field -> (columns it is computed from, converter taking those values)
+FIELDS: Dict[str, Tuple[Tuple[Any, ...], Callable]] = {
+    "id": ((Check.id,), _identity),
+    "transaction_date": ((Check.datetime,), _isoformat),
+    "amount": ((Check.amount,), normalize_amount_for_response),
+    "currency": ((Check.currency,), _identity),
+    "card_last_4": ((Check.card_last4,), _identity),
+    "operator_raw": ((Check.operator,), _identity),
+    "application_mapped": ((Check.app,), _identity),
+    "transaction_type": ((Check.transaction_type,), normalize_transaction_type),
+    "balance_after": ((Check.balance,), _optional_str),
+    "source_type": ((Check.added_via, Check.source), _source_type),
+    "parsing_method": ((Check.added_via,), _identity),
+    # Checks carry no confidence
+    "parsing_confidence": ((), lambda: None),
+    "is_p2p": ((Check.is_p2p,), _identity),
+    "created_at": ((Check.created_at,), _isoformat),
+    "updated_at": ((Check.updated_at,), _isoformat),
+    "raw_message": ((Check.raw_text,), _identity),
+}
+
+
+class InvalidFields(ValueError):
+    """Raised when `fields=` names something the list can't return"""
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Requested response fields in display order, every field when empty"""
+    if not fields:
+        return list(FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in FIELDS]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+    # id is needed to address rows and build cursors
+    return ["id"] + [f for f in dict.fromkeys(requested) if f != "id"]
+
+
+class RowSerializer:
+    """
+    Projection plus per-field converters for a fixed set of response fields
+
+    `columns` is what the query should select; calling the serializer on a row
+    of those columns returns the response dict.
+    """
+
+    def __init__(self, fields: Sequence[str], extra_columns: Sequence[Any] = ()):
+        self.columns: List[Any] = []
+        positions: Dict[str, int] = {}
+
+        def position(column) -> int:
+            if column.key not in positions:
+                positions[column.key] = len(self.columns)
+                self.columns.append(column)
+            return positions[column.key]
+
+        # (field, column position(s), converter, single column?)
+        self.plan = []
+        for name in fields:
+            columns, convert = FIELDS[name]
+            indexes = tuple(position(c) for c in columns)
+            single = len(indexes) == 1
+            self.plan.append((name, indexes[0] if single else indexes, convert, single))
+        for column in extra_columns:
+            position(column)
+
+    def __call__(self, row: Sequence[Any]) -> Dict[str, Any]:
+        return {
+            name: convert(row[idx]) if single else convert(*[row[i] for i in idx])
+            for name, idx, convert, single in self.plan
+        }
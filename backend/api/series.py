@@ -0,0 +1,181 @@
+"""
+Time-bucketed count/volume series over checks
+Hour, day and week buckets are summed from check_rollups whenever the filters
+only touch rollup dimensions and the date range lines up with the rollup
+grain; anything else (minute buckets, operator splits, substring or amount
+filters) is grouped from raw rows
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from api.filters import TransactionFilters
+from database.models import Check, CheckRollup
+from services.rollups import truncate
+
+# Split -> (raw column, rollup column or None when rollups don't carry it)
+SPLITS = {
+    "app": (Check.app, CheckRollup.app),
+    "card": (Check.card_last4, CheckRollup.card_last4),
+    "type": (Check.transaction_type, CheckRollup.transaction_type),
+    "operator": (Check.operator, None),
+}
+
+# Rollup grain each bucket can be summed from
+ROLLUP_GRAINS = {"hour": "hour", "day": "day", "week": "day"}
+
+# Filters rollups can answer exactly
+ROLLUP_FILTERS = frozenset({"date_from", "date_to", "card", "apps", "transaction_type", "transaction_types", "currency"})
+
+# Longest range per bucket, keeps a response to a few thousand points
+MAX_SPAN = {
+    "minute": timedelta(days=3),
+    "hour": timedelta(days=366),
+}
+
+
+class InvalidSeries(ValueError):
+    """Raised when a series request can't be answered as asked"""
+
+
+def _is_bucket_start(value: datetime, grain: str) -> bool:
+    aligned = value.minute == 0 and value.second == 0 and value.microsecond == 0
+    return aligned and (grain == "hour" or value.hour == 0)
+
+
+def _is_bucket_end(value: datetime, grain: str) -> bool:
+    """Last second of a bucket, as an inclusive date_to usually is"""
+    return _is_bucket_start(value.replace(microsecond=0) + timedelta(seconds=1), grain)
+
+
+def rollup_grain(bucket: str, filters: TransactionFilters, split_by: Optional[str]) -> Optional[str]:
+    """Rollup grain that answers this request exactly, None to read raw rows"""
+    grain = ROLLUP_GRAINS.get(bucket)
+    if grain is None:
+        return None
+    if split_by and SPLITS[split_by][1] is None:
+        return None
+    if set(filters.active()) - ROLLUP_FILTERS:
+        return None
+    if filters.date_from and not _is_bucket_start(filters.date_from, grain):
+        return None
+    if filters.date_to and not _is_bucket_end(filters.date_to, grain):
+        return None
+    return grain
+
+
+def validate_range(bucket: str, filters: TransactionFilters):
+    """
+    Raises:
+        InvalidSeries: if the range would produce too many buckets
+    """
+    limit = MAX_SPAN.get(bucket)
+    if limit is None:
+        return
+    if filters.date_from is None:
+        raise InvalidSeries(f"date_from is required for {bucket} buckets")
+    date_to = filters.date_to or datetime.now(filters.date_from.tzinfo)
+    if date_to - filters.date_from > limit:
+        raise InvalidSeries(f"{bucket} buckets are limited to {limit.days} days")
+
+
+def apply_rollup_filters(statement, grain: str, filters: TransactionFilters):
+    """Restrict a select() over check_rollups to `grain` and the ROLLUP_FILTERS"""
+    statement = statement.where(CheckRollup.grain == grain)
+    if filters.date_from:
+        statement = statement.where(CheckRollup.bucket >= filters.date_from)
+    if filters.date_to:
+        statement = statement.where(CheckRollup.bucket <= filters.date_to)
+    if filters.card:
+        statement = statement.where(CheckRollup.card_last4 == filters.card)
+    if filters.apps:
+        statement = statement.where(CheckRollup.app.in_(filters.apps))
+    if filters.transaction_type:
+        statement = statement.where(CheckRollup.transaction_type == filters.transaction_type)
+    if filters.transaction_types:
+        statement = statement.where(CheckRollup.transaction_type.in_(filters.transaction_types))
+    if filters.currency:
+        statement = statement.where(CheckRollup.currency == filters.currency)
+    return statement
+
+
+def _rollup_statement(grain: str, bucket: str, filters: TransactionFilters, split_by: Optional[str], dialect_name: str):
+    time_bucket = truncate("week", CheckRollup.bucket, dialect_name) if bucket == "week" else CheckRollup.bucket
+    split = SPLITS[split_by][1] if split_by else None
+    columns = [time_bucket, CheckRollup.currency, func.sum(CheckRollup.tx_count), func.sum(CheckRollup.amount_abs_sum)]
+    group_by = [time_bucket, CheckRollup.currency]
+    if split is not None:
+        columns.insert(1, split)
+        group_by.append(split)
+
+    statement = apply_rollup_filters(select(*columns), grain, filters)
+    return statement.group_by(*group_by).order_by(time_bucket)
+
+
+def _raw_statement(bucket: str, filters: TransactionFilters, split_by: Optional[str], dialect_name: str):
+    time_bucket = truncate(bucket, Check.datetime, dialect_name)
+    split = SPLITS[split_by][0] if split_by else None
+    columns = [time_bucket, Check.currency, func.count(Check.id), func.sum(func.abs(Check.amount))]
+    group_by = [time_bucket, Check.currency]
+    if split is not None:
+        columns.insert(1, split)
+        group_by.append(split)
+    return filters.apply(select(*columns)).group_by(*group_by).order_by(time_bucket)
+
+
+def _as_datetime(value: Any) -> datetime:
+    # SQLite's strftime hands back strings
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def build_series(db: Session, bucket: str, filters: TransactionFilters, split_by: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Count and absolute volume per bucket, one series per split value
+
+    Volume is the sum of absolute amounts, reported per currency; rollups
+    keep it in amount_abs_sum, since a type's amounts can carry both signs.
+
+    Returns:
+        {"bucket", "split_by", "source": "rollups"|"raw", "series": [
+            {"key", "points": [{"t", "count", "volume": {currency: amount}}]}
+        ]}
+    """
+    dialect_name = db.get_bind().dialect.name
+    grain = rollup_grain(bucket, filters, split_by)
+    if grain:
+        statement = _rollup_statement(grain, bucket, filters, split_by, dialect_name)
+    else:
+        statement = _raw_statement(bucket, filters, split_by, dialect_name)
+
+    series: Dict[Optional[str], Dict[datetime, dict]] = {}
+    for row in db.execute(statement):
+        if split_by:
+            time_bucket, key, currency, count, volume = row
+            # Rollups store missing apps/cards as ''
+            key = key or ""
+        else:
+            time_bucket, currency, count, volume = row
+            key = None
+        point = series.setdefault(key, {}).setdefault(
+            _as_datetime(time_bucket), {"count": 0, "volume": {}}
+        )
+        point["count"] += int(count)
+        amount = Decimal(str(volume or 0)).quantize(Decimal("0.01"))
+        point["volume"][currency] = str(Decimal(point["volume"].get(currency, "0")) + amount)
+
+    result: List[dict] = []
+    for key in sorted(series, key=lambda k: k or ""):
+        points = series[key]
+        result.append({
+            "key": key if key is not None else "all",
+            "points": [{"t": t.isoformat(), **points[t]} for t in sorted(points)],
+        })
+    return {
+        "bucket": bucket,
+        "split_by": split_by,
+        "source": "rollups" if grain else "raw",
+        "series": result,
+    }
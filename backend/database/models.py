@@ -4,8 +4,8 @@ SQLAlchemy ORM Models for Uzbek Receipt Parser
 from datetime import datetime
 from typing import Optional
 from sqlalchemy import (
-    BigInteger, Boolean, CheckConstraint, Column, DateTime, 
-    Float, Integer, Numeric, String, Text, Index
+    BigInteger, Boolean, CheckConstraint, Column, Date, DateTime, 
+    Float, Integer, Numeric, SmallInteger, String, Text, Index, event
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
@@ -19,6 +19,9 @@ class Transaction(Base):
     """Model for financial transactions parsed from receipts"""
     __tablename__ = 'transactions'
     
+    # Partitioned by month on transaction_date in PostgreSQL (migration 0006),
+    # where the primary key is (id, transaction_date); rows are still
+    # identified by id alone here
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     uuid = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, nullable=False)
     
@@ -80,6 +83,8 @@ class Check(Base):
     """Model for checks table from receipt_parser_dump.sql"""
     __tablename__ = 'checks'
     
+    # Partitioned by month on datetime in PostgreSQL (migration 0006), where
+    # the primary key is (id, datetime); rows are still identified by id alone here
     id = Column(Integer, primary_key=True, autoincrement=True)
     check_id = Column(UUID(as_uuid=True), default=uuid.uuid4)
     
@@ -89,6 +94,13 @@ class Check(Base):
     date_display = Column(String(10), nullable=False)
     time_display = Column(String(5), nullable=False)
     
+    # Calendar parts of `datetime` (local wall-clock time) for index-backed
+    # weekday/hour filters; kept in sync by a trigger (migration 0004) and by
+    # calendar_values() on the ORM side
+    dow = Column(SmallInteger)  # 0 = Sunday, as EXTRACT(dow)
+    hour = Column(SmallInteger)
+    local_date = Column(Date)
+    
     operator = Column(String(255), nullable=False)
     app = Column(String(100))
     amount = Column(Numeric(15, 2), nullable=False)
@@ -125,12 +137,43 @@ class Check(Base):
         Index('idx_checks_app', 'app'),
         Index('idx_checks_source', 'source'),
         Index('idx_checks_check_id', 'check_id'),
+        # Keyset pagination: one (sort column, id) index per sortable field
+        Index('idx_checks_datetime_id', 'datetime', 'id'),
+        Index('idx_checks_amount_id', 'amount', 'id'),
+        Index('idx_checks_created_at_id', 'created_at', 'id'),
+        Index('idx_checks_updated_at_id', 'updated_at', 'id'),
+        # Equality filters the list is usually narrowed by, ordered like the
+        # default sort so filtered pages seek instead of sorting (migration 0005)
+        Index('idx_checks_card_datetime_id', 'card_last4', 'datetime', 'id'),
+        Index('idx_checks_app_datetime_id', 'app', 'datetime', 'id'),
+        Index('idx_checks_operator_datetime_id', 'operator', 'datetime', 'id'),
+        Index('idx_checks_currency_datetime_id', 'currency', 'datetime', 'id'),
+        # Weekday / hour-of-day slices, ordered like the default list sort
+        Index('idx_checks_dow_datetime_id', 'dow', 'datetime', 'id'),
+        Index('idx_checks_hour_datetime_id', 'hour', 'datetime', 'id'),
+        Index('idx_checks_local_date', 'local_date'),
+        # pg_trgm GIN indexes for substring search live in migration 0002 only,
+        # create_all can't assume the extension exists
     )
     
     def __repr__(self):
         return f"<Check(id={self.id}, date={self.datetime}, operator={self.operator}, amount={self.amount} {self.currency})>"
 
 
+def calendar_values(value: Optional[datetime]) -> dict:
+    """Check.dow/hour/local_date for a check dated `value`"""
+    if value is None:
+        return {"dow": None, "hour": None, "local_date": None}
+    return {"dow": value.isoweekday() % 7, "hour": value.hour, "local_date": value.date()}
+
+
+@event.listens_for(Check.datetime, 'set')
+def _sync_calendar_columns(target, value, oldvalue, initiator):
+    if isinstance(value, datetime):
+        for name, part in calendar_values(value).items():
+            setattr(target, name, part)
+
+
 class OperatorMapping(Base):
     """Model for operator name to application mapping rules"""
     __tablename__ = 'operator_mappings'
@@ -188,6 +231,40 @@ class HourlyReport(Base):
         return f"<HourlyReport(hour={self.report_hour}, transactions={self.transaction_count})>"
 
 
+class CheckRollup(Base):
+    """
+    Per-bucket aggregates of checks (hour or day x app x card x type x currency)
+
+    Kept current by the check_rollups trigger from migration 0003 (0007 for
+    amount_abs_sum); rebuilt
+    from raw rows with scripts/rebuild_rollups.py. Empty app/card are ''.
+    """
+    __tablename__ = 'check_rollups'
+
+    grain = Column(String(4), primary_key=True)
+    bucket = Column(DateTime(timezone=False), primary_key=True)
+    app = Column(String(100), primary_key=True, default='')
+    card_last4 = Column(String(4), primary_key=True, default='')
+    transaction_type = Column(String(50), primary_key=True)
+    currency = Column(String(10), primary_key=True)
+
+    tx_count = Column(BigInteger, nullable=False)
+    amount_sum = Column(Numeric(18, 2), nullable=False)
+    # Sum of ABS(amount): a type's rows can carry both signs, so volume
+    # can't be derived from amount_sum
+    amount_abs_sum = Column(Numeric(18, 2), nullable=False, default=0)
+    amount_min = Column(Numeric(15, 2), nullable=False)
+    amount_max = Column(Numeric(15, 2), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("grain IN ('hour', 'day')", name='check_rollup_grain'),
+        Index('idx_check_rollups_grain_bucket', 'grain', 'bucket'),
+    )
+
+    def __repr__(self):
+        return f"<CheckRollup({self.grain} {self.bucket}, app={self.app}, count={self.tx_count})>"
+
+
 class OperatorReference(Base):
     """Model for operator/seller reference dictionary"""
     __tablename__ = 'operator_reference'
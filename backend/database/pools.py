@@ -0,0 +1,323 @@
+"""
+Connection pool sizing per process role, and pool telemetry
+DB_ROLE (api, worker, batch) sets the connection budget a process may open to
+each database server; the sync and async engines for that server split it.
+Each pool counts checkouts, timeouts and connects and times checkout waits and
+new connections; processes publish snapshots to Redis so the API can show
+connection use across the fleet.
+"""
+import os
+import json
+import time
+import socket
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from services.redis_client import get_redis
+from workers.queues import POOL_STATS_KEY
+
+# Defaults per role; each can be overridden with DB_<SETTING>_<ROLE>,
+# e.g. DB_POOL_SIZE_WORKER=5 or DB_POOL_TIMEOUT_API=10
+ROLE_POOL_DEFAULTS = {
+    # Request handlers: many concurrent sessions
+    "api": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30.0, "pool_recycle": -1},
+    # Celery children and queue consumers: one or two sessions at a time
+    "worker": {"pool_size": 3, "max_overflow": 2, "pool_timeout": 30.0, "pool_recycle": -1},
+    # Maintenance scripts: a single session
+    "batch": {"pool_size": 2, "max_overflow": 0, "pool_timeout": 30.0, "pool_recycle": -1},
+}
+
+DB_ROLE = os.getenv("DB_ROLE", "api")
+
+# Engine that carries each role's load: the API serves requests through the
+# async engines, workers and scripts use sync sessions
+ROLE_MAIN_DRIVER = {"api": "async", "worker": "sync", "batch": "sync"}
+# Carved out of the budget for the role's other engine (API health checks
+# and streaming exports, the odd sync call in a worker)
+MINOR_POOL_SIZE = int(os.getenv("DB_MINOR_POOL_SIZE", "1"))
+MINOR_MAX_OVERFLOW = int(os.getenv("DB_MINOR_MAX_OVERFLOW", "1"))
+
+# Seconds between snapshots published to Redis; entries not refreshed for
+# three intervals belong to stopped processes and are dropped
+POOL_STATS_INTERVAL = float(os.getenv("POOL_STATS_INTERVAL", "15"))
+
+
+def pool_options(role: str = DB_ROLE) -> dict:
+    """
+    create_engine() pool arguments for a process role
+
+    Raises:
+        ValueError: Unknown role
+    """
+    if role not in ROLE_POOL_DEFAULTS:
+        raise ValueError(f"Unknown DB_ROLE {role!r}, expected one of {', '.join(ROLE_POOL_DEFAULTS)}")
+    options = {}
+    for name, default in ROLE_POOL_DEFAULTS[role].items():
+        value = os.getenv(f"DB_{name.upper()}_{role.upper()}")
+        options[name] = type(default)(value) if value else default
+    return options
+
+
+def engine_pool_options(driver: str, role: str = DB_ROLE) -> dict:
+    """
+    create_engine() pool arguments for the role's sync or async engine
+
+    Both engines for one server stay within the role's budget together: the
+    engine the role mostly uses gets the budget minus a minimal pool for the
+    other one. Neither pool_size drops below 1 (0 would mean no limit), so a
+    budget of a single connection ends up one over.
+
+    Raises:
+        ValueError: Unknown role or driver
+    """
+    if driver not in ("sync", "async"):
+        raise ValueError(f"Unknown driver {driver!r}, expected sync or async")
+    budget = pool_options(role)
+    minor_size = MINOR_POOL_SIZE
+    minor_overflow = min(MINOR_MAX_OVERFLOW, budget["max_overflow"])
+    if driver != ROLE_MAIN_DRIVER[role]:
+        return dict(budget, pool_size=minor_size, max_overflow=minor_overflow)
+    return dict(
+        budget,
+        pool_size=max(budget["pool_size"] - minor_size, 1),
+        max_overflow=budget["max_overflow"] - minor_overflow,
+    )
+
+
+class PoolMetrics:
+    """Counters and timings of one engine's pool since the process started"""
+
+    def __init__(self, name: str, engine, options: dict, server: str = "primary"):
+        self.name = name
+        self.server = server
+        self.engine = engine
+        self.options = options
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.peak_checked_out = 0
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.connects = 0
+        self.connect_errors = 0
+        self.connect_total_ms = 0.0
+        self.connect_max_ms = 0.0
+
+    def record_checkout(self):
+        checked_out = self.engine.pool.checkedout()
+        with self._lock:
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_wait(self, elapsed_ms: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_connect(self, elapsed_ms: float, failed: bool = False):
+        with self._lock:
+            if failed:
+                self.connect_errors += 1
+                return
+            self.connects += 1
+            self.connect_total_ms += elapsed_ms
+            self.connect_max_ms = max(self.connect_max_ms, elapsed_ms)
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        pool = self.engine.pool
+        capacity = self.options["pool_size"] + self.options["max_overflow"]
+        checked_out = pool.checkedout()
+        with self._lock:
+            return {
+                "pool": self.name,
+                "server": self.server,
+                "size": self.options["pool_size"],
+                "max_overflow": self.options["max_overflow"],
+                "timeout": self.options["pool_timeout"],
+                "checked_out": checked_out,
+                "idle": pool.checkedin(),
+                # Negative while the pool holds fewer than pool_size connections
+                "overflow": max(pool.overflow(), 0),
+                "utilization": round(checked_out / capacity, 3) if capacity else 0,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "wait_ms_avg": round(self.wait_total_ms / self.wait_count, 2) if self.wait_count else 0,
+                "wait_ms_max": round(self.wait_max_ms, 2),
+                "connects": self.connects,
+                "connect_errors": self.connect_errors,
+                "connect_ms_avg": round(self.connect_total_ms / self.connects, 2) if self.connects else 0,
+                "connect_ms_max": round(self.connect_max_ms, 2),
+            }
+
+
+# Keyed by pool name (the engine's pool_logging_name, kept across dispose())
+POOL_METRICS: Dict[str, PoolMetrics] = {}
+
+
+class _TimedCheckout:
+    """
+    Times Pool.connect(): queue wait, opening a new connection and the pre-ping
+
+    Pool events fire only once a connection was handed out, so the wait
+    (and a checkout that gives up with TimeoutError) is measured here.
+    """
+
+    def connect(self):
+        metrics = POOL_METRICS.get(self.logging_name)
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if metrics:
+                metrics.record_wait((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        if metrics:
+            metrics.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument(engine, name: str, options: dict, server: str = "primary") -> PoolMetrics:
+    """
+    Register pool metrics for an engine created with a Timed*QueuePool and
+    pool_logging_name=name; accepts sync and async engines. `server` (primary
+    or replica) is the database the pool connects to.
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    metrics = POOL_METRICS[name] = PoolMetrics(name, engine, options, server)
+
+    @event.listens_for(engine, "do_connect")
+    def timed_connect(dialect, conn_rec, cargs, cparams):
+        started = time.perf_counter()
+        try:
+            connection = dialect.connect(*cargs, **cparams)
+        except Exception:
+            metrics.record_connect(0, failed=True)
+            raise
+        metrics.record_connect((time.perf_counter() - started) * 1000)
+        return connection
+
+    event.listen(engine, "checkout", lambda *args: metrics.record_checkout())
+    event.listen(engine, "invalidate", lambda *args: metrics.record_invalidation())
+    return metrics
+
+
+def process_id() -> str:
+    return f"{DB_ROLE}:{socket.gethostname()}:{os.getpid()}"
+
+
+def process_snapshot() -> dict:
+    """Pool metrics of this process"""
+    return {
+        "process": process_id(),
+        "role": DB_ROLE,
+        "reported_at": time.time(),
+        "pools": [metrics.snapshot() for metrics in POOL_METRICS.values()],
+    }
+
+
+def publish_snapshot() -> Optional[dict]:
+    """Store this process's snapshot in the fleet hash (skipped before any engine exists)"""
+    if not POOL_METRICS:
+        return None
+    snapshot = process_snapshot()
+    get_redis().hset(POOL_STATS_KEY, snapshot["process"], json.dumps(snapshot))
+    return snapshot
+
+
+def _report_forever(interval: float):
+    timeouts = {}
+    while True:
+        time.sleep(interval)
+        try:
+            snapshot = publish_snapshot()
+        except Exception as e:
+            print(f"⚠️  Could not publish pool stats: {e}")
+            continue
+        for pool in (snapshot or {}).get("pools", []):
+            new = pool["timeouts"] - timeouts.get(pool["pool"], 0)
+            timeouts[pool["pool"]] = pool["timeouts"]
+            if new:
+                print(
+                    f"⚠️  Pool {pool['pool']} ({DB_ROLE}): {new} checkout timeouts, "
+                    f"peak {pool['peak_checked_out']}/{pool['size'] + pool['max_overflow']} connections"
+                )
+
+
+_reporter: Optional[threading.Thread] = None
+
+
+def start_reporter(interval: float = POOL_STATS_INTERVAL):
+    """Publish snapshots every `interval` seconds from a daemon thread (once per process)"""
+    global _reporter
+    if interval <= 0 or (_reporter is not None and _reporter.is_alive()):
+        return
+    _reporter = threading.Thread(target=_report_forever, args=(interval,), name="pool-stats", daemon=True)
+    _reporter.start()
+
+
+def fleet_snapshot(now: Optional[float] = None) -> dict:
+    """
+    Latest snapshot of every process that reported recently, with totals per role
+
+    Returns:
+        {"processes": [...], "roles": {role: {"processes", "connections",
+        "checked_out", "capacity", "replica_connections", "replica_capacity",
+        "timeouts"}}}; capacity is how many connections the role may open to
+        the primary at most (pool_size + max_overflow summed over its pools),
+        replica_capacity the same for the read replica
+    """
+    now = now or time.time()
+    client = get_redis()
+    processes, stale = [], []
+    for field, payload in client.hgetall(POOL_STATS_KEY).items():
+        snapshot = json.loads(payload)
+        if now - snapshot["reported_at"] > POOL_STATS_INTERVAL * 3:
+            stale.append(field)
+        else:
+            processes.append(snapshot)
+    if stale:
+        client.hdel(POOL_STATS_KEY, *stale)
+
+    roles = {}
+    for snapshot in processes:
+        totals = roles.setdefault(
+            snapshot["role"],
+            {
+                "processes": 0, "connections": 0, "checked_out": 0, "capacity": 0,
+                "replica_connections": 0, "replica_capacity": 0, "timeouts": 0,
+            },
+        )
+        totals["processes"] += 1
+        for pool in snapshot["pools"]:
+            # Snapshots from before pools were labelled by server were all primary
+            if pool.get("server", "primary") == "replica":
+                totals["replica_connections"] += pool["checked_out"] + pool["idle"]
+                totals["replica_capacity"] += pool["size"] + pool["max_overflow"]
+            else:
+                totals["connections"] += pool["checked_out"] + pool["idle"]
+                totals["checked_out"] += pool["checked_out"]
+                totals["capacity"] += pool["size"] + pool["max_overflow"]
+            totals["timeouts"] += pool["timeouts"]
+    return {"processes": sorted(processes, key=lambda s: s["process"]), "roles": roles}
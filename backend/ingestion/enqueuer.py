@@ -0,0 +1,122 @@
+"""
+Micro-batched Redis enqueue shared by the ingestion processes
+Coalesces receipts that arrive within a few milliseconds of each other into one
+pipelined Redis write, so bursts from large chats cost one round trip per batch
+"""
+import os
+import asyncio
+from typing import Any, Callable, List, Optional, Tuple
+
+from ingestion.receipts import add_to_pipeline
+
+ENQUEUE_MAX_BATCH = int(os.getenv("ENQUEUE_MAX_BATCH", "200"))
+ENQUEUE_MAX_DELAY_MS = float(os.getenv("ENQUEUE_MAX_DELAY_MS", "5"))
+ENQUEUE_MAX_PENDING = int(os.getenv("ENQUEUE_MAX_PENDING", "10000"))
+
+# Extra pipeline commands queued alongside a receipt (e.g. moving a checkpoint)
+PipelineHook = Callable[[Any], None]
+
+_CLOSE = object()
+
+
+class BatchingEnqueuer:
+    """
+    Async batching writer for routed receipts
+
+    Callers await `enqueue()` until their receipt is written, so errors still
+    reach the handler that produced the receipt. Buffering is bounded: once
+    `max_pending` receipts are waiting, `enqueue()` applies backpressure.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        max_batch: int = ENQUEUE_MAX_BATCH,
+        max_delay_ms: float = ENQUEUE_MAX_DELAY_MS,
+        max_pending: int = ENQUEUE_MAX_PENDING,
+    ):
+        self.redis_client = redis_client
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # Counters for logging/monitoring
+        self.batches_written = 0
+        self.items_written = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def enqueue(self, key: str, payload: Any, hook: Optional[PipelineHook] = None):
+        """Queue a receipt routed by `route_receipt` and wait until it is written"""
+        if self.closed:
+            raise RuntimeError("Enqueuer is closed")
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, payload, hook, future))
+        await future
+
+    async def close(self):
+        """Flush everything still buffered and stop the writer"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.task is None:
+            return
+        await self.queue.put(_CLOSE)
+        await self.task
+        print(f"✅ Enqueuer flushed: {self.items_written} receipts in {self.batches_written} batches")
+
+    async def _run(self):
+        while True:
+            item = await self.queue.get()
+            if item is _CLOSE:
+                return
+
+            # Give concurrent handlers a few milliseconds to join this batch
+            if self.queue.qsize() < self.max_batch - 1 and self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+
+            batch = [item]
+            closing = False
+            while len(batch) < self.max_batch and not self.queue.empty():
+                next_item = self.queue.get_nowait()
+                if next_item is _CLOSE:
+                    closing = True
+                    break
+                batch.append(next_item)
+
+            await self._flush(batch)
+            if closing:
+                # Drain whatever was queued before close() without waiting
+                remaining = []
+                while not self.queue.empty():
+                    remaining.append(self.queue.get_nowait())
+                for start in range(0, len(remaining), self.max_batch):
+                    await self._flush(remaining[start:start + self.max_batch])
+                return
+
+    async def _flush(self, batch: List[Tuple[str, Any, Optional[PipelineHook], asyncio.Future]]):
+        # Any failure, building the batch included, must reach the waiting
+        # handlers; an exception escaping here would kill the writer task
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, payload, hook, _ in batch:
+                add_to_pipeline(pipe, key, payload)
+                if hook is not None:
+                    hook(pipe)
+            await pipe.execute()
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_written += 1
+        self.items_written += len(batch)
+        for *_, future in batch:
+            if not future.done():
+                future.set_result(None)
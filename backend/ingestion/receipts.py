@@ -0,0 +1,88 @@
+"""
+Receipt detection and queue payloads shared by the ingestion processes
+"""
+import os
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple, Union
+
+from workers.queues import RECEIPT_QUEUE, PARSED_STREAM
+
+# Parse common formats in the ingestion process and skip the worker's parsing round trip
+EDGE_PARSING = os.getenv("EDGE_PARSING", "False") == "True"
+
+# Approximate cap on the parsed stream; entries are acknowledged as soon as they are inserted
+PARSED_STREAM_MAXLEN = int(os.getenv("PARSED_STREAM_MAXLEN", "100000"))
+
+# Receipt indicators used to filter obvious non-receipts before queuing
+RECEIPT_KEYWORDS = ['UZS', 'USD', 'summa', 'karta', 'HUMOCARD', 'oplata', 'Оплата', 'Пополнение']
+MIN_RECEIPT_LENGTH = 20
+
+
+def looks_like_receipt(raw_text: Optional[str]) -> bool:
+    """Cheap pre-filter: long enough and contains at least one receipt keyword"""
+    if not raw_text or len(raw_text) < MIN_RECEIPT_LENGTH:
+        return False
+    return any(keyword in raw_text for keyword in RECEIPT_KEYWORDS)
+
+
+def build_task_data(
+    raw_text: str,
+    source_type: str,
+    source_chat_id: int,
+    source_message_id: int,
+    timestamp: Optional[datetime] = None,
+    **extra: Any
+) -> Dict[str, Any]:
+    """Build the payload pushed to the receipt queue"""
+    task_data = {
+        'raw_text': raw_text,
+        'source_type': source_type,
+        'source_chat_id': source_chat_id,
+        'source_message_id': source_message_id,
+        'timestamp': (timestamp or datetime.now()).isoformat(),
+    }
+    task_data.update(extra)
+    return task_data
+
+
+def create_edge_parser():
+    """Build the edge parser when EDGE_PARSING is enabled, None otherwise"""
+    if not EDGE_PARSING:
+        return None
+
+    from parsers.edge_parser import EdgeParser
+
+    edge_parser = EdgeParser()
+    try:
+        edge_parser.refresh_mappings()
+        print(f"✅ Edge parsing enabled ({len(edge_parser.operator_mapper.mappings_cache)} operator mappings)")
+    except Exception as e:
+        # Without mappings the edge parser defers everything to the worker until a refresh succeeds
+        print(f"⚠️  Edge parsing waiting for operator mappings: {e}")
+    return edge_parser
+
+
+def route_receipt(task_data: Dict[str, Any], edge_parser=None) -> Tuple[str, Union[str, Dict[str, str]]]:
+    """
+    Decide where a receipt goes
+
+    Returns:
+        (PARSED_STREAM, stream fields) when the edge parser handled it,
+        (RECEIPT_QUEUE, JSON payload) when it needs the full worker pipeline
+    """
+    if edge_parser is not None:
+        parsed_data = edge_parser.parse(task_data['raw_text'])
+        if parsed_data:
+            from parsers.edge_parser import encode_parsed
+
+            return PARSED_STREAM, encode_parsed(task_data, parsed_data)
+    return RECEIPT_QUEUE, json.dumps(task_data, ensure_ascii=False, default=str)
+
+
+def add_to_pipeline(pipe, key: str, payload: Union[str, Dict[str, str]]):
+    """Queue a routed receipt on a Redis pipeline"""
+    if key == PARSED_STREAM:
+        pipe.xadd(key, payload, maxlen=PARSED_STREAM_MAXLEN, approximate=True)
+    else:
+        pipe.rpush(key, payload)
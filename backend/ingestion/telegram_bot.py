@@ -3,13 +3,19 @@ Telegram Bot using Aiogram 3.x for manual receipt input
 Handles user messages and forwards to processing queue
 """
 import os
+import json
 import asyncio
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.exceptions import TelegramBadRequest
 from dotenv import load_dotenv
 import redis.asyncio as aioredis
-import json
+
+from ingestion.receipts import build_task_data, create_edge_parser, route_receipt
+from ingestion.enqueuer import BatchingEnqueuer
+from workers.queues import RESULT_CHANNEL
+from workers.results import STATUS_DONE, STATUS_RETRYING
 
 load_dotenv()
 
@@ -25,11 +31,63 @@ dp = Dispatcher(storage=storage)
 # Redis connection for queue
 redis_client = None
 
+# Coalesces receipts from concurrent chats into pipelined writes
+enqueuer = None
+
+# Local regex parser when EDGE_PARSING is enabled
+edge_parser = None
+
 
 async def init_redis():
     """Initialize Redis connection"""
-    global redis_client
+    global redis_client, enqueuer
     redis_client = await aioredis.from_url(REDIS_URL, decode_responses=True)
+    enqueuer = BatchingEnqueuer(redis_client)
+
+
+def format_result(event: dict) -> str:
+    """Status message text for a completion event published by the worker"""
+    status = event.get('status')
+    if status == STATUS_DONE:
+        lines = [
+            "✅ Чек обработан",
+            f"💰 Сумма: {event.get('amount')} {event.get('currency') or ''}".rstrip(),
+        ]
+        if event.get('operator'):
+            lines.append(f"📍 Оператор: {event['operator']}")
+        lines.append(f"📱 Приложение: {event.get('application') or 'не определено'}")
+        return "\n".join(lines)
+    if status == STATUS_RETRYING:
+        return f"⏳ Ошибка при обработке, повторная попытка через {event.get('retry_in', 0)} сек."
+    return f"❌ Не удалось обработать чек: {event.get('error') or 'неизвестная ошибка'}"
+
+
+async def listen_for_results():
+    """Edit users' status messages as the worker publishes results"""
+    while True:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(RESULT_CHANNEL)
+            async for message in pubsub.listen():
+                try:
+                    event = json.loads(message['data'])
+                    await bot.edit_message_text(
+                        format_result(event),
+                        chat_id=event['chat_id'],
+                        message_id=event['status_message_id']
+                    )
+                except TelegramBadRequest:
+                    # Message deleted or text unchanged, nothing to update
+                    pass
+                except Exception as e:
+                    print(f"⚠️  Failed to deliver receipt result: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Result listener error: {e}, reconnecting...")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
 
 
 @dp.message(Command("start"))
@@ -107,23 +165,19 @@ async def handle_text_message(message: types.Message):
     # Send processing message
     status_msg = await message.answer("⏳ Обрабатываю чек...")
     
-    # Add to Redis queue for async processing
+    # Add to Redis queue for async processing, the result listener edits the
+    # status message once the worker has stored the receipt
     try:
-        task_data = {
-            'raw_text': raw_text,
-            'source_type': 'MANUAL',
-            'source_chat_id': message.chat.id,
-            'source_message_id': message.message_id,
-            'user_id': message.from_user.id,
-            'status_message_id': status_msg.message_id
-        }
-        
-        await redis_client.rpush('receipt_queue', json.dumps(task_data))
-        
-        # In production, response will come from Celery worker
-        # For now, acknowledge receipt
-        await asyncio.sleep(1)  # Simulate processing
-        await status_msg.edit_text("✅ Чек добавлен в очередь обработки. Обработка займет несколько секунд.")
+        task_data = build_task_data(
+            raw_text,
+            'MANUAL',
+            message.chat.id,
+            message.message_id,
+            user_id=message.from_user.id,
+            status_message_id=status_msg.message_id
+        )
+        key, payload = route_receipt(task_data, edge_parser)
+        await enqueuer.enqueue(key, payload)
         
     except Exception as e:
         await status_msg.edit_text(f"❌ Ошибка при добавлении в очередь: {str(e)}")
@@ -145,10 +199,21 @@ async def main():
     # Initialize Redis
     await init_redis()
     print("✅ Redis connected")
+
+    global edge_parser
+    edge_parser = create_edge_parser()
+    if edge_parser is not None:
+        asyncio.create_task(edge_parser.run_refresh_loop())
+    
+    result_listener = asyncio.create_task(listen_for_results())
     
     # Start polling
     print("✅ Bot is running! Press Ctrl+C to stop.")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        result_listener.cancel()
+        await enqueuer.close()
 
 
 if __name__ == "__main__":
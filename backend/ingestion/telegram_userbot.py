@@ -4,12 +4,16 @@ Listens to specific chat IDs and forwards receipts to processing
 """
 import os
 import asyncio
+import argparse
 from telethon import TelegramClient, events
 from telethon.errors import FloodWaitError, SessionPasswordNeededError
 from dotenv import load_dotenv
 import redis.asyncio as aioredis
-import json
-from datetime import datetime
+
+from ingestion.receipts import looks_like_receipt, build_task_data, create_edge_parser, route_receipt
+from ingestion.userbot_backfill import HistoryBackfiller, CheckpointStore
+from ingestion.enqueuer import BatchingEnqueuer
+from workers.queues import RECEIPT_QUEUE
 
 load_dotenv()
 
@@ -24,6 +28,9 @@ TARGET_CHATS = [int(x.strip()) for x in os.getenv("TARGET_CHAT_IDS", "915326936,
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+# Catch up on history missed while the userbot was down before going live
+BACKFILL_ON_START = os.getenv("USERBOT_BACKFILL_ON_START", "True") == "True"
+
 # Global Redis client
 redis_client = None
 
@@ -52,7 +59,7 @@ async def resolve_peers(client: TelegramClient):
             print(f"   Make sure you have interacted with this chat before or it's accessible to your account")
 
 
-async def start_userbot():
+async def start_userbot(backfill: bool = BACKFILL_ON_START, backfill_only: bool = False, backfill_days: int = None):
     """Start MTProto userbot and monitor target chats"""
     print("🤖 Starting Telegram Userbot (MTProto)...")
     
@@ -61,6 +68,15 @@ async def start_userbot():
     
     # Create Telethon client
     client = TelegramClient(SESSION_PATH, API_ID, API_HASH)
+    enqueuer = BatchingEnqueuer(redis_client)
+    edge_parser = create_edge_parser()
+    backfiller = HistoryBackfiller(client, redis_client, edge_parser=edge_parser)
+    if backfill_days:
+        backfiller.days = backfill_days
+    if backfill or backfill_only:
+        # Before the live handler can fire: receipts arriving during startup
+        # must not advance checkpoints the backfill still starts from
+        backfiller.reserve(TARGET_CHATS)
     
     # Event handler for new messages in target chats
     @client.on(events.NewMessage(chats=TARGET_CHATS))
@@ -71,30 +87,28 @@ async def start_userbot():
         msg_id = event.id
         chat_id = event.chat_id
         
-        # Skip empty messages
-        if not raw_text or len(raw_text) < 20:
-            return
-        
-        # Check for receipt indicators
-        keywords = ['UZS', 'USD', 'summa', 'karta', 'HUMOCARD', 'oplata', 'Оплата', 'Пополнение']
-        if not any(keyword in raw_text for keyword in keywords):
+        # Skip empty messages and obvious non-receipts
+        if not looks_like_receipt(raw_text):
             return
         
         print(f"📨 New receipt detected from chat {chat_id} (sender: {sender_id})")
         
         # Add to processing queue
         try:
-            task_data = {
-                'raw_text': raw_text,
-                'source_type': 'AUTO',
-                'source_chat_id': chat_id,
-                'source_message_id': msg_id,
-                'sender_id': sender_id,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            await redis_client.rpush('receipt_queue', json.dumps(task_data))
-            print(f"✅ Receipt queued for processing")
+            task_data = build_task_data(raw_text, 'AUTO', chat_id, msg_id, sender_id=sender_id)
+            key, payload = route_receipt(task_data, edge_parser)
+
+            # While a chat is being backfilled its checkpoint belongs to the backfiller
+            if backfiller.is_backfilling(chat_id):
+                if not backfiller.note_live_message(chat_id, msg_id):
+                    print(f"⏪ Receipt {msg_id} is within the backfill of chat {chat_id}, left to it")
+                    return
+                hook = None
+            else:
+                hook = lambda pipe: CheckpointStore.queue_advance(pipe, chat_id, msg_id)
+
+            await enqueuer.enqueue(key, payload, hook)
+            print(f"✅ Receipt queued for {'direct insert' if key != RECEIPT_QUEUE else 'processing'}")
             
         except Exception as e:
             print(f"❌ Error queuing receipt: {e}")
@@ -116,22 +130,41 @@ async def start_userbot():
     
     # Resolve target peers
     await resolve_peers(client)
+
+    if edge_parser is not None:
+        asyncio.create_task(edge_parser.run_refresh_loop())
+    
+    if backfill_only:
+        await backfiller.run(TARGET_CHATS)
+        await enqueuer.close()
+        await client.disconnect()
+        return
+
+    backfill_task = None
+    if backfill:
+        # Runs alongside live monitoring; live messages newer than the backfill window are not duplicated
+        backfill_task = asyncio.create_task(backfiller.run(TARGET_CHATS))
     
     print(f"✅ Monitoring {len(TARGET_CHATS)} chats: {TARGET_CHATS}")
     print("✅ Userbot is running! Press Ctrl+C to stop.")
     
     # Keep alive
-    await client.run_until_disconnected()
+    try:
+        await client.run_until_disconnected()
+    finally:
+        if backfill_task is not None and not backfill_task.done():
+            backfill_task.cancel()
+        await enqueuer.close()
 
 
-async def main():
+async def main(backfill: bool = BACKFILL_ON_START, backfill_only: bool = False, backfill_days: int = None):
     """Main entry point with error handling"""
     max_retries = 5
     retry_count = 0
     
     while retry_count < max_retries:
         try:
-            await start_userbot()
+            await start_userbot(backfill, backfill_only, backfill_days)
             break
         except FloodWaitError as e:
             wait_time = e.seconds
@@ -154,4 +187,14 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Telegram userbot")
+    parser.add_argument("--backfill-only", action="store_true", help="Catch up on chat history and exit")
+    parser.add_argument("--no-backfill", action="store_true", help="Skip history catch-up on start")
+    parser.add_argument("--days", type=int, default=None, help="History window for chats without a checkpoint")
+    args = parser.parse_args()
+
+    asyncio.run(main(
+        backfill=BACKFILL_ON_START and not args.no_backfill,
+        backfill_only=args.backfill_only,
+        backfill_days=args.days
+    ))
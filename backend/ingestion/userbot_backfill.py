@@ -0,0 +1,254 @@
+"""
+History backfill for the MTProto userbot
+Catches up on messages sent while the userbot was down by iterating each target
+chat's history concurrently from a per-chat checkpoint stored in Redis
+"""
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+
+from ingestion.receipts import looks_like_receipt, build_task_data, route_receipt, add_to_pipeline
+
+# Hash of chat_id -> last processed message id
+CHECKPOINTS_KEY = 'userbot:checkpoints'
+
+BACKFILL_DAYS = int(os.getenv("USERBOT_BACKFILL_DAYS", "7"))
+BACKFILL_BATCH_SIZE = int(os.getenv("USERBOT_BACKFILL_BATCH_SIZE", "200"))
+BACKFILL_CONCURRENCY = int(os.getenv("USERBOT_BACKFILL_CONCURRENCY", "4"))
+
+# Only moves a checkpoint forward, so live messages and backfill can't rewind it
+_ADVANCE_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if tonumber(ARGV[2]) > current then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+class CheckpointStore:
+    """Last processed message id per chat, kept in a Redis hash"""
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self._advance = redis_client.register_script(_ADVANCE_SCRIPT)
+
+    async def get(self, chat_id: int) -> int:
+        value = await self.redis_client.hget(CHECKPOINTS_KEY, str(chat_id))
+        return int(value) if value else 0
+
+    async def advance(self, chat_id: int, message_id: int):
+        await self._advance(keys=[CHECKPOINTS_KEY], args=[str(chat_id), message_id])
+
+    @staticmethod
+    def queue_advance(pipe, chat_id: int, message_id: int):
+        """Add a checkpoint advance to a pipeline so it rides along with the enqueue"""
+        pipe.eval(_ADVANCE_SCRIPT, 1, CHECKPOINTS_KEY, str(chat_id), message_id)
+
+
+class AdaptivePacer:
+    """
+    Shared request pacing across all chats
+
+    Starts at full speed, backs off sharply on FloodWait and relaxes again
+    gradually while requests keep succeeding.
+    """
+
+    def __init__(self, min_delay: float = 0.0, max_delay: float = 10.0):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+        self.blocked_until = 0.0
+
+    def on_flood_wait(self, seconds: int):
+        self.delay = min(max(self.delay * 2, 0.5), self.max_delay)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def on_success(self):
+        self.delay = max(self.delay * 0.75, self.min_delay)
+        if self.delay < 0.05:
+            self.delay = self.min_delay
+
+    async def wait(self):
+        """Sleep out any FloodWait another chat ran into"""
+        remaining = self.blocked_until - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+
+class HistoryBackfiller:
+    """Enqueue receipts from target chats' history since their last checkpoint"""
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        redis_client,
+        days: int = BACKFILL_DAYS,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        concurrency: int = BACKFILL_CONCURRENCY,
+        edge_parser=None,
+    ):
+        self.client = client
+        self.edge_parser = edge_parser
+        self.redis_client = redis_client
+        self.checkpoints = CheckpointStore(redis_client)
+        self.pacer = AdaptivePacer()
+        self.days = days
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        # Chats currently being backfilled; live messages must not move their checkpoint
+        self.pending_chats = set()
+        # Newest message id each running backfill goes up to
+        self.upper_bounds: Dict[int, int] = {}
+        # Live message ids queued per chat while its backfill was running
+        self.live_ids: Dict[int, Set[int]] = {}
+
+    def reserve(self, chat_ids: Iterable[int]):
+        """
+        Claim chats before live handling starts
+
+        Until a reserved chat is backfilled, live messages don't move its
+        checkpoint; otherwise one receipt arriving before `run` starts would
+        push the checkpoint past the whole gap and the backfill would skip it.
+        """
+        self.pending_chats.update(chat_ids)
+
+    def is_backfilling(self, chat_id: int) -> bool:
+        return chat_id in self.pending_chats
+
+    def note_live_message(self, chat_id: int, message_id: int) -> bool:
+        """
+        Record a live message of a chat being backfilled
+
+        Returns:
+            Whether the live handler should queue it. Messages up to the
+            backfill's upper bound are left to the backfill; ones that arrive
+            before the bound is fixed are queued live and the backfill skips
+            them, so each message is queued once.
+        """
+        upper = self.upper_bounds.get(chat_id)
+        if upper is not None and message_id <= upper:
+            return False
+        self.live_ids.setdefault(chat_id, set()).add(message_id)
+        return True
+
+    async def run(self, chat_ids: Iterable[int]) -> Dict[int, int]:
+        """Backfill all chats concurrently, returns receipts queued per chat"""
+        chat_ids = list(chat_ids)
+        self.reserve(chat_ids)
+        started = time.monotonic()
+        print(f"⏪ Backfilling {len(chat_ids)} chats...")
+
+        results = await asyncio.gather(
+            *(self._backfill_chat_guarded(chat_id) for chat_id in chat_ids),
+            return_exceptions=True
+        )
+
+        queued = {}
+        for chat_id, result in zip(chat_ids, results):
+            if isinstance(result, Exception):
+                print(f"❌ Backfill failed for chat {chat_id}: {result}")
+                queued[chat_id] = 0
+            else:
+                queued[chat_id] = result
+
+        elapsed = time.monotonic() - started
+        print(f"✅ Backfill complete: {sum(queued.values())} receipts queued in {elapsed:.1f}s")
+        return queued
+
+    async def _backfill_chat_guarded(self, chat_id: int) -> int:
+        try:
+            async with self.semaphore:
+                return await self.backfill_chat(chat_id)
+        finally:
+            self.pending_chats.discard(chat_id)
+            self.upper_bounds.pop(chat_id, None)
+            self.live_ids.pop(chat_id, None)
+
+    async def backfill_chat(self, chat_id: int) -> int:
+        """Iterate one chat's history oldest-first from its checkpoint up to the newest message"""
+        checkpoint = await self.checkpoints.get(chat_id)
+
+        # Upper bound fixed at start: anything newer is handled by the live handler
+        latest = await self.client.get_messages(chat_id, limit=1)
+        upper = latest[0].id if latest else 0
+        self.upper_bounds[chat_id] = upper
+        if upper <= checkpoint:
+            return 0
+
+        offset_date = None
+        if not checkpoint:
+            offset_date = datetime.now(timezone.utc) - timedelta(days=self.days)
+
+        last_seen = checkpoint
+        queued = 0
+        batch: List[Tuple[str, Any]] = []
+        scanned = 0
+
+        while True:
+            await self.pacer.wait()
+            try:
+                messages = self.client.iter_messages(
+                    chat_id,
+                    reverse=True,
+                    min_id=last_seen,
+                    max_id=upper + 1,
+                    offset_date=offset_date if not last_seen else None,
+                    wait_time=self.pacer.delay,
+                )
+                async for message in messages:
+                    scanned += 1
+                    if scanned % 100 == 0:
+                        # One history request returns up to 100 messages
+                        self.pacer.on_success()
+                        messages.wait_time = self.pacer.delay
+
+                    raw_text = message.message
+                    # Queued by the live handler before the upper bound was known
+                    live = message.id in self.live_ids.get(chat_id, ())
+                    if looks_like_receipt(raw_text) and not live:
+                        task_data = build_task_data(
+                            raw_text,
+                            'AUTO',
+                            chat_id,
+                            message.id,
+                            timestamp=message.date,
+                            sender_id=message.sender_id,
+                            backfill=True,
+                        )
+                        batch.append(route_receipt(task_data, self.edge_parser))
+
+                    last_seen = message.id
+                    if len(batch) >= self.batch_size:
+                        queued += await self._flush(chat_id, batch, last_seen)
+                        batch = []
+                break
+            except FloodWaitError as e:
+                print(f"⚠️  Flood wait while backfilling chat {chat_id}. Waiting {e.seconds} seconds...")
+                self.pacer.on_flood_wait(e.seconds)
+                if batch:
+                    queued += await self._flush(chat_id, batch, last_seen)
+                    batch = []
+
+        queued += await self._flush(chat_id, batch, last_seen)
+
+        # Hand the chat back to the live handler past anything it saw meanwhile
+        await self.checkpoints.advance(chat_id, max(upper, *self.live_ids.get(chat_id, ())))
+        print(f"✅ Chat {chat_id}: scanned {scanned} messages, queued {queued} receipts")
+        return queued
+
+    async def _flush(self, chat_id: int, batch: List[Tuple[str, Any]], last_seen: int) -> int:
+        """Queue a batch and move the checkpoint (forward only) in one MULTI round trip"""
+        pipe = self.redis_client.pipeline(transaction=True)
+        for key, payload in batch:
+            add_to_pipeline(pipe, key, payload)
+        CheckpointStore.queue_advance(pipe, chat_id, last_seen)
+        await pipe.execute()
+        return len(batch)
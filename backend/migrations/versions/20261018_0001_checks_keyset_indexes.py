@@ -0,0 +1,34 @@
+"""Composite (sort column, id) indexes on checks for keyset pagination
+
+Existing databases were created from the SQL dump, so the indexes are created
+with IF NOT EXISTS and CONCURRENTLY to avoid locking checks against writes.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'idx_checks_datetime_id': '(datetime, id)',
+    'idx_checks_amount_id': '(amount, id)',
+    'idx_checks_created_at_id': '(created_at, id)',
+    'idx_checks_updated_at_id': '(updated_at, id)',
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON checks {columns}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,60 @@
+"""pg_trgm GIN indexes for substring search on checks and operator_reference
+
+Serves the `ILIKE '%term%'` filters (search, operator, app, parsing_method)
+from trigram indexes instead of sequential scans. When the extension can't be
+installed (no privileges, managed database without pg_trgm) the indexes are
+skipped and the API keeps working with plain scans; install the extension and
+re-run this revision (`alembic downgrade 0001 && alembic upgrade head`) later.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op, context
+from sqlalchemy import text
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'idx_checks_raw_text_trgm': ('checks', 'raw_text'),
+    'idx_checks_operator_trgm': ('checks', 'operator'),
+    'idx_checks_app_trgm': ('checks', 'app'),
+    'idx_checks_added_via_trgm': ('checks', 'added_via'),
+    'idx_operator_ref_operator_trgm': ('operator_reference', 'operator_name'),
+    'idx_operator_ref_app_trgm': ('operator_reference', 'application_name'),
+}
+
+
+def _has_trigram() -> bool:
+    if context.is_offline_mode():
+        return True
+    return op.get_bind().execute(
+        text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    ).first() is not None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        try:
+            op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except Exception as e:
+            print(f"⚠️  Could not create pg_trgm: {e}")
+
+        if not _has_trigram():
+            print("⚠️  pg_trgm unavailable, trigram indexes skipped")
+            return
+
+        for name, (table, column) in INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
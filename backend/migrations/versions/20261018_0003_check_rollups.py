@@ -0,0 +1,143 @@
+"""Hourly/daily check rollups maintained by a trigger
+
+check_rollups holds count/sum/min/max per bucket x app x card x type x
+currency. An AFTER row trigger on checks applies every insert, update and
+delete as a delta, so rollups stay current whoever writes the row (API,
+receipt bot, manual SQL). Removing a bucket's min or max re-reads that one
+bucket. Existing rows are loaded with `python -m scripts.rebuild_rollups`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op, context
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+APPLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION check_rollups_apply(
+    p_datetime TIMESTAMP, p_app TEXT, p_card TEXT, p_type TEXT, p_currency TEXT,
+    p_amount NUMERIC, p_sign INTEGER
+) RETURNS VOID AS $$
+DECLARE
+    v_grain TEXT;
+    v_bucket TIMESTAMP;
+    v_count BIGINT;
+    v_min NUMERIC;
+    v_max NUMERIC;
+BEGIN
+    FOREACH v_grain IN ARRAY ARRAY['hour', 'day'] LOOP
+        v_bucket := date_trunc(v_grain, p_datetime);
+
+        IF p_sign > 0 THEN
+            INSERT INTO check_rollups AS r (
+                grain, bucket, app, card_last4, transaction_type, currency,
+                tx_count, amount_sum, amount_min, amount_max
+            ) VALUES (
+                v_grain, v_bucket, p_app, p_card, p_type, p_currency,
+                1, p_amount, p_amount, p_amount
+            )
+            ON CONFLICT (grain, bucket, app, card_last4, transaction_type, currency) DO UPDATE SET
+                tx_count = r.tx_count + 1,
+                amount_sum = r.amount_sum + EXCLUDED.amount_sum,
+                amount_min = LEAST(r.amount_min, EXCLUDED.amount_min),
+                amount_max = GREATEST(r.amount_max, EXCLUDED.amount_max);
+            CONTINUE;
+        END IF;
+
+        UPDATE check_rollups
+           SET tx_count = tx_count - 1, amount_sum = amount_sum - p_amount
+         WHERE grain = v_grain AND bucket = v_bucket AND app = p_app AND card_last4 = p_card
+           AND transaction_type = p_type AND currency = p_currency
+        RETURNING tx_count, amount_min, amount_max INTO v_count, v_min, v_max;
+
+        IF NOT FOUND THEN
+            CONTINUE;
+        ELSIF v_count <= 0 THEN
+            DELETE FROM check_rollups
+             WHERE grain = v_grain AND bucket = v_bucket AND app = p_app AND card_last4 = p_card
+               AND transaction_type = p_type AND currency = p_currency;
+        ELSIF p_amount <= v_min OR p_amount >= v_max THEN
+            -- min/max can't be decremented, re-read the bucket's rows
+            UPDATE check_rollups r
+               SET amount_min = s.amount_min, amount_max = s.amount_max
+              FROM (
+                SELECT MIN(amount) AS amount_min, MAX(amount) AS amount_max
+                  FROM checks
+                 WHERE datetime >= v_bucket AND datetime < v_bucket + ('1 ' || v_grain)::INTERVAL
+                   AND COALESCE(app, '') = p_app AND COALESCE(card_last4, '') = p_card
+                   AND transaction_type = p_type AND currency = p_currency
+              ) s
+             WHERE r.grain = v_grain AND r.bucket = v_bucket AND r.app = p_app AND r.card_last4 = p_card
+               AND r.transaction_type = p_type AND r.currency = p_currency
+               AND s.amount_min IS NOT NULL;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION check_rollups_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.datetime IS NOT DISTINCT FROM OLD.datetime
+       AND NEW.app IS NOT DISTINCT FROM OLD.app
+       AND NEW.card_last4 IS NOT DISTINCT FROM OLD.card_last4
+       AND NEW.transaction_type IS NOT DISTINCT FROM OLD.transaction_type
+       AND NEW.currency IS NOT DISTINCT FROM OLD.currency
+       AND NEW.amount IS NOT DISTINCT FROM OLD.amount THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM check_rollups_apply(OLD.datetime, COALESCE(OLD.app, ''), COALESCE(OLD.card_last4, ''),
+                                    OLD.transaction_type, OLD.currency, OLD.amount, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM check_rollups_apply(NEW.datetime, COALESCE(NEW.app, ''), COALESCE(NEW.card_last4, ''),
+                                    NEW.transaction_type, NEW.currency, NEW.amount, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    # init_db()'s create_all may have created the table already
+    if context.is_offline_mode() or not sa.inspect(op.get_bind()).has_table('check_rollups'):
+        op.create_table(
+            'check_rollups',
+            sa.Column('grain', sa.String(4), primary_key=True),
+            sa.Column('bucket', sa.DateTime(timezone=False), primary_key=True),
+            sa.Column('app', sa.String(100), primary_key=True),
+            sa.Column('card_last4', sa.String(4), primary_key=True),
+            sa.Column('transaction_type', sa.String(50), primary_key=True),
+            sa.Column('currency', sa.String(10), primary_key=True),
+            sa.Column('tx_count', sa.BigInteger, nullable=False),
+            sa.Column('amount_sum', sa.Numeric(18, 2), nullable=False),
+            sa.Column('amount_min', sa.Numeric(15, 2), nullable=False),
+            sa.Column('amount_max', sa.Numeric(15, 2), nullable=False),
+            sa.CheckConstraint("grain IN ('hour', 'day')", name='check_rollup_grain'),
+        )
+        op.create_index('idx_check_rollups_grain_bucket', 'check_rollups', ['grain', 'bucket'])
+
+    op.execute(APPLY_FUNCTION)
+    op.execute(TRIGGER_FUNCTION)
+    op.execute("DROP TRIGGER IF EXISTS check_rollups_maintain ON checks")
+    op.execute(
+        "CREATE TRIGGER check_rollups_maintain AFTER INSERT OR UPDATE OR DELETE ON checks "
+        "FOR EACH ROW EXECUTE FUNCTION check_rollups_trigger()"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS check_rollups_maintain ON checks")
+    op.execute("DROP FUNCTION IF EXISTS check_rollups_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS check_rollups_apply(TIMESTAMP, TEXT, TEXT, TEXT, TEXT, NUMERIC, INTEGER)")
+    op.drop_table('check_rollups')
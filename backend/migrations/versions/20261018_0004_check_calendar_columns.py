@@ -0,0 +1,96 @@
+"""Indexed calendar columns (dow, hour, local_date) on checks
+
+The weekday and hour filters used to evaluate EXTRACT() on every row. The
+parts of `datetime` are now stored in their own columns, filled by a BEFORE
+trigger on insert and whenever `datetime` changes, and indexed together with
+(datetime, id) so weekday/hour slices page like the default sort. Columns are
+added as nullable (no table rewrite), existing rows are backfilled in id
+batches that commit separately, and indexes are built CONCURRENTLY.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op, context
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+# Rows updated per backfill statement
+BACKFILL_BATCH = 50000
+
+COLUMNS = {
+    'dow': 'SMALLINT',
+    'hour': 'SMALLINT',
+    'local_date': 'DATE',
+}
+
+INDEXES = {
+    'idx_checks_dow_datetime_id': '(dow, datetime, id)',
+    'idx_checks_hour_datetime_id': '(hour, datetime, id)',
+    'idx_checks_local_date': '(local_date)',
+}
+
+FILL = """
+    dow = EXTRACT(dow FROM datetime)::SMALLINT,
+    hour = EXTRACT(hour FROM datetime)::SMALLINT,
+    local_date = datetime::DATE
+"""
+
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION checks_calendar_fill() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.dow := EXTRACT(dow FROM NEW.datetime)::SMALLINT;
+    NEW.hour := EXTRACT(hour FROM NEW.datetime)::SMALLINT;
+    NEW.local_date := NEW.datetime::DATE;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def _backfill():
+    if context.is_offline_mode():
+        op.execute(f"UPDATE checks SET {FILL} WHERE dow IS NULL")
+        return
+
+    bind = op.get_bind()
+    low, high = bind.execute(sa.text("SELECT MIN(id), MAX(id) FROM checks")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, BACKFILL_BATCH):
+        bind.execute(
+            sa.text(f"UPDATE checks SET {FILL} WHERE id >= :start AND id < :stop AND dow IS NULL"),
+            {"start": start, "stop": start + BACKFILL_BATCH},
+        )
+
+
+def upgrade():
+    for name, column_type in COLUMNS.items():
+        op.execute(f"ALTER TABLE checks ADD COLUMN IF NOT EXISTS {name} {column_type}")
+
+    # Fill new and re-dated rows before the backfill starts, so none are missed
+    op.execute(TRIGGER_FUNCTION)
+    op.execute("DROP TRIGGER IF EXISTS checks_calendar ON checks")
+    op.execute(
+        "CREATE TRIGGER checks_calendar BEFORE INSERT OR UPDATE OF datetime ON checks "
+        "FOR EACH ROW EXECUTE FUNCTION checks_calendar_fill()"
+    )
+
+    with op.get_context().autocommit_block():
+        _backfill()
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON checks {columns}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.execute("DROP TRIGGER IF EXISTS checks_calendar ON checks")
+    op.execute("DROP FUNCTION IF EXISTS checks_calendar_fill()")
+    for name in COLUMNS:
+        op.execute(f"ALTER TABLE checks DROP COLUMN IF EXISTS {name}")
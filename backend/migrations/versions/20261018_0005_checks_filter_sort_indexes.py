@@ -0,0 +1,37 @@
+"""Composite (filter column, datetime, id) indexes on checks
+
+The single-column card/app/operator indexes find a filter's rows but leave
+them to be sorted, and currency had no index at all. With the filter column
+leading the default (datetime, id) sort, a filtered page, and every keyset
+page after it, reads just its rows in order. Guarded by the query-plan suite
+in tests/test_query_plans.py.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'idx_checks_card_datetime_id': '(card_last4, datetime, id)',
+    'idx_checks_app_datetime_id': '(app, datetime, id)',
+    'idx_checks_operator_datetime_id': '(operator, datetime, id)',
+    'idx_checks_currency_datetime_id': '(currency, datetime, id)',
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON checks {columns}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
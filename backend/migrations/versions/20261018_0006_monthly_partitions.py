@@ -0,0 +1,271 @@
+"""Monthly range partitioning of checks and transactions
+
+Both tables are rebuilt as PARTITION BY RANGE on the receipt datetime, one
+partition per month that holds rows plus the coming months and a default
+partition. The rebuild is online: a new partitioned table is created next to
+the old one with copies of its indexes, a trigger mirrors every write on the
+old table into it while existing rows are copied in id batches, and a short
+ACCESS EXCLUSIVE swap renames the tables and moves triggers, views and the id
+sequence across. The old heap stays as <table>_unpartitioned; drop it once the
+new table is verified.
+
+Partitioned tables need the partition key in every unique constraint, so the
+primary key becomes (id, <key>) and unique indexes gain the key column.
+Foreign keys pointing at the table are dropped; ON DELETE CASCADE ones are
+replaced by a delete trigger, which leaves the referencing rows alone when
+an update only moved the row to another month's partition. Needs PostgreSQL 13+ and an online connection.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+import re
+
+from alembic import op, context
+import sqlalchemy as sa
+
+from services.partitions import (
+    PARTITION_MONTHS_AHEAD, PARTITIONED_TABLES, add_months, default_partition_name,
+    month_start, partition_bounds, partition_name,
+)
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# Rows copied per statement
+COPY_BATCH = 50000
+
+MIRROR_FUNCTION = """
+CREATE OR REPLACE FUNCTION partition_mirror() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE format('DELETE FROM %I WHERE id = $1', TG_ARGV[0]) USING OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format('INSERT INTO %I SELECT ($1).* ON CONFLICT DO NOTHING', TG_ARGV[0]) USING NEW;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Arguments: referencing table, its column, referenced column, partitioned table.
+# An UPDATE that moves a row to another partition (re-dating a check across
+# a month boundary) runs as DELETE + INSERT and fires this trigger too; the
+# row then still exists under the parent, and its referencing rows are kept
+CASCADE_FUNCTION = """
+CREATE OR REPLACE FUNCTION partition_cascade_delete() RETURNS TRIGGER AS $$
+DECLARE
+    moved BOOLEAN;
+BEGIN
+    EXECUTE format('SELECT EXISTS (SELECT 1 FROM %s WHERE %I = ($1).%I)', TG_ARGV[3], TG_ARGV[2], TG_ARGV[2])
+        INTO moved USING OLD;
+    IF NOT moved THEN
+        EXECUTE format('DELETE FROM %s WHERE %I = ($1).%I', TG_ARGV[0], TG_ARGV[1], TG_ARGV[2]) USING OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def _rows(sql: str, **params):
+    return op.get_bind().execute(sa.text(sql), params).all()
+
+
+def _scalar(sql: str, **params):
+    return op.get_bind().execute(sa.text(sql), params).scalar()
+
+
+def _indexes(table: str):
+    """(name, definition, unique) of every index but the primary key"""
+    return _rows(
+        "SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisunique "
+        "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = CAST(:table AS regclass) AND NOT i.indisprimary",
+        table=table,
+    )
+
+
+def _clone_index(definition: str, name: str, target: str, key: str, unique: bool) -> str:
+    """Index definition retargeted at `target`; unique ones gain the partition key"""
+    definition = definition.replace(f" INDEX {name} ON ", f" INDEX {name}_p ON ", 1)
+    definition = re.sub(r" ON (?:ONLY )?\S+ USING ", f" ON {target} USING ", definition, count=1)
+    if not unique:
+        return definition
+
+    start = definition.index("(", definition.index(" USING "))
+    depth = 0
+    for end in range(start, len(definition)):
+        depth += {"(": 1, ")": -1}.get(definition[end], 0)
+        if depth == 0:
+            break
+    columns = [column.strip() for column in definition[start + 1:end].split(",")]
+    if key in columns:
+        return definition
+    return f"{definition[:end]}, {key}{definition[end:]}"
+
+
+def _months(table: str, key: str, timezone: bool):
+    """Months that hold rows, plus the current month and the ones ahead"""
+    column = f"({key} AT TIME ZONE 'UTC')" if timezone else key
+    months = {
+        month_start(row[0])
+        for row in _rows(f"SELECT DISTINCT date_trunc('month', {column}) FROM {table}")
+    }
+    current = month_start(_scalar("SELECT CURRENT_DATE"))
+    months.update(add_months(current, offset) for offset in range(PARTITION_MONTHS_AHEAD + 1))
+    return sorted(months)
+
+
+def _prepare(table: str, key: str, timezone: bool):
+    """Create the partitioned copy, its partitions and indexes, and start mirroring"""
+    staging = f"{table}_partitioned"
+    op.execute(f"DROP TRIGGER IF EXISTS {table}_partition_mirror ON {table}")
+    op.execute(f"DROP TABLE IF EXISTS {staging}")
+    op.execute(
+        f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+        f"INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE ({key})"
+    )
+    op.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {staging}_pkey PRIMARY KEY (id, {key})")
+
+    for month in _months(table, key, timezone):
+        low, high = partition_bounds(table, month)
+        op.execute(
+            f"CREATE TABLE {partition_name(table, month)} PARTITION OF {staging} "
+            f"FOR VALUES FROM ({low}) TO ({high})"
+        )
+    op.execute(f"CREATE TABLE {default_partition_name(table)} PARTITION OF {staging} DEFAULT")
+
+    for name, definition, unique in _indexes(table):
+        op.execute(_clone_index(definition, name, staging, key, unique))
+
+    # Foreign keys to other tables carry over; self-references can't (see below)
+    for name, definition in _rows(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE contype = 'f' AND conrelid = CAST(:table AS regclass) AND confrelid <> conrelid",
+        table=table,
+    ):
+        op.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {name} {definition}")
+
+    op.execute(MIRROR_FUNCTION)
+    op.execute(
+        f"CREATE TRIGGER {table}_partition_mirror AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION partition_mirror('{staging}')"
+    )
+
+
+def _copy(table: str):
+    """Copy existing rows in id batches, each committed on its own"""
+    staging = f"{table}_partitioned"
+    low, high = op.get_bind().execute(sa.text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+    if low is None:
+        return
+    # FOR SHARE waits out concurrent writers, so a row is copied either before
+    # their mirror trigger runs or in its final state; conflicts are mirrored rows
+    for start in range(low, high + 1, COPY_BATCH):
+        op.get_bind().execute(
+            sa.text(
+                f"WITH batch AS (SELECT * FROM {table} WHERE id >= :start AND id < :stop FOR SHARE) "
+                f"INSERT INTO {staging} SELECT * FROM batch ON CONFLICT DO NOTHING"
+            ),
+            {"start": start, "stop": start + COPY_BATCH},
+        )
+        print(f"📦 {table}: copied ids up to {min(start + COPY_BATCH, high + 1) - 1} of {high}")
+    op.execute(f"ANALYZE {staging}")
+
+
+def _swap(table: str):
+    """Put the partitioned table in place of the old one (one short transaction)"""
+    staging = f"{table}_partitioned"
+    old = f"{table}_unpartitioned"
+    mirror = f"{table}_partition_mirror"
+
+    op.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+    # Definitions are read while they still say `table`, so replaying them
+    # after the rename binds them to the partitioned table
+    triggers = _rows(
+        "SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger "
+        "WHERE tgrelid = CAST(:table AS regclass) AND NOT tgisinternal AND tgname <> :mirror",
+        table=table, mirror=mirror,
+    )
+    views = _rows(
+        "SELECT DISTINCT v.oid::regclass::text, pg_get_viewdef(v.oid) FROM pg_depend d "
+        "JOIN pg_rewrite r ON r.oid = d.objid JOIN pg_class v ON v.oid = r.ev_class "
+        "WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = CAST(:table AS regclass) "
+        "AND v.relkind = 'v'",
+        table=table,
+    )
+    foreign_keys = _rows(
+        "SELECT con.conname, con.conrelid::regclass::text, con.confdeltype, "
+        "ARRAY(SELECT a.attname FROM unnest(con.conkey) k JOIN pg_attribute a "
+        "      ON a.attrelid = con.conrelid AND a.attnum = k), "
+        "ARRAY(SELECT a.attname FROM unnest(con.confkey) k JOIN pg_attribute a "
+        "      ON a.attrelid = con.confrelid AND a.attnum = k) "
+        "FROM pg_constraint con WHERE con.contype = 'f' AND con.confrelid = CAST(:table AS regclass)",
+        table=table,
+    )
+    primary_key = _scalar(
+        "SELECT conname FROM pg_constraint WHERE contype = 'p' AND conrelid = CAST(:table AS regclass)",
+        table=table,
+    )
+    indexes = [name for name, _, _ in _indexes(table)]
+    sequence = _scalar("SELECT pg_get_serial_sequence(:table, 'id')", table=table)
+
+    op.execute(f"DROP TRIGGER {mirror} ON {table}")
+    for name, _ in triggers:
+        op.execute(f"DROP TRIGGER {name} ON {table}")
+    # A foreign key can only reference a unique constraint covering the partition key
+    for name, referencing, _, _, _ in foreign_keys:
+        op.execute(f"ALTER TABLE {referencing} DROP CONSTRAINT {name}")
+        print(f"⚠️  Dropped foreign key {name} on {referencing}")
+
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    if primary_key:
+        op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {primary_key} TO {old}_pkey")
+    for name in indexes:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_unpartitioned")
+
+    op.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {staging}_pkey TO {primary_key or table + '_pkey'}")
+    for name in indexes:
+        op.execute(f"ALTER INDEX {name}_p RENAME TO {name}")
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+    for _, definition in triggers:
+        op.execute(definition)
+    op.execute(CASCADE_FUNCTION)
+    for name, referencing, on_delete, columns, ref_columns in foreign_keys:
+        if on_delete == 'c' and len(columns) == 1 and referencing not in (old, table):
+            op.execute(
+                f"CREATE TRIGGER {name}_cascade AFTER DELETE ON {table} FOR EACH ROW "
+                f"EXECUTE FUNCTION partition_cascade_delete("
+                f"'{referencing}', '{columns[0]}', '{ref_columns[0]}', '{table}')"
+            )
+    for name, definition in views:
+        op.execute(f"CREATE OR REPLACE VIEW {name} AS {definition.rstrip().rstrip(';')}")
+    print(f"✅ {table} is partitioned by month; old rows kept in {old}")
+
+
+def upgrade():
+    if context.is_offline_mode():
+        raise RuntimeError("Revision 0006 inspects the live schema and copies rows in batches; run it online")
+
+    for table, (key, timezone) in PARTITIONED_TABLES.items():
+        relkind = _scalar("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)", table=table)
+        if relkind != 'r':
+            continue
+        with op.get_context().autocommit_block():
+            _prepare(table, key, timezone)
+            _copy(table)
+        _swap(table)
+
+
+def downgrade():
+    raise RuntimeError(
+        "Revision 0006 is not reversible automatically: copy the partitioned table back "
+        "into a plain one (the pre-partitioning heap is kept as <table>_unpartitioned)"
+    )
@@ -0,0 +1,155 @@
+"""Absolute amount sums in check rollups
+
+Series volume is the sum of ABS(amount), but rollups only kept the signed
+sum, and a transaction type's rows can carry both signs (REVERSAL,
+CONVERSION), so volume summed from rollups disagreed with raw rows. The
+column is added with a constant default (no rewrite), the trigger function
+starts maintaining it, and existing rollups are filled from raw checks one
+month at a time, each month under the same lock rebuild_rollups takes so
+receipts written meanwhile are neither lost nor counted twice.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+import importlib.util
+from pathlib import Path
+
+from alembic import op, context
+import sqlalchemy as sa
+
+from services.partitions import add_months, month_start
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# Migration 0003's check_rollups_apply plus amount_abs_sum
+APPLY_FUNCTION = """
+CREATE OR REPLACE FUNCTION check_rollups_apply(
+    p_datetime TIMESTAMP, p_app TEXT, p_card TEXT, p_type TEXT, p_currency TEXT,
+    p_amount NUMERIC, p_sign INTEGER
+) RETURNS VOID AS $$
+DECLARE
+    v_grain TEXT;
+    v_bucket TIMESTAMP;
+    v_count BIGINT;
+    v_min NUMERIC;
+    v_max NUMERIC;
+BEGIN
+    FOREACH v_grain IN ARRAY ARRAY['hour', 'day'] LOOP
+        v_bucket := date_trunc(v_grain, p_datetime);
+
+        IF p_sign > 0 THEN
+            INSERT INTO check_rollups AS r (
+                grain, bucket, app, card_last4, transaction_type, currency,
+                tx_count, amount_sum, amount_abs_sum, amount_min, amount_max
+            ) VALUES (
+                v_grain, v_bucket, p_app, p_card, p_type, p_currency,
+                1, p_amount, ABS(p_amount), p_amount, p_amount
+            )
+            ON CONFLICT (grain, bucket, app, card_last4, transaction_type, currency) DO UPDATE SET
+                tx_count = r.tx_count + 1,
+                amount_sum = r.amount_sum + EXCLUDED.amount_sum,
+                amount_abs_sum = r.amount_abs_sum + EXCLUDED.amount_abs_sum,
+                amount_min = LEAST(r.amount_min, EXCLUDED.amount_min),
+                amount_max = GREATEST(r.amount_max, EXCLUDED.amount_max);
+            CONTINUE;
+        END IF;
+
+        UPDATE check_rollups
+           SET tx_count = tx_count - 1, amount_sum = amount_sum - p_amount,
+               amount_abs_sum = amount_abs_sum - ABS(p_amount)
+         WHERE grain = v_grain AND bucket = v_bucket AND app = p_app AND card_last4 = p_card
+           AND transaction_type = p_type AND currency = p_currency
+        RETURNING tx_count, amount_min, amount_max INTO v_count, v_min, v_max;
+
+        IF NOT FOUND THEN
+            CONTINUE;
+        ELSIF v_count <= 0 THEN
+            DELETE FROM check_rollups
+             WHERE grain = v_grain AND bucket = v_bucket AND app = p_app AND card_last4 = p_card
+               AND transaction_type = p_type AND currency = p_currency;
+        ELSIF p_amount <= v_min OR p_amount >= v_max THEN
+            -- min/max can't be decremented, re-read the bucket's rows
+            UPDATE check_rollups r
+               SET amount_min = s.amount_min, amount_max = s.amount_max
+              FROM (
+                SELECT MIN(amount) AS amount_min, MAX(amount) AS amount_max
+                  FROM checks
+                 WHERE datetime >= v_bucket AND datetime < v_bucket + ('1 ' || v_grain)::INTERVAL
+                   AND COALESCE(app, '') = p_app AND COALESCE(card_last4, '') = p_card
+                   AND transaction_type = p_type AND currency = p_currency
+              ) s
+             WHERE r.grain = v_grain AND r.bucket = v_bucket AND r.app = p_app AND r.card_last4 = p_card
+               AND r.transaction_type = p_type AND r.currency = p_currency
+               AND s.amount_min IS NOT NULL;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# One grain's absolute sums for checks in [start, stop)
+FILL = """
+UPDATE check_rollups r SET amount_abs_sum = s.abs_sum
+  FROM (
+    SELECT date_trunc('{grain}', datetime) AS bucket, COALESCE(app, '') AS app,
+           COALESCE(card_last4, '') AS card_last4, transaction_type, currency,
+           SUM(ABS(amount)) AS abs_sum
+      FROM checks
+     WHERE datetime >= {start} AND datetime < {stop}
+     GROUP BY 1, 2, 3, 4, 5
+  ) s
+ WHERE r.grain = '{grain}' AND r.bucket = s.bucket AND r.app = s.app AND r.card_last4 = s.card_last4
+   AND r.transaction_type = s.transaction_type AND r.currency = s.currency
+"""
+
+
+def _fill(start: str, stop: str) -> str:
+    return ";\n".join(FILL.format(grain=grain, start=start, stop=stop) for grain in ('hour', 'day'))
+
+
+def _backfill():
+    if context.is_offline_mode():
+        op.execute("LOCK TABLE check_rollups IN SHARE ROW EXCLUSIVE MODE")
+        op.execute(_fill("'-infinity'", "'infinity'"))
+        return
+
+    low, high = op.get_bind().execute(sa.text("SELECT MIN(bucket), MAX(bucket) FROM check_rollups")).one()
+    if low is None:
+        return
+    month, last = month_start(low), month_start(high)
+    while month <= last:
+        start, stop = f"'{month.isoformat()}'", f"'{add_months(month, 1).isoformat()}'"
+        # A DO block is one transaction: the lock holds until the month is filled
+        op.execute(
+            "DO $$ BEGIN LOCK TABLE check_rollups IN SHARE ROW EXCLUSIVE MODE; "
+            f"{_fill(start, stop)}; END $$"
+        )
+        month = add_months(month, 1)
+
+
+def upgrade():
+    op.execute(
+        "ALTER TABLE check_rollups ADD COLUMN IF NOT EXISTS amount_abs_sum NUMERIC(18, 2) NOT NULL DEFAULT 0"
+    )
+    op.execute(APPLY_FUNCTION)
+
+    with op.get_context().autocommit_block():
+        _backfill()
+
+
+def _previous_apply_function() -> str:
+    path = Path(__file__).with_name("20261018_0003_check_rollups.py")
+    spec = importlib.util.spec_from_file_location("check_rollups_0003", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.APPLY_FUNCTION
+
+
+def downgrade():
+    # The trigger must stop writing the column before it goes
+    op.execute(_previous_apply_function())
+    op.execute("ALTER TABLE check_rollups DROP COLUMN IF EXISTS amount_abs_sum")
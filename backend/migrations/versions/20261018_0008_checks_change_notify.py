@@ -0,0 +1,49 @@
+"""NOTIFY on checks writes that bypass the backend
+
+Live change events were only published by the backend's ORM sessions, so
+receipts inserted by other writers (the receipt bot, manual SQL) never reached
+/api/events/stream. An AFTER row trigger now sends pg_notify('checks_changes',
+'<table>:<op>:<id>') for every write, which workers/change_relay.py turns into
+change events. Backend connections set app.events_published=on (see
+database/connection.py) and are skipped, since their sessions publish already.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# Argument: table name as published (TG_TABLE_NAME is the partition's name)
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION change_notify() RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('app.events_published', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify(
+        'checks_changes',
+        TG_ARGV[0] || ':' || lower(TG_OP) || ':' || CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    op.execute(NOTIFY_FUNCTION)
+    op.execute("DROP TRIGGER IF EXISTS checks_change_notify ON checks")
+    op.execute(
+        "CREATE TRIGGER checks_change_notify AFTER INSERT OR UPDATE OR DELETE ON checks "
+        "FOR EACH ROW EXECUTE FUNCTION change_notify('checks')"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS checks_change_notify ON checks")
+    op.execute("DROP FUNCTION IF EXISTS change_notify()")
@@ -0,0 +1,110 @@
+"""
+Edge parser for the ingestion processes
+Runs the regex tier and operator mapping next to the Telegram clients so common
+receipt formats skip the worker's parsing round trip entirely
+"""
+import json
+import time
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from parsers.regex_parser import RegexParser
+from parsers.operator_mapper import OperatorMapper
+from parsers.parser_orchestrator import REGEX_CONFIDENCE_THRESHOLD
+
+DECIMAL_FIELDS = ('amount', 'balance_after')
+DATETIME_FIELDS = ('transaction_date',)
+
+
+def encode_parsed(task_data: Dict[str, Any], parsed_data: Dict[str, Any]) -> Dict[str, str]:
+    """Build stream fields for an already-parsed receipt"""
+    parsed = {}
+    for key, value in parsed_data.items():
+        if isinstance(value, Decimal):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        parsed[key] = value
+    return {
+        'task': json.dumps(task_data, ensure_ascii=False, default=str),
+        'parsed': json.dumps(parsed, ensure_ascii=False),
+    }
+
+
+def decode_parsed(fields: Dict[str, str]):
+    """Decode stream fields back into (task_data, parsed_data)"""
+    task_data = json.loads(fields['task'])
+    parsed_data = json.loads(fields['parsed'])
+    for key in DECIMAL_FIELDS:
+        if parsed_data.get(key) is not None:
+            parsed_data[key] = Decimal(parsed_data[key])
+    for key in DATETIME_FIELDS:
+        if parsed_data.get(key) is not None:
+            parsed_data[key] = datetime.fromisoformat(parsed_data[key])
+    return task_data, parsed_data
+
+
+class EdgeParser:
+    """Regex parsing plus operator mapping with a periodically refreshed mapping cache"""
+
+    def __init__(self, refresh_interval: float = 300.0):
+        self.regex_parser = RegexParser()
+        self.operator_mapper: Optional[OperatorMapper] = None
+        self.refresh_interval = refresh_interval
+        self.confidence_threshold = REGEX_CONFIDENCE_THRESHOLD
+        self.loaded_at = 0.0
+
+    def refresh_mappings(self, db: Optional[Session] = None):
+        """Reload operator mappings; the mapper keeps them in memory after the session closes"""
+        if db is not None:
+            self.operator_mapper = OperatorMapper(db)
+        else:
+            from database.connection import get_db
+
+            with get_db() as session:
+                self.operator_mapper = OperatorMapper(session)
+        self.loaded_at = time.monotonic()
+
+    async def run_refresh_loop(self):
+        """Keep the mapping cache fresh without blocking the event loop"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.to_thread(self.refresh_mappings)
+            except Exception as e:
+                print(f"⚠️  Operator mapping refresh failed: {e}")
+
+    def parse(self, raw_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a receipt locally
+
+        Returns:
+            Fully parsed transaction dict, or None when the receipt needs the
+            full worker pipeline (unknown format, low confidence or no mappings yet)
+        """
+        if not raw_text or not raw_text.strip():
+            return None
+
+        # Unmapped results would be stored without an application, leave them to the worker
+        if self.operator_mapper is None:
+            return None
+
+        try:
+            parsed_data = self.regex_parser.parse(raw_text)
+        except Exception as e:
+            print(f"❌ Edge regex parsing error: {e}")
+            return None
+
+        if not parsed_data or parsed_data.get('parsing_confidence', 0) < self.confidence_threshold:
+            return None
+
+        parsed_data['application_mapped'] = None
+        if parsed_data.get('operator_raw'):
+            parsed_data['application_mapped'] = self.operator_mapper.map_operator(parsed_data['operator_raw'])
+
+        parsed_data['is_gpt_parsed'] = False
+        return parsed_data
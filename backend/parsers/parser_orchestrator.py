@@ -8,6 +8,9 @@ from parsers.regex_parser import RegexParser
 from parsers.gpt_parser import GPTParser
 from parsers.operator_mapper import OperatorMapper
 
+# Confidence threshold for accepting regex results
+REGEX_CONFIDENCE_THRESHOLD = 0.8
+
 
 class ParserOrchestrator:
     """Main parsing coordinator that cascades through parsing strategies"""
@@ -17,8 +20,7 @@ class ParserOrchestrator:
         self.gpt_parser = GPTParser(api_key=openai_api_key)
         self.operator_mapper = OperatorMapper(db_session)
         
-        # Confidence threshold for accepting regex results
-        self.confidence_threshold = 0.8
+        self.confidence_threshold = REGEX_CONFIDENCE_THRESHOLD
     
     def process(self, raw_text: str) -> Optional[Dict[str, Any]]:
         """
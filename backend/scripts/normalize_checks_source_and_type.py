@@ -16,12 +16,15 @@ Rules:
 """
 from __future__ import annotations
 
+import os
 import re
 from contextlib import contextmanager
 from typing import Optional
 
 from sqlalchemy.orm import Session
 
+os.environ.setdefault("DB_ROLE", "batch")  # sizes the pools in database.connection
+
 from database.connection import get_db_session
 from database.models import Check
 
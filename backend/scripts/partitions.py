@@ -0,0 +1,54 @@
+"""
+Maintain the monthly partitions of checks and transactions
+
+Usage:
+    python -m scripts.partitions ensure                     # current month + PARTITION_MONTHS_AHEAD
+    python -m scripts.partitions ensure --months-ahead 6
+    python -m scripts.partitions detach checks 2024-01      # archive one month
+
+The API runs `ensure` on startup; schedule it monthly as well (cron) so
+long-running deployments keep partitions ahead of incoming receipts. A
+detached month stays in the database as a standalone table named like the
+partition (e.g. checks_y2024m01); dump it, then drop it.
+"""
+from __future__ import annotations
+
+import os
+import argparse
+from datetime import datetime
+
+os.environ.setdefault("DB_ROLE", "batch")  # sizes the pools in database.connection
+
+from database.connection import SessionLocal
+from services.partitions import PARTITION_MONTHS_AHEAD, PARTITIONED_TABLES, detach_partition, ensure_partitions
+
+
+def _month(value: str):
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of checks and transactions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure = commands.add_parser("ensure", help="Create missing upcoming partitions")
+    ensure.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+
+    detach = commands.add_parser("detach", help="Detach one month for archiving")
+    detach.add_argument("table", choices=sorted(PARTITIONED_TABLES))
+    detach.add_argument("month", type=_month, help="YYYY-MM")
+
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        if args.command == "ensure":
+            created = ensure_partitions(db, args.months_ahead)
+            print(f"✅ {len(created)} partition(s) created")
+        else:
+            detach_partition(db, args.table, args.month)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
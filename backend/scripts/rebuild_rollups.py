@@ -0,0 +1,63 @@
+"""
+Rebuild check_rollups from raw checks
+
+Usage:
+    python -m scripts.rebuild_rollups                       # everything
+    python -m scripts.rebuild_rollups --since 2025-01-01    # one range
+    python -m scripts.rebuild_rollups --since 2025-01-01 --until 2025-02-01
+
+Runs one transaction per CHUNK_DAYS days so the rollup table is never locked
+for long; the trigger keeps rollups current outside the rebuilt range.
+"""
+from __future__ import annotations
+
+import os
+import argparse
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+
+os.environ.setdefault("DB_ROLE", "batch")  # sizes the pools in database.connection
+
+from database.connection import SessionLocal
+from database.models import Check
+from services.rollups import rebuild_rollups
+
+CHUNK_DAYS = 31
+
+
+def rebuild(since: Optional[date] = None, until: Optional[date] = None) -> None:
+    db = SessionLocal()
+    try:
+        if since is None:
+            first = db.query(func.min(Check.datetime)).scalar()
+            if first is None:
+                print("ℹ️  No checks, nothing to rebuild")
+                return
+            since = first.date()
+        until = until or date.today() + timedelta(days=1)
+
+        total = 0
+        start = since
+        while start < until:
+            end = min(start + timedelta(days=CHUNK_DAYS), until)
+            written = rebuild_rollups(db, start, end)
+            total += written
+            print(f"✅ {start} → {end}: {written} rollup rows")
+            start = end
+        print(f"✅ Rebuilt rollups {since} → {until}: {total} rows")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild check_rollups from raw checks")
+    parser.add_argument("--since", type=date.fromisoformat, help="First day (default: oldest check)")
+    parser.add_argument("--until", type=date.fromisoformat, help="Day after the last one (default: tomorrow)")
+    args = parser.parse_args()
+    rebuild(args.since, args.until)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Per-table version counters in Redis
+Every committed write to a tracked table bumps its counter, so caches can key
+on the version and never serve results computed before the write. Writes to
+transaction rows also bump the query cache tags of the rows they touch and are
+published as live change events.
+"""
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from database.models import Check, Transaction
+from services.events import change_event, publish_events
+from services.query_cache import EPOCH_TAG, bump_tags, row_tags
+from services.redis_client import get_redis, run_blocking
+
+VERSION_KEY_PREFIX = 'table_version:'
+
+# Tables whose writes invalidate cached reads
+TRACKED_TABLES = {'checks', 'transactions', 'operator_reference'}
+
+# Table -> (card, date, app) columns that query cache tags are derived from
+TAG_COLUMNS = {
+    'checks': ('card_last4', 'datetime', 'app'),
+    'transactions': ('card_last_4', 'transaction_date', 'application_mapped'),
+}
+
+_CHANGED_KEY = 'changed_tables'
+_TAGS_KEY = 'changed_tags'
+_ROWS_KEY = 'changed_rows'
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the stored value when a tag column is assigned on an expired row, so
+# the flush can still see which tags the row is leaving
+for _model in (Check, Transaction):
+    for _name in TAG_COLUMNS[_model.__tablename__]:
+        event.listen(getattr(_model, _name), 'set', _keep_old_value, active_history=True)
+
+
+def table_version(table: str) -> Optional[int]:
+    """
+    Current version of a table, None if Redis is unavailable
+
+    A missing counter starts from the current time in milliseconds, so
+    versions handed out before Redis lost its data are never reissued.
+    """
+    try:
+        return run_blocking(_read_version, VERSION_KEY_PREFIX + table)
+    except Exception:
+        return None
+
+
+def _read_version(key: str) -> int:
+    client = get_redis()
+    version = client.get(key)
+    if version is None:
+        client.set(key, int(time.time() * 1000), nx=True)
+        version = client.get(key)
+    return int(version)
+
+
+def bump_versions(tables: Iterable[str]):
+    """Invalidate everything cached for these tables"""
+    tables = [t for t in tables if t in TRACKED_TABLES]
+    if not tables:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for table in tables:
+            pipe.incr(VERSION_KEY_PREFIX + table)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️  Failed to bump table versions {tables}: {e}")
+
+
+def mark_changed(session: Session, *tables: str):
+    """Record tables written outside the ORM unit of work (e.g. Core statements)"""
+    session.info.setdefault(_CHANGED_KEY, set()).update(tables)
+
+
+def mark_tags(session: Session, tags: Iterable[str]):
+    """Record query cache tags to bump when the session commits"""
+    session.info.setdefault(_TAGS_KEY, set()).update(tags)
+
+
+def mark_rows(session: Session, table: str, op: str, ids: Optional[Iterable[int]]):
+    """
+    Record rows to announce as a live change event when the session commits
+
+    ids=None announces a change to unknown rows of the table.
+    """
+    rows: Dict[Tuple[str, str], Optional[Set[int]]] = session.info.setdefault(_ROWS_KEY, {})
+    key = (table, op)
+    if ids is None or (key in rows and rows[key] is None):
+        rows[key] = None
+    else:
+        rows.setdefault(key, set()).update(ids)
+
+
+def _object_tags(obj) -> Set[str]:
+    """Tags for both the stored and the pending values of a tracked row"""
+    columns = TAG_COLUMNS.get(getattr(obj, '__tablename__', None))
+    if not columns:
+        return set()
+    state = inspect(obj)
+    current = [getattr(obj, name, None) for name in columns]
+    tags = set(row_tags(*current, row_id=obj.id))
+    if state.persistent or state.deleted:
+        # Old values: the row leaves the results filtered on them
+        previous = []
+        for name, value in zip(columns, current):
+            deleted = state.attrs[name].history.deleted
+            previous.append(deleted[0] if deleted else value)
+        tags.update(row_tags(*previous))
+    return tags
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_flush(session, flush_context, instances):
+    changed: Set[str] = session.info.setdefault(_CHANGED_KEY, set())
+    tags: Set[str] = session.info.setdefault(_TAGS_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            changed.add(table)
+            tags.update(_object_tags(obj))
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_rows(session, flush_context):
+    # Primary keys of new rows are known once they are flushed
+    for op, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            table = getattr(obj, '__tablename__', None)
+            if table in TAG_COLUMNS and (op != 'update' or session.is_modified(obj)):
+                mark_rows(session, table, op, [obj.id])
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk(orm_execute_state):
+    # query.update()/query.delete() and ORM-enabled insert()/update()/delete() bypass the flush
+    if orm_execute_state.statement.is_dml and orm_execute_state.bind_mapper:
+        table = orm_execute_state.bind_mapper.local_table.name
+        mark_changed(orm_execute_state.session, table)
+        if table in TAG_COLUMNS:
+            # Callers that know the affected rows pass their tags; otherwise
+            # every cached query is dropped
+            tags = orm_execute_state.execution_options.get('cache_tags')
+            mark_tags(orm_execute_state.session, tags if tags is not None else [EPOCH_TAG])
+            statement = orm_execute_state.statement
+            op = 'insert' if statement.is_insert else 'update' if statement.is_update else 'delete'
+            mark_rows(orm_execute_state.session, table, op, orm_execute_state.execution_options.get('event_ids'))
+
+
+def _publish(changed: Optional[Set[str]], tags: Optional[Set[str]], rows: Optional[dict]):
+    if changed:
+        bump_versions(changed)
+    if tags:
+        bump_tags(tags)
+    if rows:
+        publish_events([change_event(table, op, ids) for (table, op), ids in sorted(rows.items())])
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_changes(session):
+    changed = session.info.pop(_CHANGED_KEY, None)
+    tags = session.info.pop(_TAGS_KEY, None)
+    rows = session.info.pop(_ROWS_KEY, None)
+    if changed or tags or rows:
+        # An AsyncSession commits on the event loop thread; keep Redis off it
+        run_blocking(_publish, changed, tags, rows)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_CHANGED_KEY, None)
+    session.info.pop(_TAGS_KEY, None)
+    session.info.pop(_ROWS_KEY, None)
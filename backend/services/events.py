@@ -0,0 +1,115 @@
+"""
+Live change and progress events for the frontend
+Each event is appended to a capped Redis stream, then published on a pub/sub
+channel together with its stream id. Live clients follow the channel; a client
+that reconnects with the last id it saw replays what it missed from the stream.
+"""
+import os
+import re
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.redis_client import get_redis
+from workers.queues import EVENTS_CHANNEL, EVENTS_STREAM
+
+# Approximate number of events kept for resuming clients
+EVENTS_STREAM_MAXLEN = int(os.getenv("EVENTS_STREAM_MAXLEN", "10000"))
+
+# Event types
+CHANGE = 'change'
+PROGRESS = 'progress'
+
+_EVENT_ID = re.compile(r'^\d+-\d+$')
+
+
+def change_event(table: str, op: str, ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+    """
+    Rows of `table` were inserted, updated or deleted
+
+    ids=None means the rows aren't known (bulk statement) and clients should
+    refetch whatever they show from that table.
+    """
+    event = {"type": CHANGE, "table": table, "op": op}
+    if ids is not None:
+        event["ids"] = sorted(ids)
+    return event
+
+
+def progress_event(task_id: str, status: str, progress: Dict[str, Any], **fields: Any) -> Dict[str, Any]:
+    """Progress of a background task, e.g. AI analysis"""
+    event = {"type": PROGRESS, "task_id": task_id, "status": status, "progress": progress}
+    event.update(fields)
+    return event
+
+
+def publish_events(events: List[Dict[str, Any]]) -> List[str]:
+    """
+    Append events to the stream and publish them to live clients
+
+    Publishing is best effort: a Redis hiccup must never fail the write that
+    produced the event; clients that missed it resync on their next reconnect.
+
+    Returns:
+        Stream ids of the published events (empty on failure)
+    """
+    if not events:
+        return []
+    try:
+        client = get_redis()
+        payloads = [json.dumps(event, ensure_ascii=False, default=str) for event in events]
+        pipe = client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.xadd(EVENTS_STREAM, {"data": payload}, maxlen=EVENTS_STREAM_MAXLEN, approximate=True)
+        ids = pipe.execute()
+
+        pipe = client.pipeline(transaction=False)
+        for event_id, payload in zip(ids, payloads):
+            pipe.publish(EVENTS_CHANNEL, json.dumps({"id": event_id, "data": payload}))
+        pipe.execute()
+        return ids
+    except Exception as e:
+        print(f"⚠️  Failed to publish live events: {e}")
+        return []
+
+
+def publish_event(event: Dict[str, Any]) -> Optional[str]:
+    """Publish a single event, returns its stream id"""
+    ids = publish_events([event])
+    return ids[0] if ids else None
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Stream id as a comparable (ms, seq) tuple, None if malformed"""
+    if not value or not _EVENT_ID.match(value):
+        return None
+    ms, seq = value.split('-')
+    return int(ms), int(seq)
+
+
+def latest_event_id() -> Optional[str]:
+    """Id of the newest event in the stream"""
+    newest = get_redis().xrevrange(EVENTS_STREAM, count=1)
+    return newest[0][0] if newest else None
+
+
+def events_since(last_id: str, limit: int) -> Optional[List[Tuple[str, str]]]:
+    """
+    Events published after `last_id`, oldest first, as (id, json payload)
+
+    Returns:
+        None when the gap can't be replayed, because the stream was trimmed
+        past `last_id` or holds more than `limit` newer events; the client has
+        to refetch its data instead
+    """
+    client = get_redis()
+    after = parse_event_id(last_id)
+    # Entries only leave the stream by trimming, so while last_id is still
+    # there everything after it is too
+    if after is None or not client.xrange(EVENTS_STREAM, min=last_id, max=last_id):
+        return None
+
+    # Exclusive start: the smallest id after last_id
+    entries = client.xrange(EVENTS_STREAM, min=f"{after[0]}-{after[1] + 1}", count=limit + 1)
+    if len(entries) > limit:
+        return None
+    return [(event_id, fields["data"]) for event_id, fields in entries]
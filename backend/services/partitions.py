@@ -0,0 +1,177 @@
+"""
+Monthly range partitions of checks and transactions
+Migration 0006 turns both tables into PARTITION BY RANGE on the receipt
+datetime: one partition per calendar month plus a default partition that
+catches months nobody created yet. `ensure_partitions` creates the coming
+months ahead of time, `detach_partition` takes an old month out of the table
+so it can be archived and dropped.
+"""
+import os
+from datetime import date, datetime
+from typing import List, NamedTuple, Set, Tuple
+
+from sqlalchemy import delete, text
+from sqlalchemy.orm import Session
+
+from database.models import CheckRollup
+from services.rollups import rebuild_rollups
+
+
+class PartitionedTable(NamedTuple):
+    key: str
+    # TIMESTAMPTZ keys get UTC month bounds
+    timezone: bool
+
+
+PARTITIONED_TABLES = {
+    "checks": PartitionedTable("datetime", False),
+    "transactions": PartitionedTable("transaction_date", True),
+}
+
+# Months created ahead of the current one
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def partition_bounds(table: str, month: date) -> Tuple[str, str]:
+    """SQL literals for FOR VALUES FROM (...) TO (...) of a month's partition"""
+    suffix = "+00" if PARTITIONED_TABLES[table].timezone else ""
+    return tuple(f"'{bound.isoformat()} 00:00:00{suffix}'" for bound in (month, add_months(month, 1)))
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    relkind = db.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar()
+    return relkind == "p"
+
+
+def partition_names(db: Session, table: str) -> Set[str]:
+    rows = db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    )
+    return set(rows.scalars())
+
+
+def cascade_triggers(db: Session, table: str) -> List[str]:
+    """Migration 0006's partition_cascade_delete triggers on a table or partition"""
+    rows = db.execute(
+        text(
+            "SELECT tgname FROM pg_trigger "
+            "WHERE tgrelid = to_regclass(:table) AND tgfoid = to_regproc('partition_cascade_delete')"
+        ),
+        {"table": table},
+    )
+    return list(rows.scalars())
+
+
+def create_partition(db: Session, table: str, month: date) -> int:
+    """
+    Create and attach one month's partition (caller commits)
+
+    The partition is built as a plain table and attached, which only takes a
+    SHARE UPDATE EXCLUSIVE lock on the parent, so reads and writes go on.
+    Rows already sitting in the default partition for that month move into it,
+    with the cascade triggers switched off for the move: the new partition
+    isn't attached yet, so the moved rows would look deleted and lose their
+    children (e.g. queue_events). DISABLE TRIGGER is transactional and ends
+    with the caller's commit or rollback either way.
+
+    Returns:
+        Number of rows moved out of the default partition
+    """
+    name = partition_name(table, month)
+    low, high = partition_bounds(table, month)
+    key = PARTITIONED_TABLES[table].key
+
+    default = default_partition_name(table)
+
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)"))
+    triggers = cascade_triggers(db, default)
+    for trigger in triggers:
+        db.execute(text(f'ALTER TABLE {default} DISABLE TRIGGER "{trigger}"'))
+    moved = db.execute(text(
+        f"WITH moved AS (DELETE FROM {default} "
+        f"WHERE {key} >= {low} AND {key} < {high} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )).rowcount
+    for trigger in triggers:
+        db.execute(text(f'ALTER TABLE {default} ENABLE TRIGGER "{trigger}"'))
+    db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({low}) TO ({high})"))
+    return moved
+
+
+def ensure_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD, today: date = None) -> List[str]:
+    """
+    Create any missing partitions from the current month to `months_ahead` months out
+
+    A no-op for tables that aren't partitioned (SQLite, or before migration
+    0006). Each partition commits on its own. Check rows moved out of the
+    default partition left the rollups through the trigger, so their month
+    is rebuilt.
+
+    Returns:
+        Names of the partitions created
+    """
+    first = month_start(today or date.today())
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(db, table):
+            continue
+        existing = partition_names(db, table)
+        for offset in range(months_ahead + 1):
+            month = add_months(first, offset)
+            name = partition_name(table, month)
+            if name in existing:
+                continue
+            moved = create_partition(db, table, month)
+            db.commit()
+            if moved and table == "checks":
+                rebuild_rollups(db, month, add_months(month, 1))
+            print(f"🗂️  Created partition {name}" + (f" ({moved} rows moved from default)" if moved else ""))
+            created.append(name)
+    return created
+
+
+def detach_partition(db: Session, table: str, month: date) -> str:
+    """
+    Detach one month from its table, keeping the rows in a standalone table
+
+    The detached table keeps the partition's name and can be dumped and
+    dropped. For checks the month's rollups are removed too, so analytics
+    agree with the rows left in the table.
+
+    Returns:
+        Name of the detached table
+    """
+    name = partition_name(table, month)
+    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    if table == "checks":
+        start = datetime(month.year, month.month, 1)
+        end = datetime.combine(add_months(month, 1), datetime.min.time())
+        db.execute(delete(CheckRollup).where(CheckRollup.bucket >= start, CheckRollup.bucket < end))
+    db.commit()
+    print(f"📦 Detached {name} from {table}")
+    return name
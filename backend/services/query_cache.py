@@ -0,0 +1,198 @@
+"""
+Read-through Redis cache for hot transaction queries
+Entries are keyed by the query and the current versions of the tags it depends
+on (card, day, app, single transaction). Writes bump the tags of the rows they
+touch, so only queries that could see those rows stop matching; everything
+else keeps being served from Redis.
+"""
+import os
+import json
+import time
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services.redis_client import get_redis, run_blocking
+
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "60"))
+
+TAG_KEY_PREFIX = 'cache_tag:'
+ENTRY_KEY_PREFIX = 'qcache:'
+STATS_KEY = 'qcache:stats'
+
+# Bumped by every write; queries that can't be pinned to a card/day/app use it
+ALL_TAG = 'all'
+# Bumped by bulk statements whose rows aren't known; every entry depends on it
+EPOCH_TAG = 'epoch'
+
+# Date ranges longer than this depend on ALL_TAG instead of one tag per day
+MAX_DAY_TAGS = 62
+
+
+def card_tag(card: Optional[str]) -> str:
+    return f"card:{card or ''}"
+
+
+def day_tag(day: date) -> str:
+    return f"day:{day.isoformat()}"
+
+
+def app_tag(app: Optional[str]) -> str:
+    return f"app:{app or ''}"
+
+
+def txn_tag(row_id: int) -> str:
+    return f"txn:{row_id}"
+
+
+def row_tags(card: Optional[str], when: Optional[datetime], app: Optional[str], row_id: Optional[int] = None) -> List[str]:
+    """Tags a write to one row invalidates"""
+    tags = [ALL_TAG, card_tag(card), app_tag(app)]
+    if isinstance(when, date):
+        tags.append(day_tag(when.date() if isinstance(when, datetime) else when))
+    if row_id is not None:
+        tags.append(txn_tag(row_id))
+    return tags
+
+
+def filter_tags(filters) -> List[str]:
+    """
+    Tags a filtered check list depends on
+
+    Every row in the result matches all filters, so depending on any single
+    dimension is enough; the narrowest one available is picked.
+    """
+    if filters.card:
+        return [card_tag(filters.card)]
+    if filters.apps:
+        return [app_tag(app) for app in sorted(filters.apps)]
+    if filters.date_from and filters.date_to:
+        # One day of margin either side covers timezone-aware bounds
+        first = filters.date_from.date() - timedelta(days=1)
+        last = filters.date_to.date() + timedelta(days=1)
+        days = (last - first).days + 1
+        if 0 < days <= MAX_DAY_TAGS:
+            return [day_tag(first + timedelta(days=i)) for i in range(days)]
+    return [ALL_TAG]
+
+
+def tag_versions(tags: List[str]) -> List[int]:
+    """
+    Current version of each tag
+
+    Missing tags start from the current time in milliseconds, so a version
+    is never reissued after Redis drops the key.
+    """
+    client = get_redis()
+    keys = [TAG_KEY_PREFIX + tag for tag in tags]
+    versions = client.mget(keys)
+    missing = [key for key, version in zip(keys, versions) if version is None]
+    if missing:
+        now = int(time.time() * 1000)
+        for key in missing:
+            client.set(key, now, nx=True)
+        versions = client.mget(keys)
+    return [int(v) for v in versions]
+
+
+def bump_tags(tags: Iterable[str]):
+    """Invalidate every cached query depending on these tags"""
+    tags = sorted(set(tags))
+    if not tags:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(TAG_KEY_PREFIX + tag)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️  Failed to bump cache tags: {e}")
+
+
+def _record(name: str, hit: bool, elapsed_ms: float, saved_ms: float = 0.0):
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(STATS_KEY, f"{name}:{'hits' if hit else 'misses'}", 1)
+        if hit:
+            pipe.hincrbyfloat(STATS_KEY, f"{name}:saved_ms", saved_ms - elapsed_ms)
+        else:
+            pipe.hincrbyfloat(STATS_KEY, f"{name}:miss_ms", elapsed_ms)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def _lookup(name: str, params: Any, tags: List[str]):
+    """Entry key for the query at the tags' current versions, and the stored entry"""
+    tags = sorted(set(tags) | {EPOCH_TAG})
+    versions = tag_versions(tags)
+    raw = json.dumps([params, tags, versions], sort_keys=True, default=str)
+    key = f"{ENTRY_KEY_PREFIX}{name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+    return key, get_redis().get(key)
+
+
+def _store(key: str, entry: dict, ttl: int):
+    try:
+        get_redis().set(key, json.dumps(entry), ex=ttl)
+    except Exception:
+        pass
+
+
+def cached(name: str, params: Any, tags: List[str], compute: Callable[[], Any], ttl: int = QUERY_CACHE_TTL,
+           store: bool = True) -> Any:
+    """
+    Return the cached result for (name, params) or compute and store it
+
+    Args:
+        name: Query name, also the bucket for hit/miss stats
+        params: JSON-serializable normalized query parameters
+        tags: Tags whose writes invalidate the result
+        compute: Produces a JSON-serializable result on a miss
+        store: False serves hits but doesn't store misses, for results read
+               from a replica that may not have the latest tagged writes yet
+
+    None results (e.g. not found) aren't stored. Redis errors fall back to
+    computing the result directly. Inside AsyncSession.run_sync the Redis
+    round trips run off the event loop (see `run_blocking`).
+    """
+    started = time.perf_counter()
+    try:
+        key, entry = run_blocking(_lookup, name, params, tags)
+    except Exception:
+        return compute()
+
+    if entry is not None:
+        entry = json.loads(entry)
+        run_blocking(_record, name, True, (time.perf_counter() - started) * 1000, entry["ms"])
+        return entry["result"]
+
+    compute_started = time.perf_counter()
+    result = compute()
+    compute_ms = (time.perf_counter() - compute_started) * 1000
+    if result is not None and store:
+        run_blocking(_store, key, {"ms": compute_ms, "result": result}, ttl)
+    run_blocking(_record, name, False, (time.perf_counter() - started) * 1000)
+    return result
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Hit/miss counters per query name
+
+    saved_ms is the compute time hits avoided minus the time spent serving
+    them from Redis; miss_ms is the total time spent computing misses.
+    """
+    raw = get_redis().hgetall(STATS_KEY) or {}
+    stats: Dict[str, Dict[str, float]] = {}
+    for field, value in raw.items():
+        name, metric = field.rsplit(":", 1)
+        stats.setdefault(name, {"hits": 0, "misses": 0, "saved_ms": 0.0, "miss_ms": 0.0})[metric] = float(value)
+
+    for values in stats.values():
+        lookups = values["hits"] + values["misses"]
+        values["hits"] = int(values["hits"])
+        values["misses"] = int(values["misses"])
+        values["hit_ratio"] = round(values["hits"] / lookups, 4) if lookups else 0.0
+        values["saved_ms"] = round(values["saved_ms"], 1)
+        values["miss_ms"] = round(values["miss_ms"], 1)
+    return stats
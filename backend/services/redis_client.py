@@ -0,0 +1,44 @@
+"""
+Shared synchronous Redis client for API-side caches and change tracking
+"""
+import os
+import asyncio
+from typing import Any, Callable, Optional
+
+import redis
+from dotenv import load_dotenv
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Lazily created client; the connection pool is shared by all callers"""
+    global _client
+    if _client is None:
+        _client = redis.from_url(
+            REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+        )
+    return _client
+
+
+def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Call a blocking Redis function from sync code without stalling the event loop
+
+    Sync helpers also run inside AsyncSession.run_sync and the async session's
+    commit hooks, i.e. on the event loop thread in SQLAlchemy's greenlet; there
+    the call moves to a worker thread and the greenlet awaits it, so a slow
+    Redis holds up one request instead of the whole process. Anywhere else
+    (workers, scripts, threads) it is a plain call.
+    """
+    if in_greenlet():
+        return await_only(asyncio.to_thread(func, *args, **kwargs))
+    return func(*args, **kwargs)
@@ -0,0 +1,105 @@
+"""
+Short-TTL Redis cache with background refresh for expensive aggregates
+A value is served as-is while fresh; once older than `fresh_for` it is still
+served, and one background task recomputes it. A Redis lock makes sure only
+one process computes at a time, so a burst of requests behind an expired or
+missing value triggers a single query instead of one per request. Redis is
+called through the sync client in worker threads, off the event loop.
+"""
+import json
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.redis_client import get_redis
+
+KEY_PREFIX = 'refresh_cache:'
+LOCK_PREFIX = 'refresh_lock:'
+
+# A computation holding the lock longer than this is assumed dead
+LOCK_TTL = 30
+# How long cold callers wait for another process's result before computing
+WAIT_FOR_RESULT = 5.0
+POLL_INTERVAL = 0.1
+
+# Background refreshes running in this process, one per key
+_refreshing: Dict[str, asyncio.Task] = {}
+
+
+async def _read(key: str) -> Optional[dict]:
+    try:
+        raw = await asyncio.to_thread(get_redis().get, KEY_PREFIX + key)
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def _acquire(key: str) -> Optional[bool]:
+    """True if we hold the lock, False if someone else does, None without Redis"""
+    try:
+        return bool(await asyncio.to_thread(get_redis().set, LOCK_PREFIX + key, "1", nx=True, ex=LOCK_TTL))
+    except Exception:
+        return None
+
+
+async def _compute_and_store(key: str, compute: Callable[[], Awaitable[Any]], keep_for: int, locked: bool) -> Any:
+    try:
+        value = await compute()
+        try:
+            entry = json.dumps({"at": time.time(), "value": value})
+            await asyncio.to_thread(get_redis().set, KEY_PREFIX + key, entry, ex=keep_for)
+        except Exception:
+            pass
+        return value
+    finally:
+        if locked:
+            try:
+                await asyncio.to_thread(get_redis().delete, LOCK_PREFIX + key)
+            except Exception:
+                pass
+
+
+async def _refresh_in_background(key: str, compute: Callable[[], Awaitable[Any]], keep_for: int):
+    locked = await _acquire(key)
+    if locked is False:
+        return
+    try:
+        await _compute_and_store(key, compute, keep_for, bool(locked))
+    except Exception as e:
+        print(f"⚠️  Background refresh of {key} failed: {e}")
+
+
+async def cached_with_refresh(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    fresh_for: int,
+    keep_for: int,
+) -> Any:
+    """
+    Cached result of `compute`, refreshed in the background once stale
+
+    Args:
+        key: Cache key
+        compute: Coroutine function producing a JSON-serializable value; it
+                 may outlive the request, so it must open its own session
+        fresh_for: Seconds a value is served without triggering a refresh
+        keep_for: Seconds a value is kept at all (served stale until then)
+    """
+    entry = await _read(key)
+    if entry is not None:
+        if time.time() - entry["at"] >= fresh_for:
+            task = _refreshing.get(key)
+            if task is None or task.done():
+                _refreshing[key] = asyncio.create_task(_refresh_in_background(key, compute, keep_for))
+        return entry["value"]
+
+    # Cold cache: one caller computes, the rest wait for its result
+    locked = await _acquire(key)
+    if locked is False:
+        deadline = time.monotonic() + WAIT_FOR_RESULT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            entry = await _read(key)
+            if entry is not None:
+                return entry["value"]
+    return await _compute_and_store(key, compute, keep_for, bool(locked))
@@ -24,3 +24,138 @@ def db_session():
         yield session
     finally:
         session.close()
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands API-side caches use"""
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self._stream_seq = 0
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def hincrby(self, name, key, amount=1):
+        fields = self.data.setdefault(name, {})
+        fields[key] = str(int(fields.get(key, 0)) + amount)
+
+    def hincrbyfloat(self, name, key, amount=1.0):
+        fields = self.data.setdefault(name, {})
+        fields[key] = str(float(fields.get(key, 0)) + amount)
+
+    def hgetall(self, name):
+        return dict(self.data.get(name, {}))
+
+    def hset(self, name, key, value):
+        self.data.setdefault(name, {})[key] = str(value)
+
+    def hdel(self, name, *keys):
+        fields = self.data.get(name, {})
+        return sum(1 for key in keys if fields.pop(key, None) is not None)
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self._stream_seq += 1
+        event_id = f"{self._stream_seq}-0"
+        entries = self.data.setdefault(name, [])
+        entries.append((event_id, dict(fields)))
+        if maxlen is not None:
+            del entries[:-maxlen]
+        return event_id
+
+    def xrange(self, name, min="-", max="+", count=None):
+        def key(event_id):
+            return tuple(int(part) for part in event_id.split("-"))
+
+        entries = [
+            entry for entry in self.data.get(name, [])
+            if (min == "-" or key(entry[0]) >= key(min)) and (max == "+" or key(entry[0]) <= key(max))
+        ]
+        return entries[:count] if count else entries
+
+    def xrevrange(self, name, max="+", min="-", count=None):
+        entries = list(reversed(self.xrange(name, min=min, max=max)))
+        return entries[:count] if count else entries
+
+    def xlen(self, name):
+        return len(self.data.get(name, []))
+
+    def xdel(self, name, *ids):
+        entries = self.data.get(name, [])
+        kept = [entry for entry in entries if entry[0] not in ids]
+        self.data[name] = kept
+        return len(entries) - len(kept)
+
+    def xack(self, name, group, *ids):
+        acked = self.data.setdefault(f"{name}:{group}:acked", [])
+        acked.extend(ids)
+        return len(ids)
+
+    def zadd(self, name, mapping):
+        self.data.setdefault(name, {}).update(mapping)
+
+    def zrangebyscore(self, name, min, max, start=None, num=None):
+        members = sorted((score, member) for member, score in self.data.get(name, {}).items())
+        due = [member for score, member in members if min <= score <= max]
+        return due[start:start + num] if num is not None else due
+
+    def zrem(self, name, *members):
+        scores = self.data.get(name, {})
+        return sum(1 for member in members if scores.pop(member, None) is not None)
+
+    def rpush(self, name, *values):
+        items = self.data.setdefault(name, [])
+        items.extend(values)
+        return len(items)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands and runs them against the fake on execute()"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((getattr(self.client, name), args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self.calls = self.calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Route services.redis_client.get_redis() to an in-memory fake."""
+    from services import redis_client
+
+    client = FakeRedis()
+    monkeypatch.setattr(redis_client, "_client", client)
+    return client
@@ -0,0 +1,108 @@
+import time
+import asyncio
+import itertools
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from api.routes.analytics import summary_query, top_agent_query
+from database.models import Transaction
+from services.refresh_cache import cached_with_refresh
+
+NOW = datetime(2025, 4, 2, 15, 0)
+# BIGINT keys don't autoincrement on SQLite
+IDS = itertools.count(1)
+
+
+def add_transaction(db_session, minutes_ago, amount, app=None, operator="SmartBank P2P", currency="UZS"):
+    db_session.add(Transaction(
+        id=next(IDS),
+        raw_message="receipt",
+        source_type="AUTO",
+        source_chat_id=1,
+        transaction_date=NOW - timedelta(minutes=minutes_ago),
+        amount=Decimal(amount),
+        currency=currency,
+        operator_raw=operator,
+        application_mapped=app,
+        transaction_type="DEBIT",
+        parsed_at=NOW - timedelta(minutes=minutes_ago),
+    ))
+
+
+def test_top_agent_is_ranked_and_totalled_in_sql(db_session):
+    add_transaction(db_session, 5, "100000.10", app="Payme")
+    add_transaction(db_session, 10, "0.20", app="Payme")
+    add_transaction(db_session, 15, "50", app="Payme", currency="USD")
+    add_transaction(db_session, 20, "999999.99", app="Click")
+    add_transaction(db_session, 25, "1.01", app="", operator="")
+    # Outside the window
+    add_transaction(db_session, 90, "5", app="Click")
+    add_transaction(db_session, 95, "5", app="Click")
+    db_session.commit()
+
+    row = db_session.execute(top_agent_query(NOW - timedelta(hours=1), NOW)).one()
+
+    assert row.app == "Payme"
+    assert row.app_count == 3
+    assert row.total_count == 5
+    # UZS only, exact to the tiyin
+    assert Decimal(row.app_volume) == Decimal("100000.30")
+    assert Decimal(row.total_volume) == Decimal("1100001.30")
+
+
+def test_empty_window_returns_no_row(db_session):
+    add_transaction(db_session, 90, "5", app="Click")
+    db_session.commit()
+
+    assert db_session.execute(top_agent_query(NOW - timedelta(hours=1), NOW)).first() is None
+
+
+def test_summary_figures_come_from_one_conditional_aggregate(db_session):
+    add_transaction(db_session, 5, "100.50", app="Payme")
+    add_transaction(db_session, 10, "20", app="Click", currency="USD")
+    db_session.add(Transaction(
+        id=next(IDS), raw_message="receipt", source_type="AUTO", source_chat_id=1,
+        transaction_date=NOW, amount=Decimal("9.50"), currency="UZS", transaction_type="CREDIT",
+        is_gpt_parsed=True, parsing_confidence=0.5,
+    ))
+    db_session.commit()
+
+    row = db_session.execute(summary_query()).one()
+
+    assert (row.total, row.debit, row.credit, row.gpt) == (3, 2, 1, 1)
+    assert Decimal(row.volume_uzs) == Decimal("110.00")
+    assert row.avg_confidence == 0.5
+
+
+def test_stale_summary_is_served_while_one_refresh_runs(fake_redis, monkeypatch):
+    from services import refresh_cache
+
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return {"calls": len(calls)}
+
+    async def scenario():
+        first = await cached_with_refresh("summary", compute, fresh_for=10, keep_for=60)
+        cached = await cached_with_refresh("summary", compute, fresh_for=10, keep_for=60)
+
+        # Age the entry past fresh_for: callers get the old value at once
+        clock = time.time() + 11
+        monkeypatch.setattr(refresh_cache.time, "time", lambda: clock)
+        stale = [await cached_with_refresh("summary", compute, fresh_for=10, keep_for=60) for _ in range(3)]
+        await asyncio.gather(*refresh_cache._refreshing.values())
+        fresh = await cached_with_refresh("summary", compute, fresh_for=10, keep_for=60)
+        return first, cached, stale, fresh
+
+    first, cached, stale, fresh = asyncio.run(scenario())
+
+    assert first == cached == {"calls": 1}
+    assert stale == [{"calls": 1}] * 3
+    assert fresh == {"calls": 2}
+    assert len(calls) == 2
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiosqlite")
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import database.connection as connection
+from api.routes.transactions import get_transaction
+from database.connection import get_async_db_session
+from database.models import Base, Check
+
+
+@pytest.fixture
+def async_sessions(tmp_path, monkeypatch):
+    """Point the async session dependency at an aiosqlite database"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'api.db'}")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    monkeypatch.setattr(connection, "AsyncSessionLocal", factory)
+    yield factory
+    asyncio.run(engine.dispose())
+
+
+def call_route(route, *args):
+    """Run a route the way FastAPI does, with a session from the dependency"""
+    async def scenario():
+        async for db in get_async_db_session():
+            return await route(*args, db=db)
+    return asyncio.run(scenario())
+
+
+def add_check(async_sessions) -> int:
+    async def scenario():
+        async with async_sessions() as db:
+            check = Check(
+                datetime=datetime(2025, 4, 2, 15, 33), weekday="Ср", date_display="2 апр",
+                time_display="15:33", operator="Payme", amount=Decimal("-1000.00"), card_last4="6921",
+                transaction_type="DEBIT", currency="UZS", source="Telegram", added_via="bot",
+            )
+            db.add(check)
+            await db.commit()
+            return check.id
+    return asyncio.run(scenario())
+
+
+def test_route_reads_through_the_async_session_dependency(async_sessions, fake_redis):
+    check_id = add_check(async_sessions)
+
+    payload = call_route(get_transaction, check_id)
+    assert payload["id"] == check_id
+    assert payload["operator_raw"] == "Payme"
+    assert payload["card_last_4"] == "6921"
+
+    with pytest.raises(HTTPException) as missing:
+        call_route(get_transaction, check_id + 1)
+    assert missing.value.status_code == 404
+
+
+def test_redis_round_trips_stay_off_the_event_loop(async_sessions, fake_redis, monkeypatch):
+    # asyncio.run drives the loop on the main thread
+    on_loop = []
+    for name in ("get", "set", "mget", "pipeline"):
+        method = getattr(fake_redis, name)
+
+        def recording(*args, _method=method, **kwargs):
+            on_loop.append(threading.current_thread() is threading.main_thread())
+            return _method(*args, **kwargs)
+        monkeypatch.setattr(fake_redis, name, recording)
+
+    # Commit hooks bump versions and publish events, the route reads the query cache
+    check_id = add_check(async_sessions)
+    call_route(get_transaction, check_id)
+    call_route(get_transaction, check_id)
+
+    assert on_loop and not any(on_loop)
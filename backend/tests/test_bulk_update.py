@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from sqlalchemy import update
+
+from api.routes.transactions import BulkUpdateItem, _plan_bulk_updates
+from database.models import Check
+
+
+def add_check(db_session, transaction_type="DEBIT", amount="-1000.00"):
+    check = Check(
+        datetime=datetime(2025, 4, 2, 15, 33), weekday="Ср", date_display="2 апр", time_display="15:33",
+        operator="SmartBank", amount=Decimal(amount), card_last4="6921", transaction_type=transaction_type,
+        currency="UZS", source="Telegram", added_via="bot", updated_at=datetime(2025, 4, 2, 15, 33),
+    )
+    db_session.add(check)
+    db_session.commit()
+    return check.id
+
+
+def test_plan_keeps_per_id_failures_and_sign_rules():
+    updates = [
+        BulkUpdateItem(id=1, fields={"amount": "500", "operator_raw": "Payme", "unknown": "dropped"}),
+        BulkUpdateItem(id=99, fields={"amount": "1"}),
+        BulkUpdateItem(id=2, fields={"transaction_type": "Пополнение", "amount": "-700"}),
+        BulkUpdateItem(id=1, fields={"source_type": "MANUAL", "transaction_date": "2025-04-03T10:00:00Z"}),
+    ]
+
+    rows, failed_ids, errors, updated_count = _plan_bulk_updates(updates, {1: "DEBIT", 2: "DEBIT"})
+
+    assert failed_ids == [99]
+    assert errors == ["ID 99 not found"]
+    assert updated_count == 3
+    assert rows[1] == {
+        "amount": Decimal("-500"),
+        "operator": "Payme",
+        "added_via": "manual",
+        "datetime": datetime(2025, 4, 3, 10, 0),
+        # Re-dated rows carry their calendar columns along
+        "dow": 4,
+        "hour": 10,
+        "local_date": date(2025, 4, 3),
+    }
+    assert rows[2] == {"transaction_type": "CREDIT", "amount": Decimal("700")}
+
+
+def test_planned_rows_apply_in_one_bulk_update(db_session):
+    first, second = add_check(db_session), add_check(db_session)
+    current_types = dict(db_session.query(Check.id, Check.transaction_type).all())
+    rows, _, _, _ = _plan_bulk_updates([
+        BulkUpdateItem(id=first, fields={"amount": "250", "application_mapped": "Payme"}),
+        BulkUpdateItem(id=second, fields={"currency": "USD"}),
+    ], current_types)
+
+    db_session.execute(update(Check), [{"id": row_id, **values} for row_id, values in rows.items()])
+    db_session.commit()
+
+    checks = {c.id: c for c in db_session.query(Check).all()}
+    assert (checks[first].amount, checks[first].app) == (Decimal("-250.00"), "Payme")
+    assert checks[second].currency == "USD"
+    assert checks[first].updated_at != datetime(2025, 4, 2, 15, 33)
@@ -0,0 +1,61 @@
+import inspect
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from sqlalchemy import select
+
+from api.filters import TransactionFilters
+from database.models import Check, calendar_values
+
+
+def make_filters(**values):
+    params = {name: None for name in inspect.signature(TransactionFilters).parameters}
+    params.update(values)
+    return TransactionFilters(**params)
+
+
+def add_check(db_session, when):
+    check = Check(
+        datetime=when, weekday="Ср", date_display="2 апр", time_display=when.strftime("%H:%M"),
+        operator="SmartBank", amount=Decimal("-1000"), card_last4="6921", transaction_type="DEBIT",
+        currency="UZS", source="Telegram",
+    )
+    db_session.add(check)
+    db_session.commit()
+    return check
+
+
+def test_calendar_values_match_extract_dow():
+    # 2025-04-06 is a Sunday: 0, as PostgreSQL's EXTRACT(dow)
+    assert calendar_values(datetime(2025, 4, 6, 23, 59)) == {"dow": 0, "hour": 23, "local_date": date(2025, 4, 6)}
+    assert calendar_values(datetime(2025, 4, 7, 0, 0))["dow"] == 1
+    assert calendar_values(None) == {"dow": None, "hour": None, "local_date": None}
+
+
+def test_orm_writes_keep_calendar_columns_in_sync(db_session):
+    check = add_check(db_session, datetime(2025, 4, 2, 15, 33))
+    assert (check.dow, check.hour, check.local_date) == (3, 15, date(2025, 4, 2))
+
+    check.datetime = datetime(2025, 4, 6, 9, 5)
+    db_session.commit()
+    db_session.expire_all()
+    stored = db_session.get(Check, check.id)
+    assert (stored.dow, stored.hour, stored.local_date) == (0, 9, date(2025, 4, 6))
+
+
+def test_weekday_and_hour_filters_use_the_stored_columns(db_session):
+    wednesday = add_check(db_session, datetime(2025, 4, 2, 15, 33)).id
+    sunday = add_check(db_session, datetime(2025, 4, 6, 9, 5)).id
+    add_check(db_session, datetime(2025, 4, 7, 15, 0))
+
+    def ids(**values):
+        return sorted(db_session.scalars(make_filters(**values).apply(select(Check.id))))
+
+    assert ids(days_of_week="0,3") == [wednesday, sunday]
+    assert ids(days_of_week="0", hours="9,10") == [sunday]
+    assert ids(hours="15", days_of_week="3") == [wednesday]
+    assert not make_filters(days_of_week="1", hours="8").is_heavy
@@ -0,0 +1,91 @@
+import os
+import json
+import importlib.util
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from workers.change_relay import ChangeRelay, coalesce, parse_notification
+from workers.queues import EVENTS_CHANNEL
+
+
+def published(fake_redis):
+    return [json.loads(json.loads(message)["data"]) for channel, message in fake_redis.published if channel == EVENTS_CHANNEL]
+
+
+def test_parse_notification_rejects_malformed_payloads():
+    assert parse_notification("checks:insert:42") == ("checks", "insert", 42)
+    assert parse_notification("checks:truncate:42") is None
+    assert parse_notification("checks:insert:") is None
+    assert parse_notification("garbage") is None
+
+
+def test_coalesce_folds_partition_moves_into_updates_and_caps_ids():
+    changes = [
+        ("checks", "insert", 1), ("checks", "insert", 2), ("checks", "insert", 2),
+        # Row 3 changed month: DELETE from one partition, INSERT into another
+        ("checks", "delete", 3), ("checks", "insert", 3),
+        ("checks", "delete", 4),
+    ]
+
+    assert coalesce(changes) == [
+        {"type": "change", "table": "checks", "op": "delete", "ids": [4]},
+        {"type": "change", "table": "checks", "op": "insert", "ids": [1, 2]},
+        {"type": "change", "table": "checks", "op": "update", "ids": [3]},
+    ]
+    assert coalesce([("checks", "insert", i) for i in range(3)], max_ids=2) == [
+        {"type": "change", "table": "checks", "op": "insert"},
+    ]
+
+
+def test_relay_publishes_a_batch_as_live_events(fake_redis):
+    events = ChangeRelay().publish(["checks:insert:7", "bad", "checks:insert:5"])
+
+    assert events == [{"type": "change", "table": "checks", "op": "insert", "ids": [5, 7]}]
+    assert published(fake_redis) == events
+
+
+def _migration_0008():
+    path = Path(__file__).resolve().parents[1] / "migrations" / "versions" / "20261018_0008_checks_change_notify.py"
+    spec = importlib.util.spec_from_file_location("migration_0008", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.skipif(not os.getenv("PERF_DATABASE_URL"), reason="PERF_DATABASE_URL not set")
+def test_trigger_notifies_for_writes_outside_the_backend_only():
+    pytest.importorskip("alembic")
+    engine = create_engine(os.environ["PERF_DATABASE_URL"])
+    relay = ChangeRelay(os.environ["PERF_DATABASE_URL"], window=0.1)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS notify_test CASCADE"))
+        conn.execute(text("CREATE SCHEMA notify_test"))
+        conn.execute(text("CREATE TABLE notify_test.checks (id INT)"))
+        conn.execute(text(_migration_0008().NOTIFY_FUNCTION.replace("change_notify()", "notify_test.change_notify()")))
+        conn.execute(text(
+            "CREATE TRIGGER checks_change_notify AFTER INSERT OR UPDATE OR DELETE ON notify_test.checks "
+            "FOR EACH ROW EXECUTE FUNCTION notify_test.change_notify('checks')"
+        ))
+
+    listener = relay.connect()
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO notify_test.checks VALUES (1), (2)"))
+        with engine.begin() as conn:
+            # How backend connections mark their writes as already published
+            conn.execute(text("SET LOCAL app.events_published = 'on'"))
+            conn.execute(text("INSERT INTO notify_test.checks VALUES (3)"))
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM notify_test.checks WHERE id = 1"))
+
+        payloads = relay.collect(listener, timeout=2)
+        payloads += relay.collect(listener, timeout=0.5)
+    finally:
+        listener.close()
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA notify_test CASCADE"))
+        engine.dispose()
+
+    assert payloads == ["checks:insert:1", "checks:insert:2", "checks:delete:1"]
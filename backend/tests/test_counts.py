@@ -0,0 +1,88 @@
+import inspect
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg, psycopg2
+
+from api.counts import count_checks, driver_params
+from api.filters import TransactionFilters
+from database.models import Check
+
+
+def make_filters(**values):
+    params = {name: None for name in inspect.signature(TransactionFilters).parameters}
+    params.update(values)
+    return TransactionFilters(**params)
+
+
+def add_check(db_session, operator, amount, card="6921"):
+    db_session.add(Check(
+        datetime=datetime(2025, 4, 2, 15, 33),
+        weekday="Ср",
+        date_display="2 апр",
+        time_display="15:33",
+        operator=operator,
+        amount=Decimal(amount),
+        card_last4=card,
+        transaction_type="DEBIT",
+        currency="UZS",
+        source="Telegram",
+    ))
+    db_session.commit()
+
+
+def test_exact_counts_are_cached_until_checks_are_written(db_session, fake_redis):
+    add_check(db_session, "SmartBank P2P", "-200000")
+    filters = make_filters(card="6921")
+    query = filters.apply(db_session.query(Check))
+
+    assert count_checks(db_session, query, filters) == (1, False)
+
+    # Rows inserted behind the ORM's back don't invalidate the cache...
+    db_session.execute(Check.__table__.insert().values(
+        datetime=datetime(2025, 4, 2, 16, 0), weekday="Ср", date_display="2 апр", time_display="16:00",
+        operator="Payme", amount=Decimal("-1000"), card_last4="6921", transaction_type="DEBIT",
+        currency="UZS", source="SMS",
+    ))
+    assert count_checks(db_session, query, filters) == (1, False)
+
+    # ...but committed ORM writes bump the checks version
+    add_check(db_session, "Click", "-5000")
+    assert count_checks(db_session, query, filters) == (3, False)
+
+
+def test_heavy_filters_fall_back_to_exact_without_planner_and_none_skips(db_session, fake_redis):
+    add_check(db_session, "SmartBank P2P", "-200000")
+    add_check(db_session, "Payme", "-1000")
+    filters = make_filters(operator="smart")
+    query = filters.apply(db_session.query(Check))
+
+    assert filters.is_heavy
+    assert count_checks(db_session, query, filters, "auto") == (1, False)  # SQLite has no EXPLAIN estimate
+    assert count_checks(db_session, query, filters, "none") == (None, False)
+
+
+def test_filter_cache_key_is_stable_and_ignores_inactive_filters():
+    assert make_filters().cache_key() == "all"
+    assert make_filters(apps="Payme,Click").cache_key() == make_filters(apps=" Click , Payme").cache_key()
+    assert make_filters(card="6921").cache_key() != make_filters(card="0907").cache_key()
+    assert not make_filters(card="6921", amount_min=Decimal("10")).is_heavy
+
+
+def test_driver_params_follow_placeholder_style():
+    query = select(Check.id).where(
+        Check.card_last4 == "6921", Check.operator.in_(["Payme", "Click"]), Check.amount > 5
+    )
+    options = {"render_postcompile": True}
+
+    positional = query.compile(dialect=asyncpg.dialect(), compile_kwargs=options)
+    assert driver_params(positional) == ("6921", 5, "Payme", "Click")
+    assert "$1" in str(positional) and "$4" in str(positional)
+
+    named = query.compile(dialect=psycopg2.dialect(), compile_kwargs=options)
+    assert driver_params(named)["card_last4_1"] == "6921"
@@ -0,0 +1,224 @@
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("redis")
+
+from workers import dead_letter, results
+from workers.dead_letter import (
+    ATTEMPTS_KEY,
+    MAX_ATTEMPTS,
+    DeadLetterQueue,
+    backoff_delay,
+    build_entry,
+    decode_entry,
+    record_attempt,
+)
+from workers.queues import DEAD_LETTER_STREAM, RECEIPT_QUEUE, RESULT_CHANNEL, RETRY_SCHEDULE
+
+MANUAL_TASK = {
+    "raw_text": "HUMOCARD *6921: oplata 200000.00 UZS; SmartBank; 25-04-02 15:33",
+    "source_type": "MANUAL",
+    "source_chat_id": 1001,
+    "source_message_id": 7,
+    "status_message_id": 8,
+}
+
+
+@pytest.fixture
+def worker_redis(fake_redis, monkeypatch):
+    """The in-memory Redis also behind the dead-letter stream, result events and consumers"""
+    monkeypatch.setattr(dead_letter.redis, "from_url", lambda *args, **kwargs: fake_redis)
+    monkeypatch.setattr(results, "_redis_client", fake_redis)
+    return fake_redis
+
+
+def test_backoff_delay_grows_exponentially_and_is_capped(monkeypatch):
+    monkeypatch.setattr(dead_letter, "BACKOFF_BASE_SECONDS", 5.0)
+    monkeypatch.setattr(dead_letter, "BACKOFF_MAX_SECONDS", 60.0)
+
+    delays = [backoff_delay(attempt, jitter=False) for attempt in range(1, 7)]
+
+    assert delays == [5.0, 10.0, 20.0, 40.0, 60.0, 60.0]
+
+
+def test_backoff_delay_jitter_stays_within_bounds(monkeypatch):
+    monkeypatch.setattr(dead_letter, "BACKOFF_BASE_SECONDS", 10.0)
+    monkeypatch.setattr(dead_letter, "BACKOFF_MAX_SECONDS", 600.0)
+
+    for _ in range(50):
+        assert 16.0 <= backoff_delay(2) <= 24.0
+
+
+def test_entry_round_trip_keeps_payload_and_attempt_history():
+    task_data = {
+        "raw_text": "HUMOCARD *6921: oplata 200000.00 UZS; SmartBank; 25-04-02 15:33",
+        "source_type": "AUTO",
+        "source_chat_id": 915326936,
+        "source_message_id": 42,
+    }
+    record_attempt(task_data, TimeoutError("db timeout"))
+    record_attempt(task_data, ConnectionError("db down"))
+
+    fields = build_entry(task_data, ConnectionError("db down"))
+    record = decode_entry("1700000000000-0", fields)
+
+    assert record["payload"] == {k: v for k, v in task_data.items() if k != ATTEMPTS_KEY}
+    assert record["error_class"] == "ConnectionError"
+    assert record["error_message"] == "db down"
+    assert record["attempt_count"] == 2
+    assert [a["error_class"] for a in record["attempts"]] == ["TimeoutError", "ConnectionError"]
+    assert [a["attempt"] for a in record["attempts"]] == [1, 2]
+
+
+def published_statuses(fake):
+    return [json.loads(message)["status"] for channel, message in fake.published if channel == RESULT_CHANNEL]
+
+
+def test_handle_failure_retries_transient_errors_then_dead_letters(worker_redis):
+    pytest.importorskip("celery")
+    from workers.celery_worker import handle_failure
+
+    task_data = dict(MANUAL_TASK)
+    delays = [handle_failure(task_data, ConnectionError("db down")) for _ in range(MAX_ATTEMPTS)]
+
+    assert all(delay > 0 for delay in delays[:-1])
+    assert delays[-1] is None
+    assert published_statuses(worker_redis) == ["retrying"] * (MAX_ATTEMPTS - 1) + ["failed"]
+
+    [record] = DeadLetterQueue().list()
+    assert record["attempt_count"] == MAX_ATTEMPTS
+    assert record["payload"]["raw_text"] == MANUAL_TASK["raw_text"]
+
+
+def test_handle_failure_dead_letters_unparseable_receipts_at_once(worker_redis):
+    pytest.importorskip("celery")
+    from workers.celery_worker import ReceiptParsingError, handle_failure
+
+    assert handle_failure(dict(MANUAL_TASK), ReceiptParsingError("no strategy matched")) is None
+    assert worker_redis.xlen(DEAD_LETTER_STREAM) == 1
+    assert DeadLetterQueue().list()[0]["error_class"] == "ReceiptParsingError"
+
+
+def test_due_retry_is_queued_once_by_racing_consumers(worker_redis):
+    pytest.importorskip("celery")
+    from workers.celery_worker import QueueConsumer
+
+    first, second = QueueConsumer(), QueueConsumer()
+    worker_redis.zadd(RETRY_SCHEDULE, {json.dumps(MANUAL_TASK): 0})
+
+    read_due = worker_redis.zrangebyscore
+
+    def racing_read(*args, **kwargs):
+        due = read_due(*args, **kwargs)
+        # The other consumer promotes the same entry between our read and our move
+        worker_redis.zrangebyscore = read_due
+        second.promote_due_retries()
+        return due
+
+    worker_redis.zrangebyscore = racing_read
+    assert first.promote_due_retries() == 0
+
+    assert worker_redis.data[RECEIPT_QUEUE] == [json.dumps(MANUAL_TASK)]
+    assert worker_redis.zrangebyscore(RETRY_SCHEDULE, 0, float("inf")) == []
+
+
+def test_replay_route_schedules_and_runs_the_batch_pipeline(worker_redis, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("celery")
+    from fastapi import BackgroundTasks, HTTPException
+
+    from api.routes.dead_letters import ReplayRequest, replay_dead_letters
+    from workers import celery_worker
+
+    dlq = DeadLetterQueue()
+    for message_id in (1, 2, 3):
+        task_data = dict(MANUAL_TASK, source_message_id=message_id)
+        record_attempt(task_data, ConnectionError("db down"))
+        dlq.push(task_data, ConnectionError("db down"))
+
+    replayed = []
+
+    def process_receipt_batch(payloads):
+        replayed.extend(payloads)
+        return [{"success": payload["source_message_id"] != 2} for payload in payloads]
+
+    monkeypatch.setattr(celery_worker, "process_receipt_batch", process_receipt_batch)
+
+    background = BackgroundTasks()
+    response = asyncio.run(replay_dead_letters(ReplayRequest(limit=2), background))
+    assert response.scheduled == 2
+    asyncio.run(background())
+
+    # Replayed entries leave the stream and keep their attempt history
+    assert [payload["source_message_id"] for payload in replayed] == [1, 2]
+    assert all(len(payload[ATTEMPTS_KEY]) == 1 for payload in replayed)
+    assert [record["payload"]["source_message_id"] for record in dlq.list()] == [3]
+
+    dlq.delete([record["id"] for record in dlq.list()])
+    with pytest.raises(HTTPException) as empty:
+        asyncio.run(replay_dead_letters(ReplayRequest(), BackgroundTasks()))
+    assert empty.value.status_code == 404
+
+
+class NoopSession:
+    """Session for consumers whose writes are stubbed out"""
+
+    def commit(self):
+        pass
+
+
+def test_malformed_parsed_entry_is_dead_lettered_and_acked_with_its_batch(worker_redis, monkeypatch):
+    pytest.importorskip("celery")
+    from contextlib import contextmanager
+
+    import database.connection
+    from parsers.edge_parser import encode_parsed
+    from workers import celery_worker
+    from workers.queues import PARSED_STREAM, PARSED_STREAM_GROUP
+
+    @contextmanager
+    def get_db():
+        yield NoopSession()
+
+    saved = []
+    monkeypatch.setattr(database.connection, "get_db", get_db)
+    monkeypatch.setattr(celery_worker, "_save_transaction", lambda db, task_data, parsed_data: saved.append(task_data))
+    monkeypatch.setattr(celery_worker, "_result", lambda transaction, parsed_data: {})
+    monkeypatch.setattr(celery_worker, "_log_failure", lambda raw_text, error_message: None)
+
+    parsed = {"transaction_date": datetime(2025, 4, 2, 15, 33), "amount": Decimal("200000.00")}
+    good = encode_parsed(dict(MANUAL_TASK, source_message_id=1), parsed)
+    bad = dict(encode_parsed(dict(MANUAL_TASK, source_message_id=2), parsed), parsed="{not json")
+
+    celery_worker.ParsedReceiptConsumer().insert_batch([("1-0", good), ("2-0", bad)])
+
+    assert [task_data["source_message_id"] for task_data in saved] == [1]
+    [record] = DeadLetterQueue().list()
+    assert record["payload"]["source_message_id"] == 2
+    assert record["error_class"] == "JSONDecodeError" and record["attempt_count"] == 1
+    # Neither entry is left pending
+    assert worker_redis.data[f"{PARSED_STREAM}:{PARSED_STREAM_GROUP}:acked"] == ["1-0", "2-0"]
+    assert "failed" in published_statuses(worker_redis)
+
+
+def test_replay_keeps_entries_when_the_batch_fails_as_a_whole(worker_redis, monkeypatch):
+    pytest.importorskip("celery")
+    from workers import celery_worker
+
+    dlq = DeadLetterQueue()
+    for message_id in (1, 2):
+        dlq.push(dict(MANUAL_TASK, source_message_id=message_id), ConnectionError("db down"))
+
+    def process_receipt_batch(payloads):
+        raise ConnectionError("db still down")
+
+    monkeypatch.setattr(celery_worker, "process_receipt_batch", process_receipt_batch)
+
+    with pytest.raises(ConnectionError):
+        dlq.replay()
+
+    assert [record["payload"]["source_message_id"] for record in dlq.list()] == [1, 2]
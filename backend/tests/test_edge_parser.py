@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("pytz")
+pytest.importorskip("openai")
+
+from database.models import OperatorMapping
+from parsers.edge_parser import EdgeParser, decode_parsed, encode_parsed
+
+
+SEMICOLON_RECEIPT = "HUMOCARD *6921: oplata 200000.00 UZS; SmartBank P2P HUMO U; 25-04-02 15:33; Dostupno: 1852200.28 UZS"
+
+
+def make_parser(db_session):
+    db_session.add(OperatorMapping(pattern="SMARTBANK", app_name="SmartBank", priority=5, is_active=True))
+    db_session.commit()
+    parser = EdgeParser()
+    parser.refresh_mappings(db_session)
+    return parser
+
+
+def test_edge_parser_maps_operator_for_regex_formats(db_session):
+    parser = make_parser(db_session)
+
+    parsed = parser.parse(SEMICOLON_RECEIPT)
+
+    assert parsed is not None
+    assert parsed["parsing_method"] == "REGEX_SEMICOLON"
+    assert parsed["application_mapped"] == "SmartBank"
+    assert parsed["is_gpt_parsed"] is False
+
+
+def test_edge_parser_defers_unknown_formats_and_missing_mappings(db_session):
+    parser = make_parser(db_session)
+    assert parser.parse("Оплата 5000 UZS где-то в магазине, без даты и карты") is None
+
+    assert EdgeParser().parse(SEMICOLON_RECEIPT) is None  # mappings never loaded
+
+
+def test_encode_decode_round_trip_restores_types(db_session):
+    parser = make_parser(db_session)
+    parsed = parser.parse(SEMICOLON_RECEIPT)
+    task_data = {"raw_text": SEMICOLON_RECEIPT, "source_type": "AUTO", "source_chat_id": 1, "source_message_id": 7}
+
+    decoded_task, decoded = decode_parsed(encode_parsed(task_data, parsed))
+
+    assert decoded_task == task_data
+    assert decoded["amount"] == Decimal("200000.00")
+    assert decoded["balance_after"] == Decimal("1852200.28")
+    assert decoded["transaction_date"] == parsed["transaction_date"]
+    assert decoded["application_mapped"] == "SmartBank"
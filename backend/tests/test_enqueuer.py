@@ -0,0 +1,105 @@
+import asyncio
+
+from ingestion.enqueuer import BatchingEnqueuer
+from workers.queues import RECEIPT_QUEUE
+
+
+class RecordingPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def rpush(self, key, value):
+        self.commands.append(("rpush", key, value))
+
+    def xadd(self, key, fields, **kwargs):
+        self.commands.append(("xadd", key, fields))
+
+    def hset(self, key, field, value):
+        self.commands.append(("hset", key, field, value))
+
+    async def execute(self):
+        if self.client.fail:
+            raise ConnectionError("redis down")
+        self.client.executed.append(self.commands)
+        return [1] * len(self.commands)
+
+
+class RecordingRedis:
+    """Collects what each pipelined round trip would have sent"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.executed = []
+
+    def pipeline(self, transaction=True):
+        return RecordingPipeline(self)
+
+
+def test_concurrent_enqueues_are_coalesced_into_one_round_trip():
+    async def scenario():
+        client = RecordingRedis()
+        enqueuer = BatchingEnqueuer(client, max_batch=100, max_delay_ms=5)
+        await asyncio.gather(*(enqueuer.enqueue(RECEIPT_QUEUE, f"receipt-{i}") for i in range(30)))
+        await enqueuer.close()
+        return client
+
+    client = asyncio.run(scenario())
+
+    assert len(client.executed) == 1
+    assert [cmd[2] for cmd in client.executed[0]] == [f"receipt-{i}" for i in range(30)]
+
+
+def test_batches_respect_max_batch_and_run_hooks_in_same_pipeline():
+    async def scenario():
+        client = RecordingRedis()
+        enqueuer = BatchingEnqueuer(client, max_batch=10, max_delay_ms=5)
+        await asyncio.gather(*(
+            enqueuer.enqueue(RECEIPT_QUEUE, f"receipt-{i}", lambda pipe, i=i: pipe.hset("checkpoints", "chat", i))
+            for i in range(25)
+        ))
+        await enqueuer.close()
+        return client
+
+    client = asyncio.run(scenario())
+
+    assert [len(batch) for batch in client.executed] == [20, 20, 10]  # receipt + hook per item
+    assert client.executed[0][:2] == [("rpush", RECEIPT_QUEUE, "receipt-0"), ("hset", "checkpoints", "chat", 0)]
+
+
+def test_write_errors_reach_every_caller_in_the_batch():
+    async def scenario():
+        enqueuer = BatchingEnqueuer(RecordingRedis(fail=True), max_delay_ms=1)
+        results = await asyncio.gather(
+            *(enqueuer.enqueue(RECEIPT_QUEUE, str(i)) for i in range(3)),
+            return_exceptions=True
+        )
+        await enqueuer.close()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(r, ConnectionError) for r in results)
+
+
+def test_a_failing_hook_fails_its_batch_and_the_writer_keeps_running():
+    def broken_hook(pipe):
+        raise ValueError("bad checkpoint")
+
+    async def scenario():
+        client = RecordingRedis()
+        enqueuer = BatchingEnqueuer(client, max_delay_ms=1)
+        failed = await asyncio.wait_for(asyncio.gather(
+            enqueuer.enqueue(RECEIPT_QUEUE, "receipt-0", broken_hook),
+            enqueuer.enqueue(RECEIPT_QUEUE, "receipt-1"),
+            return_exceptions=True
+        ), 1)
+        # Later receipts are still written
+        await asyncio.wait_for(enqueuer.enqueue(RECEIPT_QUEUE, "receipt-2"), 1)
+        await enqueuer.close()
+        return failed, client
+
+    failed, client = asyncio.run(scenario())
+
+    assert all(isinstance(r, ValueError) for r in failed)
+    assert client.executed == [[("rpush", RECEIPT_QUEUE, "receipt-2")]]
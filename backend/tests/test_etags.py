@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from starlette.requests import Request
+
+from api import etags
+from api.etags import is_not_modified
+from services.change_tracking import bump_versions
+
+
+def etag_for(request, *tables):
+    return asyncio.run(etags.etag_for(request, *tables))
+
+
+def make_request(query="", if_none_match=None, path="/api/transactions/"):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": headers})
+
+
+def test_etag_changes_with_table_version_and_query(fake_redis):
+    etag = etag_for(make_request("page=1&card=6921"), "checks")
+
+    assert etag.startswith('W/"checks.')
+    assert etag_for(make_request("card=6921&page=1"), "checks") == etag
+    assert etag_for(make_request("page=2&card=6921"), "checks") != etag
+
+    bump_versions(["checks"])
+    assert etag_for(make_request("page=1&card=6921"), "checks") != etag
+
+
+def test_if_none_match_uses_weak_comparison(fake_redis):
+    etag = etag_for(make_request(), "checks")
+    strong = etag[2:]
+
+    assert is_not_modified(make_request(if_none_match=etag), etag)
+    assert is_not_modified(make_request(if_none_match=f'"other", {strong}'), etag)
+    assert not is_not_modified(make_request(if_none_match='W/"stale"'), etag)
+    assert not is_not_modified(make_request(), etag)
+
+
+def test_no_etag_without_redis(monkeypatch):
+    from services import change_tracking
+
+    monkeypatch.setattr(change_tracking, "table_version", lambda table: None)
+    monkeypatch.setattr("api.etags.table_version", lambda table: None)
+
+    assert etag_for(make_request(), "checks") is None
+    assert not is_not_modified(make_request(if_none_match="*"), None)
@@ -0,0 +1,165 @@
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from sqlalchemy import update
+
+from api import event_stream
+from database.models import Check
+# Registers the session listeners that publish change events on commit
+import services.change_tracking  # noqa: F401
+from services.events import change_event, events_since, publish_event
+from workers.queues import EVENTS_CHANNEL, EVENTS_STREAM
+
+
+def add_check(db_session, card="6921", commit=True):
+    check = Check(
+        datetime=datetime(2025, 4, 2, 15, 33),
+        weekday="Ср",
+        date_display="2 апр",
+        time_display="15:33",
+        operator="SmartBank P2P",
+        app="Payme",
+        amount=Decimal("-1000"),
+        card_last4=card,
+        transaction_type="DEBIT",
+        currency="UZS",
+        source="Telegram",
+    )
+    db_session.add(check)
+    if commit:
+        db_session.commit()
+    return check
+
+
+def published(fake_redis):
+    return [json.loads(json.loads(message)["data"]) for channel, message in fake_redis.published if channel == EVENTS_CHANNEL]
+
+
+def test_commits_publish_compact_change_events(db_session, fake_redis):
+    check = add_check(db_session)
+    check.app = "Click"
+    db_session.commit()
+    db_session.delete(check)
+    db_session.commit()
+
+    assert published(fake_redis) == [
+        {"type": "change", "table": "checks", "op": "insert", "ids": [check.id]},
+        {"type": "change", "table": "checks", "op": "update", "ids": [check.id]},
+        {"type": "change", "table": "checks", "op": "delete", "ids": [check.id]},
+    ]
+    # Every published event is also in the resume stream under the same id
+    stream_ids = [event_id for event_id, _ in fake_redis.xrange(EVENTS_STREAM)]
+    assert stream_ids == [json.loads(message)["id"] for _, message in fake_redis.published]
+
+
+def test_rolled_back_writes_publish_nothing(db_session, fake_redis):
+    add_check(db_session, commit=False)
+    db_session.flush()
+    db_session.rollback()
+
+    assert published(fake_redis) == []
+
+
+def test_bulk_statements_announce_known_ids_or_the_whole_table(db_session, fake_redis):
+    first, second = add_check(db_session, "1111"), add_check(db_session, "2222")
+    fake_redis.published.clear()
+
+    db_session.execute(
+        update(Check).where(Check.id.in_([first.id, second.id])).values(app="Click"),
+        execution_options={"event_ids": [second.id, first.id]},
+    )
+    db_session.commit()
+    db_session.execute(update(Check).values(app="Uzum"))
+    db_session.commit()
+
+    assert published(fake_redis) == [
+        {"type": "change", "table": "checks", "op": "update", "ids": sorted([first.id, second.id])},
+        {"type": "change", "table": "checks", "op": "update"},
+    ]
+
+
+def test_events_since_replays_after_the_given_id(fake_redis):
+    ids = [publish_event(change_event("checks", "insert", [n])) for n in range(3)]
+
+    replayed = events_since(ids[0], limit=10)
+    assert [event_id for event_id, _ in replayed] == ids[1:]
+    assert json.loads(replayed[0][1])["ids"] == [1]
+    assert events_since(ids[-1], limit=10) == []
+    # More missed events than the limit: the client must refetch instead
+    assert events_since(ids[0], limit=1) is None
+
+
+def test_events_since_detects_a_trimmed_gap(fake_redis, monkeypatch):
+    monkeypatch.setattr("services.events.EVENTS_STREAM_MAXLEN", 2)
+    ids = [publish_event(change_event("checks", "insert", [n])) for n in range(4)]
+
+    assert events_since(ids[1], limit=10) is None
+    assert [event_id for event_id, _ in events_since(ids[2], limit=10)] == ids[3:]
+    assert events_since("not-an-id", limit=10) is None
+
+
+class LocalHub(event_stream.EventHub):
+    """Hub fed by the test instead of a Redis subscription"""
+
+    async def _listen(self):
+        self.ready.set()
+        await asyncio.Event().wait()
+
+
+async def collect(stream, count):
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        if len(chunks) == count:
+            break
+    await stream.aclose()
+    return chunks
+
+
+def test_stream_replays_the_gap_then_skips_duplicates_from_the_feed(fake_redis, monkeypatch):
+    ids = [publish_event(change_event("checks", "insert", [n])) for n in range(3)]
+    live = fake_redis.published[-1][1]
+
+    async def scenario():
+        hub = LocalHub()
+        monkeypatch.setattr(event_stream, "hub", hub)
+
+        async def connected():
+            return False
+
+        stream = event_stream.event_stream(ids[0], connected)
+        first = await stream.__anext__()
+        # The last replayed event also arrives through pub/sub, then a new one
+        hub.dispatch(live)
+        hub.dispatch(json.dumps({"id": "9-0", "data": json.dumps(change_event("checks", "delete", [7]))}))
+        return [first] + await collect(stream, 3)
+
+    chunks = asyncio.run(scenario())
+
+    assert chunks[0] == "retry: 1000\n\n"
+    assert chunks[1].startswith(f"id: {ids[1]}\nevent: change\ndata: ")
+    assert chunks[2].startswith(f"id: {ids[2]}\n")
+    assert chunks[3] == 'id: 9-0\nevent: change\ndata: {"type": "change", "table": "checks", "op": "delete", "ids": [7]}\n\n'
+
+
+def test_stream_sends_reset_when_the_gap_is_gone(fake_redis, monkeypatch):
+    monkeypatch.setattr("services.events.EVENTS_STREAM_MAXLEN", 1)
+    ids = [publish_event(change_event("checks", "insert", [n])) for n in range(3)]
+
+    async def scenario():
+        monkeypatch.setattr(event_stream, "hub", LocalHub())
+
+        async def connected():
+            return False
+
+        return await collect(event_stream.event_stream(ids[0], connected), 2)
+
+    chunks = asyncio.run(scenario())
+
+    assert chunks[1] == f'id: {ids[-1]}\nevent: reset\ndata: {{"type": "reset"}}\n\n'
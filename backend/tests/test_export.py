@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+import inspect
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+openpyxl = pytest.importorskip("openpyxl")
+
+from sqlalchemy.orm import Session
+
+from api.export import stream_csv, stream_ndjson, stream_xlsx
+from api.filters import TransactionFilters
+from api.routes import transactions
+from database.models import Check
+
+HEADERS = ["id", "amount", "operator_raw"]
+
+
+def rows(n):
+    # A generator, as the endpoint passes one, so writers can't rely on len()
+    return ([i, Decimal(f"{i}.50"), f"Оператор {i}"] for i in range(n))
+
+
+def test_csv_streams_in_chunks(monkeypatch):
+    monkeypatch.setattr("api.export.EXPORT_CHUNK_SIZE", 10)
+
+    chunks = list(stream_csv(HEADERS, rows(25)))
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+
+    assert len(chunks) == 3
+    assert parsed[0] == HEADERS
+    assert parsed[-1] == ["24", "24.50", "Оператор 24"]
+    assert len(parsed) == 26
+
+
+def test_ndjson_lines_are_keyed_by_header():
+    lines = b"".join(stream_ndjson(HEADERS, rows(3))).decode().splitlines()
+
+    assert [json.loads(line) for line in lines][1] == {"id": 1, "amount": "1.50", "operator_raw": "Оператор 1"}
+
+
+def test_xlsx_is_a_readable_workbook():
+    data = b"".join(stream_xlsx(HEADERS, rows(5), sheet_title="Transactions"))
+
+    sheet = openpyxl.load_workbook(io.BytesIO(data), read_only=True)["Transactions"]
+    values = list(sheet.values)
+    assert values[0] == tuple(HEADERS)
+    assert values[5] == (4, 4.5, "Оператор 4")
+
+
+def test_export_rows_apply_filters_and_normalize(db_session, monkeypatch):
+    for i, card in enumerate(["6921", "0907", "6921"]):
+        db_session.add(Check(
+            datetime=datetime(2025, 4, 2, 15, i), weekday="Ср", date_display="2 апр", time_display=f"15:0{i}",
+            operator="SmartBank", amount=Decimal("-200000.00"), card_last4=card, transaction_type="Списание",
+            currency="UZS", source="Telegram", added_via="bot",
+        ))
+    db_session.commit()
+    monkeypatch.setattr(transactions, "SessionLocal", lambda: Session(bind=db_session.get_bind()))
+    params = {name: None for name in inspect.signature(TransactionFilters).parameters}
+    filters = TransactionFilters(**{**params, "card": "6921"})
+
+    exported = list(transactions._export_rows(filters, "transaction_date", "asc", include_raw=False))
+
+    assert [row[1].minute for row in exported] == [0, 2]
+    assert exported[0][2] == "200000.00"
+    assert exported[0][7] == "DEBIT"
+    assert exported[0][9] == "AUTO"
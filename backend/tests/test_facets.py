@@ -0,0 +1,107 @@
+import inspect
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from api.facets import FACETS, build_facet
+from api.filters import TransactionFilters
+from database.models import Check
+from services.rollups import rebuild_rollups
+
+
+def make_filters(**values):
+    params = {name: None for name in inspect.signature(TransactionFilters).parameters}
+    params.update(values)
+    return TransactionFilters(**params)
+
+
+def add_check(db_session, when, app="Payme", card="6921", txn_type="DEBIT", currency="UZS"):
+    db_session.add(Check(
+        datetime=when,
+        weekday="Ср",
+        date_display="2 апр",
+        time_display=when.strftime("%H:%M"),
+        operator=f"{app or 'Unknown'} operator",
+        app=app,
+        amount=Decimal("-1000"),
+        card_last4=card,
+        transaction_type=txn_type,
+        currency=currency,
+        source="Telegram",
+    ))
+
+
+@pytest.fixture
+def seeded(db_session):
+    add_check(db_session, datetime(2025, 4, 1, 10, 0))
+    add_check(db_session, datetime(2025, 4, 2, 11, 0))
+    add_check(db_session, datetime(2025, 4, 2, 12, 0), app="Click")
+    add_check(db_session, datetime(2025, 4, 2, 13, 0), app="Click", card="1234", txn_type="CREDIT")
+    add_check(db_session, datetime(2025, 4, 3, 9, 0), app=None, card="1234")
+    add_check(db_session, datetime(2025, 4, 3, 9, 30), app="Uzum", currency="USD")
+    db_session.commit()
+    rebuild_rollups(db_session, date(2025, 4, 1), date(2025, 5, 1))
+    return db_session
+
+
+def values(facet):
+    return [(v["value"], v["count"]) for v in facet["values"]]
+
+
+def test_facets_count_top_values_from_rollups(seeded):
+    app = build_facet(seeded, "app", make_filters(currency="UZS"), limit=2)
+
+    assert app["source"] == "rollups"
+    assert values(app) == [("Click", 2), ("Payme", 2)]
+    # Totals cover the values past the limit too
+    assert (app["distinct"], app["total"]) == (3, 5)
+
+
+def test_rollup_and_raw_facets_agree(seeded):
+    for name in ("app", "card", "type"):
+        from_rollups = build_facet(seeded, name, make_filters(), limit=10)
+        # A substring filter that matches everything forces the raw path
+        from_raw = build_facet(seeded, name, make_filters(parsing_method="manual"), limit=10)
+        assert from_rollups["source"] == "rollups"
+        assert from_raw["source"] == "raw"
+        assert values(from_rollups) == values(from_raw), name
+    # Missing apps are one None bucket on both paths
+    assert (None, 1) in values(build_facet(seeded, "app", make_filters(), limit=10))
+
+
+def test_facet_ignores_its_own_filter(seeded):
+    filters = make_filters(apps="Click", card="1234")
+
+    # The app dropdown still lists every app used with card 1234
+    assert values(build_facet(seeded, "app", filters)) == [(None, 1), ("Click", 1)]
+    # The card dropdown only counts Click rows
+    assert values(build_facet(seeded, "card", filters)) == [("1234", 1), ("6921", 1)]
+
+
+def test_operator_and_unaligned_ranges_group_raw_rows(seeded):
+    operator = build_facet(seeded, "operator", make_filters(), limit=1)
+    assert operator["source"] == "raw"
+    assert values(operator) == [("Click operator", 2)]
+
+    midday = make_filters(date_from=datetime(2025, 4, 2, 11, 30))
+    assert build_facet(seeded, "app", midday)["source"] == "raw"
+    assert build_facet(seeded, "app", make_filters(date_from=datetime(2025, 4, 2, 12)))["source"] == "rollups"
+    assert values(build_facet(seeded, "app", midday)) == values(build_facet(seeded, "app", make_filters(date_from=datetime(2025, 4, 2, 12))))
+
+
+def test_facet_search_narrows_values(seeded):
+    for filters in (make_filters(), make_filters(operator="operator")):
+        app = build_facet(seeded, "app", filters, q="cl")
+        assert values(app) == [("Click", 2)]
+        assert app["distinct"] == 1
+
+
+def test_every_facet_builds_on_an_empty_table(db_session):
+    for name in FACETS:
+        assert build_facet(db_session, name, make_filters()) == {
+            "values": [], "distinct": 0, "total": 0,
+            "source": "raw" if name == "operator" else "rollups",
+        }
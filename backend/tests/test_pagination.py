@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import null
+
+from api.pagination import InvalidCursor, apply_cursor, build_page, decode_cursor, encode_cursor, order_by_clauses
+from database.models import Check
+
+
+BASE = datetime(2025, 4, 1, 12, 0)
+
+
+def seed(db_session):
+    # Repeated dates/amounts exercise the id tie-breaker, every fifth row has
+    # no updated_at to exercise the NULL group
+    for i in range(23):
+        dt = BASE + timedelta(hours=i // 3)
+        db_session.add(Check(
+            datetime=dt,
+            weekday="Вт",
+            date_display="1 апр",
+            time_display=dt.strftime("%H:%M"),
+            operator=f"Operator {i % 4}",
+            amount=Decimal(-1000 * (i % 5)),
+            card_last4="6921",
+            transaction_type="DEBIT",
+            currency="UZS",
+            source="Telegram",
+            created_at=BASE + timedelta(minutes=i),
+            updated_at=null() if i % 5 == 0 else BASE + timedelta(minutes=i % 7),
+        ))
+    db_session.commit()
+
+
+def walk(db_session, sort_by, sort_dir, page_size):
+    pages, cursor = [], None
+    while True:
+        query, backward = apply_cursor(db_session.query(Check), sort_by, sort_dir, cursor)
+        rows = query.limit(page_size + 1).all()
+        rows, next_cursor, prev_cursor = build_page(rows, page_size, sort_by, sort_dir, cursor, backward)
+        pages.append(([r.id for r in rows], prev_cursor))
+        if next_cursor is None:
+            return pages
+        cursor = next_cursor
+
+
+@pytest.mark.parametrize("sort_by", ["transaction_date", "amount", "created_at", "updated_at"])
+@pytest.mark.parametrize("sort_dir", ["asc", "desc"])
+def test_cursor_pages_match_offset_order(db_session, sort_by, sort_dir):
+    seed(db_session)
+    expected = [c.id for c in db_session.query(Check).order_by(*order_by_clauses(sort_by, sort_dir)).all()]
+
+    pages = walk(db_session, sort_by, sort_dir, page_size=4)
+
+    assert [row_id for ids, _ in pages for row_id in ids] == expected
+    assert all(len(ids) == 4 for ids, _ in pages[:-1])
+
+
+@pytest.mark.parametrize("sort_by", ["amount", "updated_at"])
+def test_prev_cursor_returns_the_previous_page(db_session, sort_by):
+    seed(db_session)
+    pages = walk(db_session, sort_by, "desc", page_size=5)
+
+    assert pages[0][1] is None  # first page has no previous page
+    for (previous_ids, _), (_, prev_cursor) in zip(pages, pages[1:]):
+        query, backward = apply_cursor(db_session.query(Check), sort_by, "desc", prev_cursor)
+        rows, next_cursor, _ = build_page(query.limit(6).all(), 5, sort_by, "desc", prev_cursor, backward)
+        assert [r.id for r in rows] == previous_ids
+        assert next_cursor is not None
+
+
+def test_cursor_rejects_other_sorts_and_garbage():
+    cursor = encode_cursor("amount", "desc", Decimal("-2000.00"), 17)
+
+    assert decode_cursor(cursor, "amount", "desc") == (Decimal("-2000.00"), 17, False)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "amount", "asc")
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", "amount", "desc")
@@ -0,0 +1,130 @@
+import os
+import importlib.util
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from api.pagination import keyset_condition
+from services.partitions import (
+    add_months, create_partition, ensure_partitions, month_start, partition_bounds, partition_name,
+)
+
+
+def test_month_arithmetic_crosses_years():
+    assert month_start(datetime(2025, 12, 31, 23, 59)) == date(2025, 12, 1)
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+
+def test_partition_names_and_bounds():
+    assert partition_name("checks", date(2025, 3, 1)) == "checks_y2025m03"
+    assert partition_bounds("checks", date(2025, 12, 1)) == ("'2025-12-01 00:00:00'", "'2026-01-01 00:00:00'")
+    # transaction_date is TIMESTAMPTZ, its months are cut in UTC
+    assert partition_bounds("transactions", date(2025, 3, 1)) == ("'2025-03-01 00:00:00+00'", "'2025-04-01 00:00:00+00'")
+
+
+def test_ensure_partitions_skips_unpartitioned_databases(db_session):
+    assert ensure_partitions(db_session, today=date(2025, 3, 15)) == []
+
+
+def test_keyset_condition_bounds_the_sort_column_for_pruning():
+    condition = keyset_condition("transaction_date", True, datetime(2025, 3, 1), 10)
+    sql = str(condition.compile(compile_kwargs={"literal_binds": True}))
+
+    assert "checks.datetime <= '2025-03-01 00:00:00'" in sql
+    assert "(checks.datetime, checks.id) < ('2025-03-01 00:00:00', 10)" in sql
+
+
+def _migration_0006():
+    path = Path(__file__).resolve().parents[1] / "migrations" / "versions" / "20261018_0006_monthly_partitions.py"
+    spec = importlib.util.spec_from_file_location("migration_0006", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.skipif(not os.getenv("PERF_DATABASE_URL"), reason="PERF_DATABASE_URL not set")
+def test_cascade_trigger_keeps_children_of_rows_moved_across_months():
+    pytest.importorskip("alembic")
+    engine = create_engine(os.environ["PERF_DATABASE_URL"])
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS cascade_test CASCADE"))
+        conn.execute(text("CREATE SCHEMA cascade_test"))
+        conn.execute(text("SET LOCAL search_path TO cascade_test"))
+        conn.execute(text(
+            "CREATE TABLE parent (id INT, check_id TEXT, datetime TIMESTAMP) PARTITION BY RANGE (datetime)"
+        ))
+        for month in (date(2025, 3, 1), date(2025, 4, 1)):
+            low, high = partition_bounds("checks", month)
+            conn.execute(text(
+                f"CREATE TABLE {partition_name('parent', month)} PARTITION OF parent FOR VALUES FROM ({low}) TO ({high})"
+            ))
+        conn.execute(text("CREATE TABLE child (id INT, check_id TEXT)"))
+        conn.execute(text(_migration_0006().CASCADE_FUNCTION))
+        conn.execute(text(
+            "CREATE TRIGGER child_cascade AFTER DELETE ON parent FOR EACH ROW "
+            "EXECUTE FUNCTION partition_cascade_delete('child', 'check_id', 'check_id', 'parent')"
+        ))
+        conn.execute(text("INSERT INTO parent VALUES (1, 'a', '2025-03-31 23:00'), (2, 'b', '2025-03-15')"))
+        conn.execute(text("INSERT INTO child VALUES (1, 'a'), (2, 'b')"))
+
+        # Re-dating into April moves the row to another partition: children stay
+        conn.execute(text("UPDATE parent SET datetime = '2025-04-01 01:00' WHERE id = 1"))
+        # A real delete still cascades
+        conn.execute(text("DELETE FROM parent WHERE id = 2"))
+
+        remaining = conn.execute(text("SELECT check_id FROM child ORDER BY check_id")).scalars().all()
+        conn.execute(text("DROP SCHEMA cascade_test CASCADE"))
+    engine.dispose()
+
+    assert remaining == ["a"]
+
+
+@pytest.mark.skipif(not os.getenv("PERF_DATABASE_URL"), reason="PERF_DATABASE_URL not set")
+def test_creating_a_partition_keeps_children_of_rows_moved_out_of_default():
+    from sqlalchemy.orm import sessionmaker
+
+    pytest.importorskip("alembic")
+    engine = create_engine(os.environ["PERF_DATABASE_URL"])
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS partition_move_test CASCADE"))
+        conn.execute(text("CREATE SCHEMA partition_move_test"))
+
+    db = sessionmaker(bind=engine)()
+    try:
+        db.execute(text("SET search_path TO partition_move_test"))
+        db.execute(text(
+            "CREATE TABLE checks (id INT, check_id TEXT, datetime TIMESTAMP) PARTITION BY RANGE (datetime)"
+        ))
+        db.execute(text("CREATE TABLE checks_default PARTITION OF checks DEFAULT"))
+        db.execute(text("CREATE TABLE queue_events (id INT, check_id TEXT)"))
+        db.execute(text(_migration_0006().CASCADE_FUNCTION))
+        db.execute(text(
+            "CREATE TRIGGER queue_events_cascade AFTER DELETE ON checks FOR EACH ROW "
+            "EXECUTE FUNCTION partition_cascade_delete('queue_events', 'check_id', 'check_id', 'checks')"
+        ))
+        # A month nobody created a partition for lands in the default one
+        db.execute(text("INSERT INTO checks VALUES (1, 'a', '2025-03-15')"))
+        db.execute(text("INSERT INTO queue_events VALUES (1, 'a')"))
+        db.commit()
+
+        moved = create_partition(db, "checks", date(2025, 3, 1))
+        db.commit()
+
+        events = db.execute(text("SELECT check_id FROM queue_events")).scalars().all()
+        partition = db.execute(text("SELECT check_id FROM checks_y2025m03")).scalars().all()
+        # The trigger is back for real deletes
+        db.execute(text("DELETE FROM checks WHERE id = 1"))
+        remaining = db.execute(text("SELECT COUNT(*) FROM queue_events")).scalar()
+        db.rollback()
+    finally:
+        db.close()
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA partition_move_test CASCADE"))
+        engine.dispose()
+
+    assert moved == 1
+    assert partition == ["a"] and events == ["a"]
+    assert remaining == 0
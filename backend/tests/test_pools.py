@@ -0,0 +1,123 @@
+import json
+import time
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from database import pools
+from database.pools import (
+    TimedQueuePool, engine_pool_options, fleet_snapshot, instrument, pool_options, publish_snapshot,
+)
+from workers.queues import POOL_STATS_KEY
+
+
+@pytest.fixture
+def pool_engine(tmp_path, monkeypatch):
+    """File-backed SQLite engine with a one-connection instrumented pool"""
+    monkeypatch.setattr(pools, "POOL_METRICS", {})
+    options = {"pool_size": 1, "max_overflow": 0, "pool_timeout": 0.1, "pool_recycle": -1}
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_logging_name="test",
+        **options,
+    )
+    metrics = instrument(engine, "test", options)
+    yield engine, metrics
+    engine.dispose()
+
+
+def test_pool_options_follow_role_with_env_overrides(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE_WORKER", "7")
+    monkeypatch.setenv("DB_POOL_TIMEOUT_WORKER", "2.5")
+
+    assert pool_options("api")["pool_size"] == 10
+    worker = pool_options("worker")
+    assert worker["pool_size"] == 7
+    assert worker["pool_timeout"] == 2.5
+    assert worker["max_overflow"] == pools.ROLE_POOL_DEFAULTS["worker"]["max_overflow"]
+    with pytest.raises(ValueError):
+        pool_options("scheduler")
+
+
+@pytest.mark.parametrize("role", sorted(pools.ROLE_POOL_DEFAULTS))
+def test_sync_and_async_engines_share_the_role_budget(role):
+    budget = pool_options(role)
+    engines = [engine_pool_options(driver, role) for driver in ("sync", "async")]
+
+    assert sum(options["pool_size"] for options in engines) == budget["pool_size"]
+    assert sum(options["max_overflow"] for options in engines) == budget["max_overflow"]
+    assert all(options["pool_size"] >= 1 for options in engines)
+    main = engine_pool_options(pools.ROLE_MAIN_DRIVER[role], role)
+    assert main["pool_size"] >= max(options["pool_size"] for options in engines)
+    assert all(options["pool_timeout"] == budget["pool_timeout"] for options in engines)
+
+
+def test_checkouts_connects_and_timeouts_are_recorded(pool_engine):
+    engine, metrics = pool_engine
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        # The only connection is taken, so a second checkout waits and gives up
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        busy = metrics.snapshot()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    snapshot = metrics.snapshot()
+    assert busy["checked_out"] == 1 and busy["utilization"] == 1.0
+    assert snapshot["checked_out"] == 0 and snapshot["idle"] == 1
+    assert snapshot["checkouts"] == 2
+    assert snapshot["peak_checked_out"] == 1
+    assert snapshot["timeouts"] == 1
+    # The timed-out wait lasted about pool_timeout
+    assert snapshot["wait_ms_max"] >= 90
+    assert snapshot["connects"] == 1 and snapshot["connect_ms_max"] > 0
+
+
+def test_metrics_survive_engine_dispose(pool_engine):
+    engine, metrics = pool_engine
+
+    with engine.connect():
+        pass
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    assert metrics.snapshot()["connects"] == 2
+    assert metrics.wait_count == 2
+
+
+def test_fleet_snapshot_totals_roles_and_drops_stale_processes(pool_engine, fake_redis):
+    engine, _ = pool_engine
+    with engine.connect():
+        local = publish_snapshot()
+
+    stale = dict(local, process="worker:old:1", role="worker", reported_at=time.time() - 3600)
+    worker = dict(local, process="worker:host:2", role="worker")
+    fake_redis.hset(POOL_STATS_KEY, stale["process"], json.dumps(stale))
+    fake_redis.hset(POOL_STATS_KEY, worker["process"], json.dumps(worker))
+
+    fleet = fleet_snapshot()
+
+    assert [p["process"] for p in fleet["processes"]] == sorted([local["process"], "worker:host:2"])
+    assert fleet["roles"]["worker"] == {
+        "processes": 1, "connections": 1, "checked_out": 1, "capacity": 1,
+        "replica_connections": 0, "replica_capacity": 0, "timeouts": 0,
+    }
+    assert "worker:old:1" not in fake_redis.hgetall(POOL_STATS_KEY)
+
+
+def test_fleet_counts_replica_pools_apart_from_the_primary(pool_engine, fake_redis):
+    engine, _ = pool_engine
+    with engine.connect():
+        snapshot = dict(publish_snapshot(), process="batch:host:3", role="batch")
+    replica = dict(snapshot["pools"][0], pool="replica", server="replica")
+    snapshot["pools"] = snapshot["pools"] + [replica]
+    fake_redis.hset(POOL_STATS_KEY, snapshot["process"], json.dumps(snapshot))
+
+    totals = fleet_snapshot()["roles"]["batch"]
+
+    assert totals["capacity"] == totals["replica_capacity"] == 1
+    assert totals["checked_out"] == 1 and totals["replica_connections"] == 1
@@ -0,0 +1,119 @@
+import inspect
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from sqlalchemy import update
+
+from api.filters import TransactionFilters
+from database.models import Check
+# Registers the session listeners that bump tags on commit
+import services.change_tracking  # noqa: F401
+from services.query_cache import ALL_TAG, cache_stats, cached, filter_tags
+
+
+def make_filters(**values):
+    params = {name: None for name in inspect.signature(TransactionFilters).parameters}
+    params.update(values)
+    return TransactionFilters(**params)
+
+
+def add_check(db_session, card, app="Payme", when=datetime(2025, 4, 2, 15, 33)):
+    check = Check(
+        datetime=when,
+        weekday="Ср",
+        date_display="2 апр",
+        time_display="15:33",
+        operator="SmartBank P2P",
+        app=app,
+        amount=Decimal("-1000"),
+        card_last4=card,
+        transaction_type="DEBIT",
+        currency="UZS",
+        source="Telegram",
+    )
+    db_session.add(check)
+    db_session.commit()
+    return check
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"calls": self.calls}
+
+
+def test_filter_tags_pick_the_narrowest_dimension():
+    assert filter_tags(make_filters(card="6921", apps="Payme")) == ["card:6921"]
+    assert filter_tags(make_filters(apps="Payme,Click")) == ["app:Click", "app:Payme"]
+    assert filter_tags(make_filters(date_from=datetime(2025, 4, 2), date_to=datetime(2025, 4, 2, 23, 59))) == [
+        "day:2025-04-01", "day:2025-04-02", "day:2025-04-03"
+    ]
+    assert filter_tags(make_filters(date_from=datetime(2024, 1, 1), date_to=datetime(2025, 1, 1))) == [ALL_TAG]
+    assert filter_tags(make_filters(search="payme")) == [ALL_TAG]
+
+
+def test_writes_only_invalidate_queries_on_their_tags(db_session, fake_redis):
+    check = add_check(db_session, "6921")
+    by_card, unfiltered = Counter(), Counter()
+
+    assert cached("list", {"card": "6921"}, ["card:6921"], by_card) == {"calls": 1}
+    assert cached("list", {}, [ALL_TAG], unfiltered) == {"calls": 1}
+    assert cached("list", {"card": "6921"}, ["card:6921"], by_card) == {"calls": 1}
+
+    # Another card: the 6921 page stays cached, the unfiltered one doesn't
+    add_check(db_session, "1234")
+    assert cached("list", {"card": "6921"}, ["card:6921"], by_card) == {"calls": 1}
+    assert cached("list", {}, [ALL_TAG], unfiltered) == {"calls": 2}
+
+    # Moving a row off card 6921 invalidates through its old value
+    check.card_last4 = "5555"
+    db_session.commit()
+    assert cached("list", {"card": "6921"}, ["card:6921"], by_card) == {"calls": 2}
+
+    stats = cache_stats()["list"]
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+    assert stats["hit_ratio"] == round(2 / 6, 4)
+
+
+def test_bulk_statements_without_tags_drop_every_entry(db_session, fake_redis):
+    check = add_check(db_session, "6921")
+    compute = Counter()
+
+    cached("detail", 1, ["txn:1"], compute)
+    db_session.execute(update(Check), [{"id": check.id, "operator": "Click"}], execution_options={"cache_tags": []})
+    db_session.commit()
+    assert cached("detail", 1, ["txn:1"], compute) == {"calls": 1}
+
+    db_session.query(Check).filter(Check.id == check.id).delete(synchronize_session=False)
+    db_session.commit()
+    assert cached("detail", 1, ["txn:1"], compute) == {"calls": 2}
+
+
+def test_falls_back_to_compute_without_redis(monkeypatch):
+    from services import query_cache
+
+    def unavailable():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(query_cache, "get_redis", unavailable)
+    compute = Counter()
+    assert cached("list", {}, [ALL_TAG], compute) == {"calls": 1}
+    assert cached("list", {}, [ALL_TAG], compute) == {"calls": 2}
+
+
+def test_replica_reads_use_the_cache_without_filling_it(fake_redis):
+    compute = Counter()
+    # A replica miss is computed but not stored
+    assert cached("list", {}, [ALL_TAG], compute, store=False) == {"calls": 1}
+    assert cached("list", {}, [ALL_TAG], compute, store=False) == {"calls": 2}
+
+    # A primary read stores it, later replica reads are served from Redis
+    assert cached("list", {}, [ALL_TAG], compute) == {"calls": 3}
+    assert cached("list", {}, [ALL_TAG], compute, store=False) == {"calls": 3}
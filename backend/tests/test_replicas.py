@@ -0,0 +1,111 @@
+import os
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from starlette.requests import Request
+
+from api import replicas
+from api.replicas import PRIMARY_COOKIE, ReadYourWritesMiddleware, ReplicaMonitor, wants_primary
+
+
+class ScriptedMonitor(ReplicaMonitor):
+    """Monitor whose lag readings come from a list instead of a replica"""
+
+    def __init__(self, readings, **kwargs):
+        super().__init__(engine=object(), **kwargs)
+        self.readings = list(readings)
+        self.measured = 0
+
+    async def _measure(self):
+        self.measured += 1
+        reading = self.readings.pop(0)
+        if isinstance(reading, Exception):
+            raise reading
+        return reading
+
+
+def usable(monitor, times=1):
+    async def check():
+        return [await monitor.usable() for _ in range(times)]
+    return asyncio.run(check())
+
+
+def test_replica_is_used_only_while_lag_is_under_the_limit():
+    monitor = ScriptedMonitor([0.5, 7.0, ConnectionError("replica down"), None, 0.0], max_lag=5, interval=0)
+
+    assert usable(monitor, 5) == [True, False, False, False, True]
+
+
+def test_lag_readings_are_reused_within_the_interval():
+    monitor = ScriptedMonitor([0.5, 9.0], max_lag=5, interval=60)
+
+    assert usable(monitor, 3) == [True, True, True]
+    assert monitor.measured == 1
+
+    monitor.checked_at = time.monotonic() - 61
+    assert usable(monitor) == [False]
+
+
+def test_no_read_url_means_no_replica():
+    assert asyncio.run(ReplicaMonitor(None).usable()) is False
+
+
+def make_request(method="GET", cookie=None):
+    headers = [(b"cookie", f"{PRIMARY_COOKIE}={cookie}".encode())] if cookie is not None else []
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers, "query_string": b""})
+
+
+def test_recent_writers_read_from_the_primary():
+    assert wants_primary(make_request(cookie=int(time.time()) + 5))
+    assert not wants_primary(make_request(cookie=int(time.time()) - 1))
+    assert not wants_primary(make_request(cookie="garbage"))
+    assert not wants_primary(make_request())
+
+
+def run_middleware(method, status):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    asyncio.run(ReadYourWritesMiddleware(app)({"type": "http", "method": method}, receive, send))
+    return [value.decode() for name, value in messages[0]["headers"] if name == b"set-cookie"]
+
+
+def test_successful_writes_set_the_read_your_writes_cookie(monkeypatch):
+    monkeypatch.setattr(replicas, "monitor", ScriptedMonitor([]))
+
+    cookies = run_middleware("PATCH", 200)
+    assert len(cookies) == 1 and cookies[0].startswith(f"{PRIMARY_COOKIE}=")
+    assert run_middleware("GET", 200) == []
+    assert run_middleware("POST", 422) == []
+
+    # Without a replica there's nothing to route around
+    monkeypatch.setattr(replicas, "monitor", ReplicaMonitor(None))
+    assert run_middleware("PATCH", 200) == []
+
+
+@pytest.mark.skipif(not os.getenv("PERF_DATABASE_URL"), reason="PERF_DATABASE_URL not set")
+def test_lag_query_reports_no_lag_outside_recovery():
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from database.connection import async_database_url
+
+    async def measure():
+        engine = create_async_engine(async_database_url(os.environ["PERF_DATABASE_URL"]))
+        try:
+            return await ReplicaMonitor(engine)._measure()
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(measure()) == 0
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+pytest.importorskip("redis")
+
+from workers.queues import RESULT_CHANNEL
+from workers.results import STATUS_DONE, STATUS_FAILED, build_result_event, publish_result, publish_stored
+
+
+class RecordingRedis:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.published = []
+
+    def publish(self, channel, message):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.published.append((channel, json.loads(message)))
+        return 1
+
+
+MANUAL_TASK = {
+    "raw_text": "HUMOCARD *6921: oplata 200000.00 UZS; SmartBank P2P HUMO U; 25-04-02 15:33",
+    "source_type": "MANUAL",
+    "source_chat_id": 1001,
+    "source_message_id": 7,
+    "status_message_id": 8,
+}
+
+
+def test_only_manual_submissions_produce_events():
+    auto_task = {k: v for k, v in MANUAL_TASK.items() if k != "status_message_id"}
+
+    assert build_result_event(auto_task, STATUS_DONE) is None
+
+    event = build_result_event(MANUAL_TASK, STATUS_FAILED, error="boom")
+    assert event == {
+        "chat_id": 1001,
+        "status_message_id": 8,
+        "source_message_id": 7,
+        "status": STATUS_FAILED,
+        "error": "boom",
+    }
+
+
+def test_publish_stored_sends_amount_operator_and_app():
+    client = RecordingRedis()
+    result = {
+        "success": True,
+        "transaction_id": 42,
+        "amount": "200000.00",
+        "currency": "UZS",
+        "operator": "SmartBank P2P HUMO U",
+        "application": "SmartBank",
+    }
+
+    publish_stored(MANUAL_TASK, result, client)
+
+    [(channel, event)] = client.published
+    assert channel == RESULT_CHANNEL
+    assert event["status"] == STATUS_DONE
+    assert (event["amount"], event["operator"], event["application"]) == ("200000.00", "SmartBank P2P HUMO U", "SmartBank")
+
+
+def test_publish_errors_never_propagate():
+    publish_result(MANUAL_TASK, STATUS_DONE, RecordingRedis(fail=True))
@@ -0,0 +1,64 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from database.models import Check, CheckRollup
+from services.rollups import rebuild_rollups
+
+
+def add_check(db_session, when, amount, app="Payme", card="6921", txn_type="DEBIT"):
+    db_session.add(Check(
+        datetime=when,
+        weekday="Ср",
+        date_display="2 апр",
+        time_display=when.strftime("%H:%M"),
+        operator="SmartBank P2P",
+        app=app,
+        amount=Decimal(amount),
+        card_last4=card,
+        transaction_type=txn_type,
+        currency="UZS",
+        source="Telegram",
+    ))
+
+
+def rollups(db_session, grain):
+    return {
+        (str(r.bucket), r.app, r.card_last4, r.transaction_type): (r.tx_count, r.amount_sum, r.amount_min, r.amount_max)
+        for r in db_session.query(CheckRollup).filter(CheckRollup.grain == grain)
+    }
+
+
+def test_rebuild_aggregates_hours_and_days(db_session):
+    add_check(db_session, datetime(2025, 4, 2, 15, 10), "-1000")
+    add_check(db_session, datetime(2025, 4, 2, 15, 50), "-3000")
+    add_check(db_session, datetime(2025, 4, 2, 18, 0), "-500")
+    add_check(db_session, datetime(2025, 4, 2, 18, 5), "2000", app=None, txn_type="CREDIT")
+    db_session.commit()
+
+    rebuild_rollups(db_session, date(2025, 4, 1), date(2025, 4, 3))
+
+    assert rollups(db_session, "hour") == {
+        ("2025-04-02 15:00:00", "Payme", "6921", "DEBIT"): (2, Decimal("-4000"), Decimal("-3000"), Decimal("-1000")),
+        ("2025-04-02 18:00:00", "Payme", "6921", "DEBIT"): (1, Decimal("-500"), Decimal("-500"), Decimal("-500")),
+        ("2025-04-02 18:00:00", "", "6921", "CREDIT"): (1, Decimal("2000"), Decimal("2000"), Decimal("2000")),
+    }
+    assert rollups(db_session, "day") == {
+        ("2025-04-02 00:00:00", "Payme", "6921", "DEBIT"): (3, Decimal("-4500"), Decimal("-3000"), Decimal("-500")),
+        ("2025-04-02 00:00:00", "", "6921", "CREDIT"): (1, Decimal("2000"), Decimal("2000"), Decimal("2000")),
+    }
+
+
+def test_rebuild_replaces_only_its_range(db_session):
+    add_check(db_session, datetime(2025, 4, 1, 9, 0), "-100")
+    add_check(db_session, datetime(2025, 4, 2, 9, 0), "-200")
+    db_session.commit()
+    rebuild_rollups(db_session, date(2025, 4, 1), date(2025, 4, 3))
+
+    add_check(db_session, datetime(2025, 4, 1, 9, 30), "-50")
+    add_check(db_session, datetime(2025, 4, 2, 9, 30), "-50")
+    db_session.commit()
+    rebuild_rollups(db_session, date(2025, 4, 2), date(2025, 4, 3))
+
+    days = rollups(db_session, "day")
+    assert days[("2025-04-01 00:00:00", "Payme", "6921", "DEBIT")][0] == 1
+    assert days[("2025-04-02 00:00:00", "Payme", "6921", "DEBIT")][0] == 2
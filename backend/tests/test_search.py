@@ -0,0 +1,46 @@
+from datetime import datetime
+from decimal import Decimal
+
+from api.search import contains, escape_like, trigram_available
+from database.models import Check, OperatorReference
+
+
+def add_check(db_session, raw_text):
+    db_session.add(Check(
+        datetime=datetime(2025, 4, 2, 15, 33),
+        weekday="Ср",
+        date_display="2 апр",
+        time_display="15:33",
+        operator="OQ P2P>TASHKENT",
+        amount=Decimal("-400000"),
+        card_last4="6714",
+        transaction_type="DEBIT",
+        currency="UZS",
+        source="Telegram",
+        raw_text=raw_text,
+    ))
+    db_session.commit()
+
+
+def test_escape_like_neutralizes_wildcards():
+    assert escape_like("100%_off\\") == "100\\%\\_off\\\\"
+
+
+def test_contains_matches_case_insensitively_and_literally(db_session):
+    add_check(db_session, "Оплата 100% cashback at SHOP_1")
+    add_check(db_session, "Оплата 1000 cashback at SHOPX1")
+
+    def matches(term):
+        return sorted(c.raw_text for c in db_session.query(Check).filter(contains(Check.raw_text, term)))
+
+    assert len(matches("cashBACK")) == 2
+    assert matches("100%") == ["Оплата 100% cashback at SHOP_1"]
+    assert matches("shop_1") == ["Оплата 100% cashback at SHOP_1"]
+
+
+def test_trigram_support_is_off_for_sqlite(db_session):
+    db_session.add(OperatorReference(operator_name="PAYME", application_name="Payme"))
+    db_session.commit()
+
+    assert trigram_available(db_session) is False
+    assert db_session.query(OperatorReference).filter(contains(OperatorReference.operator_name, "pay")).count() == 1
@@ -0,0 +1,74 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from api.routes.transactions import TransactionResponse
+from api.serializers import InvalidFields, RowSerializer, parse_fields
+from database.models import Check
+
+
+def add_check(db_session):
+    check = Check(
+        datetime=datetime(2025, 4, 5, 12, 58),
+        weekday="Сб",
+        date_display="5 апр",
+        time_display="12:58",
+        operator="OQ P2P>TASHKENT",
+        app="OQ",
+        amount=Decimal("-400000.00"),
+        balance=Decimal("535000.40"),
+        card_last4="6714",
+        transaction_type="Списание",
+        currency="UZS",
+        source="Telegram",
+        added_via="bot",
+        raw_text="💸 Оплата ➖ 400.000,00 UZS",
+        created_at=datetime(2025, 4, 5, 13, 0, 1, 250000),
+        updated_at=datetime(2025, 4, 5, 13, 0, 1, 250000),
+    )
+    db_session.add(check)
+    db_session.commit()
+    return check
+
+
+def test_projected_rows_serialize_like_the_response_model(db_session):
+    check = add_check(db_session)
+    serializer = RowSerializer(parse_fields(None))
+
+    row = db_session.query(*serializer.columns).one()
+
+    expected = TransactionResponse(
+        id=check.id,
+        transaction_date=check.datetime,
+        amount="400000.00",
+        currency="UZS",
+        card_last_4="6714",
+        operator_raw="OQ P2P>TASHKENT",
+        application_mapped="OQ",
+        transaction_type="DEBIT",
+        balance_after="535000.40",
+        source_type="AUTO",
+        parsing_method="bot",
+        parsing_confidence=None,
+        is_p2p=False,
+        created_at=check.created_at,
+        updated_at=check.updated_at,
+        raw_message=check.raw_text,
+    ).model_dump(mode="json")
+    assert serializer(row) == expected
+    assert list(serializer(row)) == list(expected)
+
+
+def test_fields_limit_the_projection(db_session):
+    add_check(db_session)
+    serializer = RowSerializer(parse_fields("amount,operator_raw"), extra_columns=[Check.datetime])
+
+    row = db_session.query(*serializer.columns).one()
+
+    assert "raw_text" not in [c.key for c in serializer.columns]
+    assert serializer(row) == {"id": 1, "amount": "400000.00", "operator_raw": "OQ P2P>TASHKENT"}
+    with pytest.raises(InvalidFields):
+        parse_fields("amount,metadata")
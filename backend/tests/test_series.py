@@ -0,0 +1,106 @@
+import inspect
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from api.filters import TransactionFilters
+from api.series import InvalidSeries, build_series, rollup_grain, validate_range
+from database.models import Check
+from services.rollups import rebuild_rollups
+
+
+def make_filters(**values):
+    params = {name: None for name in inspect.signature(TransactionFilters).parameters}
+    params.update(values)
+    return TransactionFilters(**params)
+
+
+def add_check(db_session, when, amount, app="Payme", card="6921", txn_type="DEBIT", currency="UZS"):
+    db_session.add(Check(
+        datetime=when,
+        weekday="Ср",
+        date_display="2 апр",
+        time_display=when.strftime("%H:%M"),
+        operator=f"{app} operator",
+        app=app,
+        amount=Decimal(amount),
+        card_last4=card,
+        transaction_type=txn_type,
+        currency=currency,
+        source="Telegram",
+    ))
+
+
+@pytest.fixture
+def seeded(db_session):
+    add_check(db_session, datetime(2025, 3, 31, 10, 5), "-1000")
+    add_check(db_session, datetime(2025, 4, 2, 15, 10), "-2000.50")
+    add_check(db_session, datetime(2025, 4, 2, 15, 40), "-500", app="Click")
+    add_check(db_session, datetime(2025, 4, 2, 16, 0), "3000", txn_type="CREDIT")
+    add_check(db_session, datetime(2025, 4, 6, 9, 0), "-10", currency="USD")
+    add_check(db_session, datetime(2025, 4, 7, 9, 0), "-700", card="1234")
+    db_session.commit()
+    rebuild_rollups(db_session, date(2025, 3, 1), date(2025, 5, 1))
+    return db_session
+
+
+def test_rollup_grain_only_when_filters_and_range_line_up():
+    assert rollup_grain("week", make_filters(card="6921"), "app") == "day"
+    assert rollup_grain("hour", make_filters(date_from=datetime(2025, 4, 2, 15)), None) == "hour"
+    assert rollup_grain("day", make_filters(date_from=datetime(2025, 4, 2, 15)), None) is None
+    assert rollup_grain("day", make_filters(date_to=datetime(2025, 4, 2, 23, 59, 59)), None) == "day"
+    assert rollup_grain("day", make_filters(search="payme"), None) is None
+    assert rollup_grain("day", make_filters(), "operator") is None
+    assert rollup_grain("minute", make_filters(), None) is None
+
+
+def test_rollup_and_raw_series_agree(seeded):
+    for bucket in ("hour", "day", "week"):
+        for split_by in (None, "app", "card", "type"):
+            from_rollups = build_series(seeded, bucket, make_filters(), split_by)
+            # A substring filter that matches everything forces the raw path
+            from_raw = build_series(seeded, bucket, make_filters(operator="operator"), split_by)
+            assert from_rollups["source"] == "rollups"
+            assert from_raw["source"] == "raw"
+            assert from_rollups["series"] == from_raw["series"], (bucket, split_by)
+
+
+def test_week_buckets_start_on_monday_and_volume_is_per_currency(seeded):
+    result = build_series(seeded, "week", make_filters(card="6921"))
+
+    assert result["series"] == [{
+        "key": "all",
+        "points": [
+            {"t": "2025-03-31T00:00:00", "count": 5, "volume": {"UZS": "6500.50", "USD": "10.00"}},
+        ],
+    }]
+
+
+def test_minute_buckets_need_a_short_range(seeded):
+    with pytest.raises(InvalidSeries):
+        validate_range("minute", make_filters())
+    with pytest.raises(InvalidSeries):
+        validate_range("minute", make_filters(date_from=datetime(2025, 3, 1), date_to=datetime(2025, 4, 1)))
+
+    filters = make_filters(date_from=datetime(2025, 4, 2, 15), date_to=datetime(2025, 4, 2, 16))
+    validate_range("minute", filters)
+    result = build_series(seeded, "minute", filters, "app")
+    assert result["source"] == "raw"
+    assert [s["key"] for s in result["series"]] == ["Click", "Payme"]
+
+
+def test_volume_counts_both_signs_of_a_type_on_either_path(db_session):
+    add_check(db_session, datetime(2025, 4, 2, 10, 0), "100", txn_type="REVERSAL")
+    add_check(db_session, datetime(2025, 4, 2, 11, 0), "-100", txn_type="REVERSAL")
+    db_session.commit()
+    rebuild_rollups(db_session, date(2025, 4, 1), date(2025, 5, 1))
+
+    from_rollups = build_series(db_session, "day", make_filters(date_from=datetime(2025, 4, 1)))
+    from_raw = build_series(db_session, "day", make_filters(date_from=datetime(2025, 4, 1, 0, 0, 1)))
+
+    assert from_rollups["source"] == "rollups" and from_raw["source"] == "raw"
+    for result in (from_rollups, from_raw):
+        assert result["series"][0]["points"] == [{"t": "2025-04-02T00:00:00", "count": 2, "volume": {"UZS": "200.00"}}]
@@ -0,0 +1,153 @@
+import json
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("telethon")
+
+from ingestion.receipts import looks_like_receipt
+from ingestion.userbot_backfill import CHECKPOINTS_KEY, AdaptivePacer, HistoryBackfiller
+
+RECEIPT = "HUMOCARD *6921: oplata 200000.00 UZS; SmartBank P2P HUMO U"
+
+
+def test_looks_like_receipt_filters_short_and_keywordless_messages():
+    assert looks_like_receipt(RECEIPT)
+    assert not looks_like_receipt("oplata 1 UZS")  # too short
+    assert not looks_like_receipt("Привет! Как дела, когда встречаемся завтра?")
+    assert not looks_like_receipt(None)
+
+
+def test_pacer_backs_off_on_flood_wait_and_relaxes_on_success():
+    pacer = AdaptivePacer(min_delay=0.0, max_delay=4.0)
+
+    pacer.on_flood_wait(30)
+    assert pacer.delay == 0.5
+    assert pacer.blocked_until > 0
+
+    for _ in range(5):
+        pacer.on_flood_wait(1)
+    assert pacer.delay == 4.0  # capped
+
+    for _ in range(50):
+        pacer.on_success()
+    assert pacer.delay == 0.0
+
+
+class FakeAsyncRedis:
+    """Checkpoint hash and receipt queue: HGET, the advance script and MULTI pipelines"""
+
+    def __init__(self, checkpoints):
+        self.hashes = {CHECKPOINTS_KEY: {str(k): str(v) for k, v in checkpoints.items()}}
+        self.queued = []
+
+    async def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    def _advance(self, name, key, value):
+        fields = self.hashes.setdefault(name, {})
+        if int(value) > int(fields.get(key, 0)):
+            fields[key] = str(value)
+
+    def register_script(self, script):
+        async def advance(keys, args):
+            self._advance(keys[0], *args)
+        return advance
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipe:
+            def __init__(self):
+                self.commands = []
+
+            def rpush(self, key, value):
+                self.commands.append(lambda: redis.queued.append(json.loads(value)))
+
+            def eval(self, script, numkeys, name, key, value):
+                self.commands.append(lambda: redis._advance(name, key, value))
+
+            async def execute(self):
+                for command in self.commands:
+                    command()
+                return []
+        return Pipe()
+
+
+class FakeClient:
+    """Chat history up to `newest`; `receipts` ids are receipts, the rest plain messages"""
+
+    def __init__(self, newest, receipts=(), during_scan=None):
+        self.newest = newest
+        self.receipts = set(receipts)
+        # Called with each message id as the history is read
+        self.during_scan = during_scan
+        self.min_ids = []
+
+    async def get_messages(self, chat_id, limit=1):
+        return [SimpleNamespace(id=self.newest)]
+
+    async def iter_messages(self, chat_id, min_id=0, max_id=0, **kwargs):
+        self.min_ids.append(min_id)
+        for message_id in range(min_id + 1, min(max_id, self.newest + 1)):
+            if self.during_scan:
+                self.during_scan(message_id)
+            text = RECEIPT if message_id in self.receipts else "hello"
+            yield SimpleNamespace(id=message_id, message=text, date=None, sender_id=1)
+
+
+def test_reserved_chat_keeps_its_checkpoint_until_backfilled():
+    redis = FakeAsyncRedis({100: 10})
+    client = FakeClient(newest=50)
+    backfiller = HistoryBackfiller(client, redis)
+
+    # Reserved at startup, before any live message can arrive
+    backfiller.reserve([100])
+    assert backfiller.is_backfilling(100)
+    # A live receipt during startup is only noted, the checkpoint stays at 10
+    backfiller.note_live_message(100, 55)
+
+    queued = asyncio.run(backfiller.run([100]))
+
+    assert queued == {100: 0}
+    assert client.min_ids == [10]  # the gap after the checkpoint was scanned
+    assert redis.hashes[CHECKPOINTS_KEY]["100"] == "55"
+    assert not backfiller.is_backfilling(100)
+
+
+def test_live_messages_during_a_backfill_are_queued_once():
+    redis = FakeAsyncRedis({100: 10})
+    backfiller = HistoryBackfiller(None, redis)
+    live_queued = []
+
+    def live(message_id):
+        if backfiller.note_live_message(100, message_id):
+            live_queued.append(message_id)
+
+    def during_scan(message_id):
+        if message_id == 25:
+            # A late update for a message within the backfill's range, and a new one
+            live(30)
+            live(60)
+
+    backfiller.client = FakeClient(newest=50, receipts=[20, 30, 45], during_scan=during_scan)
+    backfiller.reserve([100])
+    # Arrives before the backfill fixed its upper bound
+    live(20)
+
+    asyncio.run(backfiller.run([100]))
+
+    backfilled = [task["source_message_id"] for task in redis.queued]
+    assert live_queued == [20, 60]
+    assert backfilled == [30, 45]
+    assert redis.hashes[CHECKPOINTS_KEY]["100"] == "60"
+
+
+def test_backfill_flush_never_moves_a_checkpoint_back():
+    redis = FakeAsyncRedis({100: 40})
+    backfiller = HistoryBackfiller(FakeClient(newest=50), redis)
+
+    asyncio.run(backfiller._flush(100, [], 20))
+
+    assert redis.hashes[CHECKPOINTS_KEY]["100"] == "40"
@@ -3,13 +3,24 @@ Celery worker for async receipt processing
 Consumes from Redis queue and processes receipts
 """
 import os
-import asyncio
+import time
+import socket
+import argparse
+import threading
+from typing import List, Optional
 from celery import Celery
+from celery.signals import worker_process_init
 import redis
 import json
 from datetime import datetime
 from dotenv import load_dotenv
 
+from workers.queues import RECEIPT_QUEUE, RETRY_SCHEDULE, PARSED_STREAM, PARSED_STREAM_GROUP
+from workers.dead_letter import DeadLetterQueue, MAX_ATTEMPTS, backoff_delay, record_attempt
+from workers.results import STATUS_FAILED, STATUS_RETRYING, publish_result, publish_stored
+
+# Worker-sized database pools (database/pools.py) unless DB_ROLE says otherwise
+os.environ.setdefault("DB_ROLE", "worker")
 load_dotenv()
 
 # Celery configuration
@@ -29,108 +40,217 @@ app.conf.update(
 )
 
 
-@app.task(name='process_receipt', bind=True, max_retries=3)
-def process_receipt_task(self, task_data_json: str):
+@worker_process_init.connect
+def _start_pool_reporter(**kwargs):
+    """Each prefork child has its own engines; report their pools"""
+    from database.pools import start_reporter
+    start_reporter()
+
+
+class ReceiptParsingError(Exception):
+    """Raised when every parsing strategy returned nothing for a receipt"""
+
+
+def _log_failure(raw_text: str, error_message: str):
+    """Record a failed attempt in parsing_logs using a fresh session"""
+    from database.connection import get_db
+    from database.models import ParsingLog
+
+    try:
+        with get_db() as db:
+            db.add(ParsingLog(
+                raw_message=raw_text or '',
+                success=False,
+                error_message=error_message
+            ))
+            db.commit()
+    except Exception:
+        pass
+
+
+def _save_transaction(db, task_data: dict, parsed_data: dict, processing_time: int = None):
+    """Insert a parsed receipt and its success log (committed by the caller)"""
+    from database.models import Transaction, ParsingLog
+
+    raw_text = task_data['raw_text']
+    transaction = Transaction(
+        raw_message=raw_text,
+        source_type=task_data['source_type'],
+        source_chat_id=task_data['source_chat_id'],
+        source_message_id=task_data.get('source_message_id'),
+        transaction_date=parsed_data['transaction_date'],
+        amount=parsed_data['amount'],
+        currency=parsed_data.get('currency', 'UZS'),
+        card_last_4=parsed_data.get('card_last_4'),
+        operator_raw=parsed_data.get('operator_raw'),
+        application_mapped=parsed_data.get('application_mapped'),
+        transaction_type=parsed_data['transaction_type'],
+        balance_after=parsed_data.get('balance_after'),
+        is_gpt_parsed=parsed_data.get('is_gpt_parsed', False),
+        parsing_confidence=parsed_data.get('parsing_confidence'),
+        parsing_method=parsed_data.get('parsing_method')
+    )
+    db.add(transaction)
+
+    # Log success
+    db.add(ParsingLog(
+        raw_message=raw_text,
+        parsing_method=parsed_data.get('parsing_method'),
+        success=True,
+        processing_time_ms=processing_time
+    ))
+    return transaction
+
+
+def _result(transaction, parsed_data: dict) -> dict:
+    return {
+        'success': True,
+        'transaction_id': transaction.id,
+        'amount': str(parsed_data['amount']),
+        'currency': parsed_data.get('currency'),
+        'operator': parsed_data.get('operator_raw'),
+        'application': parsed_data.get('application_mapped')
+    }
+
+
+def _store_receipt(db, orchestrator, task_data: dict) -> dict:
     """
-    Process a single receipt from the queue
-    
-    Args:
-        task_data_json: JSON string containing receipt data
+    Parse one receipt and save the resulting transaction
+
+    Raises:
+        ReceiptParsingError: if no parser could extract the transaction
+    """
+    from database.models import ParsingLog
+
+    raw_text = task_data['raw_text']
+
+    start_time = datetime.now()
+    parsed_data = orchestrator.process(raw_text)
+    processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+
+    if not parsed_data:
+        # Log failure
+        log = ParsingLog(
+            raw_message=raw_text,
+            success=False,
+            error_message="Parsing returned None",
+            processing_time_ms=processing_time
+        )
+        db.add(log)
+        db.commit()
+
+        print(f"❌ Parsing failed for receipt")
+        raise ReceiptParsingError("Parsing returned None")
+
+    # Save to database
+    transaction = _save_transaction(db, task_data, parsed_data, processing_time)
+    db.commit()
+
+    print(f"✅ Transaction saved: {transaction.id} ({transaction.amount} {transaction.currency})")
+
+    result = _result(transaction, parsed_data)
+    publish_stored(task_data, result)
+    return result
+
+
+def process_receipt(task_data: dict) -> dict:
+    """
+    Parse and store a single receipt
+
+    Raises:
+        ReceiptParsingError: if parsing failed (not worth retrying)
+        Exception: any other error (transient, worth retrying)
     """
     from database.connection import get_db
-    from database.models import Transaction, ParsingLog
     from parsers.parser_orchestrator import ParserOrchestrator
-    
+
     try:
-        # Parse task data
-        task_data = json.loads(task_data_json)
-        raw_text = task_data['raw_text']
-        source_type = task_data['source_type']
-        source_chat_id = task_data['source_chat_id']
-        source_message_id = task_data.get('source_message_id')
-        
-        start_time = datetime.now()
-        
-        # Process with parser orchestrator
         with get_db() as db:
             orchestrator = ParserOrchestrator(db)
-            parsed_data = orchestrator.process(raw_text)
-            
-            processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
-            
-            if parsed_data:
-                # Save to database
-                transaction = Transaction(
-                    raw_message=raw_text,
-                    source_type=source_type,
-                    source_chat_id=source_chat_id,
-                    source_message_id=source_message_id,
-                    transaction_date=parsed_data['transaction_date'],
-                    amount=parsed_data['amount'],
-                    currency=parsed_data.get('currency', 'UZS'),
-                    card_last_4=parsed_data.get('card_last_4'),
-                    operator_raw=parsed_data.get('operator_raw'),
-                    application_mapped=parsed_data.get('application_mapped'),
-                    transaction_type=parsed_data['transaction_type'],
-                    balance_after=parsed_data.get('balance_after'),
-                    is_gpt_parsed=parsed_data.get('is_gpt_parsed', False),
-                    parsing_confidence=parsed_data.get('parsing_confidence'),
-                    parsing_method=parsed_data.get('parsing_method')
-                )
-                db.add(transaction)
-                db.commit()
-                
-                # Log success
-                log = ParsingLog(
-                    raw_message=raw_text,
-                    parsing_method=parsed_data.get('parsing_method'),
-                    success=True,
-                    processing_time_ms=processing_time
-                )
-                db.add(log)
-                db.commit()
-                
-                print(f"✅ Transaction saved: {transaction.id} ({transaction.amount} {transaction.currency})")
-                
-                return {
-                    'success': True,
-                    'transaction_id': transaction.id,
-                    'amount': str(parsed_data['amount']),
-                    'currency': parsed_data.get('currency'),
-                    'application': parsed_data.get('application_mapped')
-                }
-            else:
-                # Log failure
-                log = ParsingLog(
-                    raw_message=raw_text,
-                    success=False,
-                    error_message="Parsing returned None",
-                    processing_time_ms=processing_time
-                )
-                db.add(log)
-                db.commit()
-                
-                print(f"❌ Parsing failed for receipt")
-                return {'success': False, 'error': 'Parsing failed'}
-                
+            return _store_receipt(db, orchestrator, task_data)
+    except ReceiptParsingError:
+        raise
     except Exception as e:
         print(f"❌ Worker error: {e}")
-        
-        # Log exception
-        try:
-            with get_db() as db:
-                log = ParsingLog(
-                    raw_message=raw_text if 'raw_text' in locals() else '',
-                    success=False,
-                    error_message=str(e)
-                )
-                db.add(log)
-                db.commit()
-        except:
-            pass
-        
-        # Retry task
-        raise self.retry(exc=e, countdown=5)
+        _log_failure(task_data.get('raw_text', ''), str(e))
+        raise
+
+
+def process_receipt_batch(payloads: List[dict]) -> List[dict]:
+    """
+    Parse and store a batch of receipts with one session and one mapping cache
+
+    Failures don't stop the batch: each failed receipt is dead-lettered with
+    its attempt history extended. Used for bulk replay of dead letters.
+    """
+    from database.connection import get_db
+    from parsers.parser_orchestrator import ParserOrchestrator
+
+    dead_letters = DeadLetterQueue()
+    results = []
+
+    with get_db() as db:
+        orchestrator = ParserOrchestrator(db)
+        for task_data in payloads:
+            try:
+                results.append(_store_receipt(db, orchestrator, task_data))
+            except Exception as e:
+                db.rollback()
+                if not isinstance(e, ReceiptParsingError):
+                    print(f"❌ Worker error: {e}")
+                    _log_failure(task_data.get('raw_text', ''), str(e))
+                record_attempt(task_data, e)
+                dead_letters.push(task_data, e)
+                publish_result(task_data, STATUS_FAILED, error=str(e))
+                results.append({'success': False, 'error': str(e)})
+
+    return results
+
+
+def handle_failure(task_data: dict, exc: Exception) -> Optional[float]:
+    """
+    Record a failed attempt and decide what happens next
+
+    Returns:
+        Seconds to wait before the next attempt, or None if the receipt was dead-lettered
+    """
+    attempts = record_attempt(task_data, exc)
+    if isinstance(exc, ReceiptParsingError) or len(attempts) >= MAX_ATTEMPTS:
+        DeadLetterQueue().push(task_data, exc)
+        publish_result(task_data, STATUS_FAILED, error=str(exc))
+        return None
+
+    delay = backoff_delay(len(attempts))
+    publish_result(task_data, STATUS_RETRYING, error=str(exc), retry_in=round(delay))
+    return delay
+
+
+@app.task(name='process_receipt', bind=True, max_retries=MAX_ATTEMPTS - 1)
+def process_receipt_task(self, task_data_json: str):
+    """
+    Process a single receipt from the queue
+
+    Retries with exponential backoff; receipts that fail deterministically or
+    exhaust their attempts end up in the dead-letter stream.
+
+    Args:
+        task_data_json: JSON string containing receipt data
+    """
+    task_data = json.loads(task_data_json)
+
+    try:
+        return process_receipt(task_data)
+    except Exception as e:
+        delay = handle_failure(task_data, e)
+        if delay is None:
+            return {'success': False, 'error': str(e), 'dead_lettered': True}
+
+        # Retry task, carrying the attempt history along with the payload
+        raise self.retry(
+            exc=e,
+            countdown=delay,
+            args=(json.dumps(task_data, ensure_ascii=False, default=str),)
+        )
 
 
 # Redis queue consumer (alternative to Celery for simpler deployment)
@@ -139,25 +259,59 @@ class QueueConsumer:
     
     def __init__(self):
         self.redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+
+    def schedule_retry(self, task_data: dict, delay: float):
+        """Park a receipt until its backoff delay has passed"""
+        due_at = time.time() + delay
+        self.redis_client.zadd(
+            RETRY_SCHEDULE,
+            {json.dumps(task_data, ensure_ascii=False, default=str): due_at}
+        )
+        print(f"🔁 Retry scheduled in {delay:.1f}s")
+
+    def promote_due_retries(self, limit: int = 100) -> int:
+        """
+        Move receipts whose backoff has expired back onto the queue
+
+        Several consumers may read the same due entries; only the one whose
+        ZREM removed an entry pushes it, so each retry is queued once.
+
+        Returns:
+            Number of receipts queued
+        """
+        due = self.redis_client.zrangebyscore(RETRY_SCHEDULE, 0, time.time(), start=0, num=limit)
+        if not due:
+            return 0
+        pipe = self.redis_client.pipeline()
+        for task_data_json in due:
+            pipe.zrem(RETRY_SCHEDULE, task_data_json)
+        claimed = [task_data_json for task_data_json, removed in zip(due, pipe.execute()) if removed]
+        if claimed:
+            self.redis_client.rpush(RECEIPT_QUEUE, *claimed)
+        return len(claimed)
     
     def start(self):
         """Start consuming from receipt_queue"""
-        from database.connection import get_db
-        from parsers.parser_orchestrator import ParserOrchestrator
-        from database.models import Transaction, ParsingLog
-        
         print("🔄 Queue consumer started, waiting for receipts...")
         
         while True:
             try:
+                self.promote_due_retries()
+
                 # Blocking pop from queue (timeout 1 second)
-                result = self.redis_client.blpop('receipt_queue', timeout=1)
+                result = self.redis_client.blpop(RECEIPT_QUEUE, timeout=1)
                 
                 if result:
                     queue_name, task_data_json = result
+                    task_data = json.loads(task_data_json)
                     
                     # Process receipt
-                    process_receipt_task(task_data_json)
+                    try:
+                        process_receipt(task_data)
+                    except Exception as e:
+                        delay = handle_failure(task_data, e)
+                        if delay is not None:
+                            self.schedule_retry(task_data, delay)
                     
             except KeyboardInterrupt:
                 print("\n👋 Queue consumer stopped")
@@ -167,7 +321,157 @@ class QueueConsumer:
                 continue
 
 
+class ParsedReceiptConsumer:
+    """
+    Inserts receipts that were already parsed at the edge
+
+    Reads the parsed stream through a consumer group, inserts each batch with a
+    single commit and acknowledges it. Entries left pending by a crashed
+    consumer are reclaimed on start.
+    """
+
+    def __init__(self, consumer_name: Optional[str] = None, batch_size: int = 100):
+        self.redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+        self.consumer_name = consumer_name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+
+    def ensure_group(self):
+        try:
+            self.redis_client.xgroup_create(PARSED_STREAM, PARSED_STREAM_GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def reclaim_pending(self, min_idle_ms: int = 60000):
+        """Take over entries another consumer read but never acknowledged"""
+        start_id = '0-0'
+        while True:
+            response = self.redis_client.xautoclaim(
+                PARSED_STREAM, PARSED_STREAM_GROUP, self.consumer_name,
+                min_idle_time=min_idle_ms, start_id=start_id, count=self.batch_size
+            )
+            start_id, entries = response[0], response[1]
+            if entries:
+                self.insert_batch(entries)
+            if start_id == '0-0':
+                break
+
+    def insert_batch(self, entries: List[tuple]):
+        """Insert a batch of parsed receipts and acknowledge them"""
+        from database.connection import get_db
+        from parsers.edge_parser import decode_parsed
+
+        decoded, malformed = [], []
+        for entry_id, fields in entries:
+            if not fields:
+                # Trimmed from the stream before it was processed
+                continue
+            try:
+                task_data, parsed_data = decode_parsed(fields)
+            except Exception as e:
+                malformed.append((entry_id, fields, e))
+                continue
+            decoded.append((entry_id, task_data, parsed_data))
+
+        # Before the insert: if this fails the batch stays unacknowledged and
+        # is reclaimed later, without its receipts having been stored twice
+        self._dead_letter_malformed(malformed)
+
+        try:
+            with get_db() as db:
+                transactions = [
+                    _save_transaction(db, task_data, parsed_data)
+                    for _, task_data, parsed_data in decoded
+                ]
+                db.commit()
+                for transaction, (_, task_data, parsed_data) in zip(transactions, decoded):
+                    publish_stored(task_data, _result(transaction, parsed_data), self.redis_client)
+            print(f"✅ Direct insert: {len(transactions)} transactions saved")
+        except Exception as e:
+            # One bad row fails the whole batch, fall back to inserting one by one
+            print(f"⚠️  Batch insert failed ({e}), retrying row by row")
+            self._insert_individually(decoded)
+
+        if entries:
+            self.redis_client.xack(PARSED_STREAM, PARSED_STREAM_GROUP, *[entry_id for entry_id, _ in entries])
+
+    def _dead_letter_malformed(self, malformed: List[tuple]):
+        """Dead-letter entries that can't be decoded; they are acknowledged with their batch"""
+        if not malformed:
+            return
+        dead_letters = DeadLetterQueue()
+        for entry_id, fields, e in malformed:
+            try:
+                task_data = json.loads(fields['task'])
+            except Exception:
+                task_data = None
+            if not isinstance(task_data, dict):
+                # Keep the raw entry so it can still be inspected
+                task_data = {'parsed_entry': dict(fields)}
+            _log_failure(task_data.get('raw_text', ''), f"Malformed parsed entry {entry_id}: {e}")
+            record_attempt(task_data, e)
+            dead_letters.push(task_data, e)
+            publish_result(task_data, STATUS_FAILED, self.redis_client, error=str(e))
+
+    def _insert_individually(self, decoded: List[tuple]):
+        from database.connection import get_db
+
+        dead_letters = DeadLetterQueue()
+        for _, task_data, parsed_data in decoded:
+            try:
+                with get_db() as db:
+                    transaction = _save_transaction(db, task_data, parsed_data)
+                    db.commit()
+                    publish_stored(task_data, _result(transaction, parsed_data), self.redis_client)
+            except Exception as e:
+                _log_failure(task_data.get('raw_text', ''), str(e))
+                # Replay sends it through the full pipeline, which re-parses the raw text
+                record_attempt(task_data, e)
+                dead_letters.push(task_data, e)
+                publish_result(task_data, STATUS_FAILED, self.redis_client, error=str(e))
+
+    def start(self):
+        """Start consuming from the parsed stream"""
+        self.ensure_group()
+        self.reclaim_pending()
+        print("🔄 Direct-insert consumer started, waiting for parsed receipts...")
+
+        while True:
+            try:
+                response = self.redis_client.xreadgroup(
+                    PARSED_STREAM_GROUP, self.consumer_name, {PARSED_STREAM: '>'},
+                    count=self.batch_size, block=1000
+                )
+                for _, entries in response or []:
+                    self.insert_batch(entries)
+
+            except KeyboardInterrupt:
+                print("\n👋 Direct-insert consumer stopped")
+                break
+            except Exception as e:
+                print(f"❌ Direct-insert consumer error: {e}")
+                time.sleep(1)
+                continue
+
+
 if __name__ == "__main__":
-    # Run simple queue consumer instead of full Celery
-    consumer = QueueConsumer()
-    consumer.start()
+    parser = argparse.ArgumentParser(description="Receipt queue consumers")
+    parser.add_argument(
+        "--consumer",
+        choices=["queue", "parsed", "all"],
+        default="all",
+        help="queue: raw receipts, parsed: edge-parsed receipts, all: both"
+    )
+    args = parser.parse_args()
+
+    from database.pools import start_reporter
+    start_reporter()
+
+    # Run simple queue consumers instead of full Celery
+    if args.consumer == "parsed":
+        ParsedReceiptConsumer().start()
+    else:
+        if args.consumer == "all":
+            threading.Thread(target=ParsedReceiptConsumer().start, daemon=True).start()
+        consumer = QueueConsumer()
+        consumer.start()
@@ -0,0 +1,249 @@
+"""
+Dead-letter stream for receipts that could not be processed
+Keeps the original payload, error class and attempt history so failed receipts
+can be inspected and replayed in bulk once a fix is deployed
+"""
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+from dotenv import load_dotenv
+
+from workers.queues import DEAD_LETTER_STREAM
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Total attempts per receipt (first try + retries) before it is dead-lettered
+MAX_ATTEMPTS = int(os.getenv("RECEIPT_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE_SECONDS = float(os.getenv("RECEIPT_BACKOFF_BASE_SECONDS", "5"))
+BACKOFF_MAX_SECONDS = float(os.getenv("RECEIPT_BACKOFF_MAX_SECONDS", "600"))
+
+# Approximate cap on stream length so a broken deploy can't fill Redis
+DEAD_LETTER_MAXLEN = int(os.getenv("DEAD_LETTER_MAXLEN", "100000"))
+
+# Attempt history travels with the payload between retries under this key
+ATTEMPTS_KEY = '_attempts'
+
+
+def backoff_delay(attempt: int, jitter: bool = True) -> float:
+    """
+    Exponential backoff delay before the next attempt
+
+    Args:
+        attempt: Number of attempts that already failed (1-based)
+        jitter: Spread retries by ±20% so a burst of failures doesn't retry in lockstep
+
+    Returns:
+        Delay in seconds, capped at BACKOFF_MAX_SECONDS
+    """
+    delay = BACKOFF_BASE_SECONDS * (2 ** max(attempt - 1, 0))
+    if jitter:
+        delay *= random.uniform(0.8, 1.2)
+    return min(delay, BACKOFF_MAX_SECONDS)
+
+
+def record_attempt(task_data: Dict[str, Any], exc: BaseException) -> List[Dict[str, Any]]:
+    """Append a failed attempt to the payload's history and return the history"""
+    attempts = task_data.setdefault(ATTEMPTS_KEY, [])
+    attempts.append({
+        'attempt': len(attempts) + 1,
+        'error_class': type(exc).__name__,
+        'error': str(exc),
+        'failed_at': datetime.utcnow().isoformat(),
+    })
+    return attempts
+
+
+def split_payload(task_data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Separate the original payload from its attempt history"""
+    payload = {k: v for k, v in task_data.items() if k != ATTEMPTS_KEY}
+    return payload, list(task_data.get(ATTEMPTS_KEY, []))
+
+
+def build_entry(task_data: Dict[str, Any], exc: BaseException) -> Dict[str, str]:
+    """Build stream fields for a dead-lettered receipt"""
+    payload, attempts = split_payload(task_data)
+    return {
+        'payload': json.dumps(payload, ensure_ascii=False, default=str),
+        'error_class': type(exc).__name__,
+        'error_message': str(exc),
+        'attempts': json.dumps(attempts, ensure_ascii=False),
+        'attempt_count': str(len(attempts)),
+        'dead_lettered_at': datetime.utcnow().isoformat(),
+    }
+
+
+def decode_entry(entry_id: str, fields: Dict[str, str]) -> Dict[str, Any]:
+    """Decode stream fields back into a dead-letter record"""
+    return {
+        'id': entry_id,
+        'payload': json.loads(fields.get('payload') or '{}'),
+        'error_class': fields.get('error_class'),
+        'error_message': fields.get('error_message'),
+        'attempts': json.loads(fields.get('attempts') or '[]'),
+        'attempt_count': int(fields.get('attempt_count') or 0),
+        'dead_lettered_at': fields.get('dead_lettered_at'),
+    }
+
+
+class DeadLetterQueue:
+    """Redis stream of receipts that exhausted their attempts"""
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis_client = redis_client or redis.from_url(REDIS_URL, decode_responses=True)
+
+    def push(self, task_data: Dict[str, Any], exc: BaseException) -> str:
+        """Add a failed receipt to the stream, returns the entry id"""
+        entry_id = self.redis_client.xadd(
+            DEAD_LETTER_STREAM,
+            build_entry(task_data, exc),
+            maxlen=DEAD_LETTER_MAXLEN,
+            approximate=True,
+        )
+        print(f"☠️  Receipt dead-lettered: {entry_id} ({type(exc).__name__}: {exc})")
+        return entry_id
+
+    def count(self) -> int:
+        return self.redis_client.xlen(DEAD_LETTER_STREAM)
+
+    def list(
+        self,
+        limit: int = 100,
+        after: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """List entries oldest first, optionally between an exclusive start id and an inclusive end id"""
+        start = f"({after}" if after else '-'
+        entries = self.redis_client.xrange(DEAD_LETTER_STREAM, min=start, max=until or '+', count=limit)
+        return [decode_entry(entry_id, fields) for entry_id, fields in entries]
+
+    def get(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch specific entries in one round trip, skipping ids that no longer exist"""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for entry_id in ids:
+            pipe.xrange(DEAD_LETTER_STREAM, min=entry_id, max=entry_id, count=1)
+        records = []
+        for result in pipe.execute():
+            for entry_id, fields in result:
+                records.append(decode_entry(entry_id, fields))
+        return records
+
+    def delete(self, ids: List[str]) -> int:
+        if not ids:
+            return 0
+        return self.redis_client.xdel(DEAD_LETTER_STREAM, *ids)
+
+    def replay(
+        self,
+        ids: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        batch_size: int = 100,
+    ) -> Dict[str, int]:
+        """
+        Run dead letters through the batch pipeline
+
+        Entries are removed from the stream once their batch was processed, so a
+        batch that fails as a whole (database down) leaves them for the next
+        replay; receipts that fail again are dead-lettered anew with their
+        attempt history extended.
+
+        Args:
+            ids: Specific entry ids to replay (all entries when omitted)
+            limit: Maximum number of entries to replay
+            batch_size: Receipts processed per database session
+
+        Returns:
+            Summary with replayed, succeeded and failed counts
+        """
+        from workers.celery_worker import process_receipt_batch
+
+        summary = {'replayed': 0, 'succeeded': 0, 'failed': 0}
+        pending_ids = list(ids) if ids else None
+        after = None
+        # Stop at the current tail so receipts re-dead-lettered during replay aren't picked up again
+        tail = self.redis_client.xrevrange(DEAD_LETTER_STREAM, count=1)
+        until = tail[0][0] if tail else None
+        if until is None and pending_ids is None:
+            return summary
+
+        while limit is None or summary['replayed'] < limit:
+            count = batch_size if limit is None else min(batch_size, limit - summary['replayed'])
+            if pending_ids is not None:
+                if not pending_ids:
+                    break
+                chunk, pending_ids = pending_ids[:count], pending_ids[count:]
+                records = self.get(chunk)
+            else:
+                records = self.list(limit=count, after=after, until=until)
+                if not records:
+                    break
+                after = records[-1]['id']
+            if not records:
+                continue
+
+            payloads = []
+            for record in records:
+                task_data = dict(record['payload'])
+                task_data[ATTEMPTS_KEY] = record['attempts']
+                payloads.append(task_data)
+
+            results = process_receipt_batch(payloads)
+            # Re-failures were pushed as new entries past `until`, so only the
+            # replayed originals go
+            self.delete([record['id'] for record in records])
+
+            summary['replayed'] += len(records)
+            summary['succeeded'] += sum(1 for r in results if r.get('success'))
+            summary['failed'] += sum(1 for r in results if not r.get('success'))
+
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI: inspect and replay dead-lettered receipts"""
+    parser = argparse.ArgumentParser(description="Dead-lettered receipts")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help="Show dead-lettered receipts")
+    list_parser.add_argument('--limit', type=int, default=20)
+
+    replay_parser = subparsers.add_parser('replay', help="Replay dead letters through the batch pipeline")
+    replay_parser.add_argument('--id', dest='ids', action='append', help="Entry id (repeatable)")
+    replay_parser.add_argument('--limit', type=int, default=None)
+    replay_parser.add_argument('--batch-size', type=int, default=100)
+
+    delete_parser = subparsers.add_parser('delete', help="Drop dead letters without replaying")
+    delete_parser.add_argument('ids', nargs='+')
+
+    args = parser.parse_args(argv)
+    dlq = DeadLetterQueue()
+
+    if args.command == 'list':
+        print(f"Dead letters: {dlq.count()}")
+        for record in dlq.list(limit=args.limit):
+            preview = (record['payload'].get('raw_text') or '').replace('\n', ' ')[:60]
+            print(
+                f"  {record['id']}  {record['error_class']}: {record['error_message']}"
+                f"  (attempts: {record['attempt_count']})  {preview}"
+            )
+    elif args.command == 'replay':
+        summary = dlq.replay(ids=args.ids, limit=args.limit, batch_size=args.batch_size)
+        print(
+            f"Replay complete: replayed={summary['replayed']} "
+            f"succeeded={summary['succeeded']} failed={summary['failed']}"
+        )
+    elif args.command == 'delete':
+        print(f"Deleted {dlq.delete(args.ids)} entries")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""
+Redis key names shared by ingestion, workers and the API
+"""
+
+# Raw receipts waiting for the full parsing pipeline (Redis list)
+RECEIPT_QUEUE = 'receipt_queue'
+
+# Receipts already parsed at the edge, waiting to be inserted (Redis stream)
+PARSED_STREAM = 'receipt_parsed'
+PARSED_STREAM_GROUP = 'receipt_writers'
+
+# Receipts waiting for their next retry attempt (sorted set scored by due time)
+RETRY_SCHEDULE = 'receipt_retry_schedule'
+
+# Receipts that exhausted all attempts (Redis stream)
+DEAD_LETTER_STREAM = 'receipt_dead_letter'
+
+# Completion events for receipts submitted through the manual bot (pub/sub channel)
+RESULT_CHANNEL = 'receipt_results'
+
+# Live change/progress events for the frontend: capped resume log (Redis
+# stream) plus the live feed (pub/sub channel)
+EVENTS_STREAM = 'live_events'
+EVENTS_CHANNEL = 'live_events_feed'
+
+# Latest connection pool snapshot of every API/worker process (Redis hash
+# keyed by role:host:pid)
+POOL_STATS_KEY = 'db_pool_stats'
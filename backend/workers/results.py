@@ -0,0 +1,87 @@
+"""
+Completion events for receipts submitted through the manual bot
+The worker publishes one event per finished attempt so the bot can edit the
+user's status message as soon as the result is stored, without polling
+"""
+import os
+import json
+from typing import Any, Dict, Optional
+
+import redis
+from dotenv import load_dotenv
+
+from workers.queues import RESULT_CHANNEL
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Event statuses
+STATUS_DONE = 'done'
+STATUS_RETRYING = 'retrying'
+STATUS_FAILED = 'failed'
+
+_redis_client: Optional[redis.Redis] = None
+
+
+def _get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def build_result_event(task_data: Dict[str, Any], status: str, **fields: Any) -> Optional[Dict[str, Any]]:
+    """
+    Build a completion event for a receipt
+
+    Returns:
+        Event dict, or None when nobody is waiting for this receipt
+        (only manual bot submissions carry a status message)
+    """
+    status_message_id = task_data.get('status_message_id')
+    if not status_message_id:
+        return None
+
+    event = {
+        'chat_id': task_data.get('source_chat_id'),
+        'status_message_id': status_message_id,
+        'source_message_id': task_data.get('source_message_id'),
+        'status': status,
+    }
+    event.update(fields)
+    return event
+
+
+def publish_result(task_data: Dict[str, Any], status: str, redis_client: Optional[redis.Redis] = None, **fields: Any):
+    """
+    Publish a completion event for a receipt
+
+    Publishing is best effort: a missing listener or a Redis hiccup must never
+    fail a receipt that was already stored.
+    """
+    event = build_result_event(task_data, status, **fields)
+    if event is None:
+        return
+
+    try:
+        (redis_client or _get_redis()).publish(
+            RESULT_CHANNEL,
+            json.dumps(event, ensure_ascii=False, default=str)
+        )
+    except Exception as e:
+        print(f"⚠️  Failed to publish receipt result: {e}")
+
+
+def publish_stored(task_data: Dict[str, Any], result: Dict[str, Any], redis_client: Optional[redis.Redis] = None):
+    """Publish a success event from a `_result()` dict"""
+    publish_result(
+        task_data,
+        STATUS_DONE,
+        redis_client=redis_client,
+        transaction_id=result.get('transaction_id'),
+        amount=result.get('amount'),
+        currency=result.get('currency'),
+        operator=result.get('operator'),
+        application=result.get('application'),
+    )
@@ -1,5 +1,7 @@
 import React, { useState, useEffect } from 'react';
+import { useQuery } from '@tanstack/react-query';
 import { X, Calendar, Search, DollarSign, Smartphone, Hash } from 'lucide-react';
+import { transactionsApi } from '../services/api';
 
 interface FilterState {
     dateFrom: string;
@@ -36,6 +38,7 @@ const DEFAULT_FILTERS: FilterState = {
     cardId: '',
 };
 
+// Fallbacks until facet values load
 const OPERATORS_LIST = ['Beeline', 'Ucell', 'Mobiuz', 'Uztelecom', 'Korzinka', 'Makro', 'Click', 'Payme'];
 const APPS_LIST = ['Click Evolution', 'Apelsin', 'Payme', 'Ipak Yuli'];
 const TRANS_TYPES = ['DEBIT', 'CREDIT', 'CONVERSION', 'REVERSAL']; // Mapped values might differ, using keys for now
@@ -65,6 +68,29 @@ export const FilterDrawer: React.FC<FilterDrawerProps> = ({ isOpen, onClose, onA
         }
     }, [isOpen]);
 
+    // Dropdown values with counts, top ones first, for the chosen currency and dates
+    const { data: facets } = useQuery({
+        queryKey: ['facets', filters.currency, filters.dateFrom, filters.dateTo],
+        queryFn: () => transactionsApi.getFacets({
+            fields: ['operator', 'app'],
+            limit: 30,
+            currency: filters.currency,
+            date_from: filters.dateFrom || undefined,
+            date_to: filters.dateTo || undefined,
+        }),
+        enabled: isOpen,
+        staleTime: 60 * 1000,
+    });
+    const facetOptions = (name: 'operator' | 'app', fallback: string[]) => {
+        const facet = facets?.facets[name];
+        if (!facet) return fallback.map(value => ({ value, count: undefined as number | undefined }));
+        return facet.values
+            .filter((v): v is { value: string; count: number } => v.value !== null)
+            .map(v => ({ value: v.value, count: v.count as number | undefined }));
+    };
+    const operatorOptions = facetOptions('operator', OPERATORS_LIST);
+    const appOptions = facetOptions('app', APPS_LIST);
+
     // Handlers
     const toggleDay = (day: number) => {
         setFilters(prev => ({
@@ -231,7 +257,7 @@ export const FilterDrawer: React.FC<FilterDrawerProps> = ({ isOpen, onClose, onA
                         <div className="mt-3">
                             <label className="text-xs text-foreground-muted mb-2 block">Операторы</label>
                             <div className="grid grid-cols-2 gap-2">
-                                {OPERATORS_LIST.map(op => (
+                                {operatorOptions.map(({ value: op, count }) => (
                                     <label key={op} className="flex items-center gap-2 text-sm text-foreground">
                                         <input
                                             type="checkbox"
@@ -239,7 +265,8 @@ export const FilterDrawer: React.FC<FilterDrawerProps> = ({ isOpen, onClose, onA
                                             onChange={() => toggleList('operators', op)}
                                             className="rounded text-primary focus:ring-primary border-border"
                                         />
-                                        {op}
+                                        <span className="truncate">{op}</span>
+                                        {count !== undefined && <span className="ml-auto text-xs text-foreground-muted">{count}</span>}
                                     </label>
                                 ))}
                             </div>
@@ -247,7 +274,7 @@ export const FilterDrawer: React.FC<FilterDrawerProps> = ({ isOpen, onClose, onA
                         <div className="mt-4">
                             <label className="text-xs text-foreground-muted mb-2 block">Приложение</label>
                             <div className="grid grid-cols-2 gap-2">
-                                {APPS_LIST.map(app => (
+                                {appOptions.map(({ value: app, count }) => (
                                     <label key={app} className="flex items-center gap-2 text-sm text-foreground">
                                         <input
                                             type="checkbox"
@@ -255,7 +282,8 @@ export const FilterDrawer: React.FC<FilterDrawerProps> = ({ isOpen, onClose, onA
                                             onChange={() => toggleList('apps', app)}
                                             className="rounded text-primary focus:ring-primary border-border"
                                         />
-                                        {app}
+                                        <span className="truncate">{app}</span>
+                                        {count !== undefined && <span className="ml-auto text-xs text-foreground-muted">{count}</span>}
                                     </label>
                                 ))}
                             </div>
@@ -0,0 +1,46 @@
+import { useEffect, useRef } from 'react';
+import { ChangeEvent, EVENTS_STREAM_URL, ProgressEvent } from '../services/api';
+
+type LiveEventHandlers = {
+    onChange?: (event: ChangeEvent) => void;
+    onProgress?: (event: ProgressEvent) => void;
+    // Events were missed and can't be replayed: refetch everything
+    onReset?: () => void;
+};
+
+/**
+ * Subscribes to the server's live event stream
+ * EventSource reconnects on its own and resumes from the last event id,
+ * so handlers see every change unless onReset is called
+ */
+export const useLiveEvents = (handlers: LiveEventHandlers) => {
+    const handlersRef = useRef(handlers);
+    handlersRef.current = handlers;
+
+    useEffect(() => {
+        if (typeof EventSource === 'undefined') return;
+        const source = new EventSource(EVENTS_STREAM_URL);
+
+        const parse = (message: MessageEvent) => {
+            try {
+                return JSON.parse(message.data);
+            } catch {
+                return null;
+            }
+        };
+
+        source.addEventListener('change', (message) => {
+            const event = parse(message as MessageEvent);
+            if (event) handlersRef.current.onChange?.(event);
+        });
+        source.addEventListener('progress', (message) => {
+            const event = parse(message as MessageEvent);
+            if (event) handlersRef.current.onProgress?.(event);
+        });
+        source.addEventListener('reset', () => {
+            handlersRef.current.onReset?.();
+        });
+
+        return () => source.close();
+    }, []);
+};
@@ -1,6 +1,7 @@
 import { useCallback, useEffect, useRef, useState } from 'react';
 import { transactionsApi, Transaction } from '../services/api';
 import { db } from '../storage/db';
+import { useLiveEvents } from './useLiveEvents';
 
 type SyncProgress = {
     downloaded: number;
@@ -16,6 +17,8 @@ export const useOfflineTransactions = () => {
     const [syncProgress, setSyncProgress] = useState<SyncProgress>({ downloaded: 0, pages: 0, status: 'idle' });
     const [lastSyncAt, setLastSyncAt] = useState<string | null>(null);
     const retryDelayRef = useRef<number>(5 * 60 * 1000); // 5 minutes
+    // Larger change batches resync the whole cache instead of fetching rows one by one
+    const LIVE_FETCH_LIMIT = 50;
 
     const sortTransactions = useCallback((items: Transaction[]) => {
         return [...items].sort((a, b) => {
@@ -171,6 +174,29 @@ export const useOfflineTransactions = () => {
         return () => clearInterval(interval);
     }, [syncFromServer]);
 
+    // Live changes: new receipts and edits from other clients land within a second
+    useLiveEvents({
+        onChange: async (event) => {
+            if (event.table !== 'checks') return;
+            if (!event.ids || event.ids.length > LIVE_FETCH_LIMIT) {
+                syncFromServer(true);
+                return;
+            }
+            if (event.op === 'delete') {
+                removeTransactions(event.ids);
+                return;
+            }
+            try {
+                const rows = await Promise.all(event.ids.map((id) => transactionsApi.getTransaction(id)));
+                await upsertTransactions(rows);
+            } catch (error) {
+                console.error('Failed to apply live change', error);
+                syncFromServer(true);
+            }
+        },
+        onReset: () => syncFromServer(true),
+    });
+
     return {
         data,
         isLoading,
@@ -3,8 +3,9 @@
  * AI-powered transaction analysis and application mapping
  */
 import { useState } from 'react';
-import { useMutation, useQuery } from '@tanstack/react-query';
-import { automationApi } from '../services/api';
+import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
+import { automationApi, AnalyzeStatusResponse } from '../services/api';
+import { useLiveEvents } from '../hooks/useLiveEvents';
 import {
     Bot,
     Play,
@@ -36,14 +37,30 @@ export function AutomationPage() {
         },
     });
 
-    // Poll task status
+    // Task status: pushed through live events, slow polling only as a fallback
+    const queryClient = useQueryClient();
     const { data: taskStatus } = useQuery({
         queryKey: ['analyzeStatus', activeTaskId],
         queryFn: () => automationApi.getAnalyzeStatus(activeTaskId!),
         enabled: !!activeTaskId,
         refetchInterval: (query) => {
             if (!query.state.data) return false;
-            return query.state.data.status === 'processing' || query.state.data.status === 'started' ? 2000 : false;
+            return query.state.data.status === 'processing' || query.state.data.status === 'started' ? 30000 : false;
+        },
+    });
+
+    useLiveEvents({
+        onProgress: (event) => {
+            if (event.task_id !== activeTaskId) return;
+            queryClient.setQueryData<AnalyzeStatusResponse>(['analyzeStatus', event.task_id], {
+                task_id: event.task_id,
+                status: event.status,
+                progress: event.progress,
+                results: event.results ?? undefined,
+            } as AnalyzeStatusResponse);
+        },
+        onReset: () => {
+            if (activeTaskId) queryClient.invalidateQueries({ queryKey: ['analyzeStatus', activeTaskId] });
         },
     });
 
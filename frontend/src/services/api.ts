@@ -25,6 +25,8 @@ const API_BASE_URL = envApiUrl || `http://${defaultHost}:8000`;
 
 export const apiClient = axios.create({
     baseURL: API_BASE_URL,
+    // Carries the backend's read-your-writes cookie across origins
+    withCredentials: true,
     headers: {
         'Content-Type': 'application/json',
     },
@@ -168,6 +170,28 @@ export interface SummaryResponse {
 }
 
 // API methods
+export type FacetName = 'operator' | 'app' | 'card' | 'type';
+
+export interface Facet {
+    values: Array<{ value: string | null; count: number }>;
+    distinct: number;
+    total: number;
+    source: 'rollups' | 'raw';
+}
+
+export interface FacetsResponse {
+    facets: Partial<Record<FacetName, Facet>>;
+}
+
+export interface FacetsQueryParams {
+    fields: FacetName[];
+    limit?: number;
+    q?: string;
+    currency?: string;
+    date_from?: string;
+    date_to?: string;
+}
+
 export const transactionsApi = {
     getTransactions: async (params: TransactionsQueryParams): Promise<TransactionListResponse> => {
         const query: Record<string, any> = {
@@ -237,6 +261,14 @@ export const transactionsApi = {
         const response = await apiClient.post<Transaction>('/api/transactions/', payload);
         return response.data;
     },
+
+    getFacets: async (params: FacetsQueryParams): Promise<FacetsResponse> => {
+        const { fields, ...filters } = params;
+        const response = await apiClient.get<FacetsResponse>('/api/transactions/facets', {
+            params: { ...filters, fields: fields.join(',') },
+        });
+        return response.data;
+    },
 };
 
 export const analyticsApi = {
@@ -416,6 +448,24 @@ export const automationApi = {
     },
 };
 
+// Live event types (Server-Sent Events from /api/events/stream)
+export interface ChangeEvent {
+    type: 'change';
+    table: string;
+    op: 'insert' | 'update' | 'delete';
+    ids?: number[]; // omitted when unknown rows changed
+}
+
+export interface ProgressEvent {
+    type: 'progress';
+    task_id: string;
+    status: string;
+    progress: AnalyzeStatusResponse['progress'];
+    results?: Record<string, any> | null;
+}
+
+export const EVENTS_STREAM_URL = `${API_BASE_URL}/api/events/stream`;
+
 // Userbot types
 export interface UserbotConfig {
     api_id: string;